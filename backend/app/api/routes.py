@@ -1,20 +1,28 @@
 """
 API 路由定义
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, Request, Depends, Query, Path, BackgroundTasks, status
-from fastapi.responses import FileResponse, StreamingResponse
-from typing import Dict, Any, Optional
-import json
+from fastapi import (
+    APIRouter, UploadFile, File, HTTPException, Request, Depends, Query, Path, BackgroundTasks, status,
+    WebSocket, WebSocketDisconnect
+)
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional
 import os
 import shutil
-import time
 import uuid
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import quote
 
-from app.services.excel_processor import ExcelProcessor
-from app.services.database_parser import DatabaseParser
+from app.services.executor import execution
+from app.services.single_flight import single_flight
+from app.services.data_version import data_version
+from app.services.xlsx_export import (
+    XLSX_MEDIA_TYPE, WorkbookFormatError, analysis_result_rows, iter_workbook_with_sheet
+)
 from app.services.upload_progress import progress_manager
+from app.services.auth_cache import principal_cache
+from app.services import cached_queries, profiling, server_timing, warmup
 from app.services.auth_service import (
     authenticate_user,
     create_access_token,
@@ -37,88 +45,59 @@ from app.models.schemas import (
 )
 from app.config import settings
 from app.utils.logger import get_logger
-from app.db.database import get_db
+from app.utils.json_response import FastJSONResponse, analysis_response, analysis_list_response, dumps
+from app.utils.http_cache import make_etag, not_modified, with_etag
+from app.db.database import get_db, SessionLocal
+from app.db.instrumentation import sql_report
 from sqlalchemy.orm import Session
 from app.db.models import User
 
 router = APIRouter()
 logger = get_logger("api.routes")
-UPLOAD_RECORDS_FILE = Path(settings.upload_dir) / "upload_records.json"
-
-
-def _load_upload_records() -> list[Dict[str, Any]]:
-    """加载已上传文件的记录列表"""
-    if not UPLOAD_RECORDS_FILE.exists():
-        return []
-    try:
-        with open(UPLOAD_RECORDS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        logger.warning(f"读取上传记录失败，已忽略: {e}")
-        return []
-
+# 游标分页接口的最大每页条数
+MAX_PAGE_SIZE = 500
+# 进度推送的心跳间隔（秒），防止代理因空闲断开连接
+PROGRESS_HEARTBEAT_SECONDS = 15
 
-def _save_upload_records(records: list[Dict[str, Any]]):
-    """保存上传记录到磁盘"""
-    try:
-        UPLOAD_RECORDS_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(UPLOAD_RECORDS_FILE, "w", encoding="utf-8") as f:
-            json.dump(records, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        logger.warning(f"保存上传记录失败: {e}")
 
+def _excel_tasks():
+    """Excel 模式计算模块（依赖 pandas/openpyxl），首次使用时才导入，缩短服务启动时间"""
+    from app.services import excel_tasks
+    return excel_tasks
 
-def _upsert_upload_record(record: Dict[str, Any]):
-    """新增或更新上传记录"""
-    records = _load_upload_records()
-    target_path = record.get("file_path")
-    updated = False
-
-    if target_path:
-        for idx, item in enumerate(records):
-            if item.get("file_path") == target_path:
-                records[idx] = {**item, **record}
-                updated = True
-                break
 
-    if not updated:
-        records.append(record)
+async def _run_excel(endpoint: str, func, file_path: str, *args) -> Any:
+    """
+    在计算执行器中运行 Excel 模式计算任务
 
-    _save_upload_records(records)
+    同一文件（路径 + 修改时间 + 大小）、同一任务和参数的并发请求合并为一次计算，共享结果；
+    剖析请求不合并，剖析的是实际计算
+    """
+    if profiling.current_session() is not None:
+        return await execution.run_cpu(endpoint, func, file_path, *args)
+    stat = os.stat(file_path)
+    # 列表参数都是月份筛选，与数据库模式的缓存键一致，去重排序后比较
+    params = tuple(tuple(sorted(set(arg))) if isinstance(arg, list) else arg for arg in args)
+    key = (endpoint, func.__name__, os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, params)
+    return await single_flight.do(endpoint, key, lambda: execution.run_cpu(endpoint, func, file_path, *args))
 
 
 def _mark_file_analyzed(file_path: str):
-    """标记文件已完成解析"""
-    records = _load_upload_records()
-    updated = False
-    analyzed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    for item in records:
-        if item.get("file_path") == file_path:
-            item["last_analyzed_at"] = analyzed_at
-            item["parsed"] = True
-            updated = True
-            break
-
-    if not updated:
-        # 如果缺失记录，补充最小信息后保存
-        fallback_record = {
-            "file_path": file_path,
-            "file_name": Path(file_path).name,
-            "file_size": os.path.getsize(file_path) if os.path.exists(file_path) else 0,
-            "sheets": [],
-            "upload_time": None,
-            "parsed": True,
-            "last_analyzed_at": analyzed_at,
-        }
-        records.append(fallback_record)
+    """标记文件已完成解析（单条 UPDATE；缺少上传记录时补充最小信息并计算文件哈希，在数据库执行器中调用）"""
+    from app.db.crud import add_upload_record, mark_upload_analyzed
 
-    _save_upload_records(records)
+    try:
+        with SessionLocal() as db:
+            if not mark_upload_analyzed(db, file_path):
+                add_upload_record(db, file_path)
+    except Exception as e:
+        logger.warning(f"更新上传记录失败，已忽略: {e}")
 
 
 @router.post("/login", response_model=Token, tags=["auth"])
-async def login(credentials: LoginRequest, db: Session = Depends(get_db)):
+async def login(credentials: LoginRequest):
     """用户登录，返回 JWT"""
-    user = authenticate_user(db, credentials.username, credentials.password)
+    user = await authenticate_user(credentials.username, credentials.password)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="用户名或密码错误")
 
@@ -133,6 +112,66 @@ async def get_me(current_user: User = Depends(get_current_user)):
     return UserBase(username=current_user.username, is_admin=current_user.is_admin, created_at=current_user.created_at)
 
 
+@router.get("/auth/cache-stats", tags=["auth"])
+async def get_auth_cache_stats(_: User = Depends(require_admin)):
+    """管理员查看认证缓存命中率"""
+    return {"success": True, "data": principal_cache.stats()}
+
+
+@router.get("/debug/sql-report", tags=["debug"])
+async def get_sql_report(
+    limit: int = Query(50, ge=1, le=500, description="返回的最近请求条数"),
+    _: User = Depends(require_admin),
+):
+    """
+    管理员查看最近请求的 SQL 统计：按路径汇总的语句数/耗时、N+1 嫌疑语句及最近请求明细
+    """
+    return {"success": True, "data": sql_report.snapshot(limit)}
+
+
+@router.delete("/debug/sql-report", tags=["debug"])
+async def clear_sql_report(_: User = Depends(require_admin)):
+    """清空 SQL 统计报告"""
+    sql_report.clear()
+    return {"success": True, "message": "SQL 统计报告已清空"}
+
+
+@router.get("/debug/profile", tags=["debug"])
+async def profile_request(
+    request: Request,
+    target: str = Query(..., description="要剖析的 GET 请求路径（含查询参数），如 /api/departments/list?level=1&months=2025-01"),
+    mode: str = Query("cprofile", description="cprofile（按累计耗时排序的函数）或 sample（折叠栈采样）"),
+    top: int = Query(30, ge=1, le=500, description="cprofile 模式返回的函数数"),
+    memory: bool = Query(False, description="记录 Excel 分析各步骤的 tracemalloc 峰值内存"),
+    interval_ms: float = Query(5, ge=1, le=1000, description="sample 模式的采样间隔（毫秒）"),
+    _: User = Depends(require_admin),
+):
+    """
+    管理员在服务端重放一个 GET 请求并返回剖析报告（使用当前请求的认证信息）
+    """
+    if mode not in profiling.PROFILE_MODES:
+        raise HTTPException(status_code=400, detail=f"不支持的剖析模式: {mode}")
+    path, _sep, query_string = target.partition("?")
+    if not path.startswith("/api/") or path.startswith("/api/debug/"):
+        raise HTTPException(status_code=400, detail="只能剖析 /api/ 下的业务接口")
+    if not profiling.profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="已有剖析任务在运行，请稍后重试")
+
+    try:
+        session = profiling.ProfileSession(profiling.ProfileOptions(
+            mode=mode, top_n=top, memory=memory, sample_interval=interval_ms / 1000
+        ))
+        with profiling.activate(session):
+            response = await profiling.replay_request(request.app, request.scope, path, query_string)
+    except Exception as e:
+        logger.exception(f"剖析请求失败: {e}")
+        raise HTTPException(status_code=500, detail=f"剖析请求失败: {str(e)}")
+    finally:
+        profiling.profile_lock.release()
+
+    return {"success": True, "data": {"target": target, "response": response, **session.report()}}
+
+
 @router.post("/change-password", tags=["auth"])
 async def change_my_password(
     payload: PasswordChangeRequest,
@@ -145,7 +184,7 @@ async def change_my_password(
     if payload.new_password != payload.confirm_password:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="两次输入的新密码不一致")
 
-    change_password(db, current_user, payload.current_password, payload.new_password)
+    await change_password(db, current_user, payload.current_password, payload.new_password)
     return {"success": True, "message": "密码修改成功"}
 
 
@@ -169,7 +208,7 @@ async def create_user(
     db: Session = Depends(get_db),
 ):
     """管理员创建新用户"""
-    user = create_user_account(db, payload.username.strip(), payload.password, payload.is_admin)
+    user = await create_user_account(db, payload.username.strip(), payload.password, payload.is_admin)
     return UserBase(username=user.username, is_admin=user.is_admin, created_at=user.created_at)
 
 
@@ -189,7 +228,7 @@ async def update_user(
     if user.username == current_user.username and payload.is_active is False:
         raise HTTPException(status_code=400, detail="不能禁用当前登录账户")
 
-    updated = update_user_account(
+    updated = await update_user_account(
         db,
         user,
         password=payload.password,
@@ -231,20 +270,30 @@ async def list_uploads():
     """
     获取上传文件列表（所有用户可见）
     """
-    records = _load_upload_records()
-    result = []
+    from app.db.crud import list_upload_records
+
+    try:
+        with SessionLocal() as db:
+            records = list_upload_records(db)
+    except Exception as e:
+        logger.exception(f"获取上传记录失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取上传记录失败: {str(e)}")
+
     for item in records:
-        file_path = item.get("file_path", "")
-        exists = os.path.exists(file_path)
-        result.append({**item, "exists": exists})
-    return {"success": True, "data": result}
+        item["exists"] = os.path.exists(item["file_path"])
+    return {"success": True, "data": records}
 
 
 @router.get("/months")
-async def get_available_months(db: Session = Depends(get_db)):
+async def get_available_months(request: Request, db: Session = Depends(get_db)):
     """
     获取所有上传文件中的可用月份列表（从数据库获取）
     """
+    etag = make_etag(request, data_version.current())
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+
     try:
         from app.db.crud import get_available_months
         from app.db.models import Upload
@@ -258,10 +307,10 @@ async def get_available_months(db: Session = Depends(get_db)):
             months = get_available_months(db, upload.file_path)
             all_months.update(months)
 
-        return {
+        return with_etag(FastJSONResponse({
             "success": True,
             "data": sorted(list(all_months))
-        }
+        }), etag)
     except Exception as e:
         logger.exception(f"获取月份列表失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取月份列表失败: {str(e)}")
@@ -272,7 +321,7 @@ async def get_upload_progress(task_id: str):
     """
     获取上传进度
     """
-    progress = progress_manager.get_progress(task_id)
+    progress = await progress_manager.fetch_progress(task_id)
     
     if not progress:
         raise HTTPException(status_code=404, detail="任务不存在或已过期")
@@ -280,10 +329,59 @@ async def get_upload_progress(task_id: str):
     return {"success": True, "data": progress}
 
 
-def _process_upload_task(file_path: str, file_name: str, task_id: str):
-    """后台任务：处理文件上传和解析"""
+@router.get("/progress/{task_id}/stream")
+async def stream_upload_progress(task_id: str, request: Request):
+    """
+    通过 Server-Sent Events 推送上传进度
+
+    首个事件为完整快照（snapshot），之后只推送增量（progress / step / completed / failed）
+    """
+    if await progress_manager.fetch_progress(task_id) is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+
+    async def event_stream():
+        async for event in progress_manager.watch(task_id, PROGRESS_HEARTBEAT_SECONDS):
+            if await request.is_disconnected():
+                break
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {dumps(event).decode('utf-8')}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/progress/{task_id}/ws")
+async def websocket_upload_progress(websocket: WebSocket, task_id: str):
+    """
+    通过 WebSocket 推送上传进度（事件格式与 SSE 相同）
+    """
+    await websocket.accept()
+    if await progress_manager.fetch_progress(task_id) is None:
+        await websocket.close(code=4404, reason="任务不存在或已过期")
+        return
+
+    try:
+        async for event in progress_manager.watch(task_id, PROGRESS_HEARTBEAT_SECONDS):
+            if event is None:
+                event = {"type": "ping"}
+            await websocket.send_text(dumps(event).decode("utf-8"))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+def _ingest_upload(file_path: str, file_name: str, task_id: str) -> List[str]:
+    """解析文件并写入数据库，返回文件涉及的月份（失败时返回空列表）"""
     from app.db.database import SessionLocal
+    from app.services.database_parser import DatabaseParser
+    from app.services.excel_processor import ExcelProcessor
     db = SessionLocal()
+    touched_months = []
     try:
         progress_manager.update_progress(task_id, 30, "正在读取Excel文件...")
         progress_manager.add_step(task_id, f"✅ 文件已上传: {file_name} ({os.path.getsize(file_path) / 1024 / 1024:.2f} MB)")
@@ -292,7 +390,6 @@ def _process_upload_task(file_path: str, file_name: str, task_id: str):
         sheet_names = processor.get_sheet_names()
         progress_manager.add_step(task_id, f"📋 检测到 {len(sheet_names)} 个工作表: {', '.join(sheet_names)}")
         
-        file_size = os.path.getsize(file_path)
         progress_manager.update_progress(task_id, 40, "正在解析数据并写入数据库...")
 
         def progress_callback(progress: int, message: str):
@@ -300,7 +397,9 @@ def _process_upload_task(file_path: str, file_name: str, task_id: str):
             progress_manager.add_step(task_id, message)
 
         parser = DatabaseParser(file_path, progress_callback)
-        parse_stats = parser.parse_and_insert(db)
+        # 后台任务没有响应头可写，各阶段耗时随任务结果返回
+        timing = server_timing.TimingContext()
+        parse_stats = timing.run(parser.parse_and_insert, db)
         
         progress_manager.add_step(task_id, f"✅ 考勤记录: {parse_stats['attendance_count']} 条")
         progress_manager.add_step(task_id, f"✅ 机票记录: {parse_stats['flight_count']} 条")
@@ -310,23 +409,18 @@ def _process_upload_task(file_path: str, file_name: str, task_id: str):
         
         progress_manager.update_progress(task_id, 90, "正在保存上传记录...")
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        _upsert_upload_record({
-            "file_path": file_path,
-            "file_name": file_name,
-            "file_size": file_size,
-            "sheets": sheet_names,
-            "upload_time": timestamp,
-            "parsed": True,
-            "last_analyzed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        })
+        # 上传记录已由解析器写入 uploads 表，这里补充原始文件名和解析时间
+        from app.db.crud import get_available_months, mark_upload_analyzed
+        mark_upload_analyzed(db, file_path, file_name)
+        touched_months = get_available_months(db, file_path)
         
         progress_manager.update_progress(task_id, 100, "上传并解析完成")
         progress_manager.complete_task(task_id, {
             "file_path": file_path,
             "file_name": file_name,
             "upload_id": parse_stats.get("upload_id"),
-            "stats": parse_stats
+            "stats": parse_stats,
+            "timings": timing.summary()
         })
     except Exception as e:
         db.rollback()
@@ -338,6 +432,18 @@ def _process_upload_task(file_path: str, file_name: str, task_id: str):
         progress_manager.fail_task(task_id, error_msg)
     finally:
         db.close()
+        # 数据库内容已变化（解析失败时也可能已提交部分数据），使缓存的 ETag 与分析结果失效
+        data_version.bump()
+    return touched_months
+
+
+async def _process_upload_task(file_path: str, file_name: str, task_id: str):
+    """后台任务：在解析入库执行器中处理文件解析（多个上传依次解析），完成后预热涉及月份的分析结果"""
+    if execution.pending("ingest"):
+        progress_manager.add_step(task_id, "⏳ 等待其它文件解析完成...")
+    touched_months = await execution.run_ingest("upload", _ingest_upload, file_path, file_name, task_id)
+    if touched_months:
+        warmup.schedule_result_warmup(touched_months)
 
 
 @router.post("/upload", response_model=AnalysisResult)
@@ -386,8 +492,37 @@ async def upload_file(file: UploadFile = File(...), background_tasks: Background
         raise HTTPException(status_code=500, detail=f"文件上传失败: {error_msg}")
 
 
-@router.post("/analyze", response_model=AnalysisResult)
+def _resolve_months(
+    months: Optional[str],
+    quarter: Optional[int] = None,
+    year: Optional[int] = None
+) -> Optional[list[str]]:
+    """
+    解析月份筛选参数
+
+    优先使用 months（逗号分隔）；否则按 year + quarter 展开为季度内的月份，
+    仅提供 year 时展开为全年 12 个月。均未提供时返回 None（不过滤）。
+    """
+    if months:
+        months_list = [m.strip() for m in months.split(',') if m.strip()]
+        if months_list:
+            return months_list
+
+    if quarter is not None and quarter not in (1, 2, 3, 4):
+        raise HTTPException(status_code=400, detail="quarter 参数必须为 1-4")
+    if quarter and not year:
+        raise HTTPException(status_code=400, detail="指定 quarter 时必须同时提供 year 参数")
+
+    if year:
+        month_numbers = range((quarter - 1) * 3 + 1, quarter * 3 + 1) if quarter else range(1, 13)
+        return [f"{year}-{m:02d}" for m in month_numbers]
+
+    return None
+
+
+@router.api_route("/analyze", methods=["GET", "POST"], response_model=AnalysisResult)
 async def analyze_excel(
+    request: Request,
     file_path: Optional[str] = Query(None, description="文件路径（可选，如果不提供则从数据库读取）"),
     months: Optional[str] = Query(None, description="月份列表，逗号分隔 (例如: 2025-01,2025-02)"),
     quarter: Optional[int] = Query(None, description="季度 (1, 2, 3, 4)"),
@@ -397,33 +532,21 @@ async def analyze_excel(
     分析 Excel 文件，返回完整的 Dashboard 数据
     支持按月份、季度、年份筛选数据
     """
-    months_list = None
-    if months:
-        months_list = [m.strip() for m in months.split(',') if m.strip()]
+    months_list = _resolve_months(months, quarter, year)
 
     if not file_path:
-        if not (months_list or quarter or year):
+        if not months_list:
             raise HTTPException(status_code=400, detail="未指定文件路径时，必须提供 months、quarter 或 year 参数")
 
-        try:
-            from app.db.crud import get_dashboard_data
-            from app.db.database import get_db
-
-            db_gen = get_db()
-            db = next(db_gen)
+        etag = make_etag(request, data_version.current())
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
 
-            dashboard_data = get_dashboard_data(
-                db=db,
-                months=months_list,
-                quarter=quarter,
-                year=year
-            )
+        try:
+            dashboard_data = await cached_queries.dashboard(months_list)
 
-            return AnalysisResult(
-                success=True,
-                message="分析完成",
-                data=dashboard_data
-            )
+            return with_etag(analysis_response("分析完成", dashboard_data), etag)
         except Exception as e:
             logger.exception(f"数据库分析失败: {e}")
             raise HTTPException(status_code=500, detail=f"数据库分析失败: {str(e)}")
@@ -431,109 +554,11 @@ async def analyze_excel(
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="文件不存在")
 
-    if months_list or quarter or year:
-        logger.warning(f"Excel 文件分析暂不支持月份过滤，将返回全部数据。参数: months={months_list}, quarter={quarter}, year={year}")
-    
     try:
-        logger.info(f"开始分析文件: {file_path}")
-        overall_start = time.perf_counter()
-
-        def timed_step(step_name: str, func, *args, **kwargs):
-            step_start = time.perf_counter()
-            result = func(*args, **kwargs)
-            logger.info(f"{step_name}完成，用时 {(time.perf_counter() - step_start) * 1000:.0f}ms")
-            return result
-
-        processor = ExcelProcessor(file_path)
-        load_start = time.perf_counter()
-        processor.load_all_sheets(load_workbook_obj=False)
-        logger.info(f"文件加载完成，用时 {(time.perf_counter() - load_start) * 1000:.0f}ms")
-        
-        # 执行各项分析（部门Top 15，项目Top 20 + 其他）
-        project_costs, total_project_count = timed_step("项目成本归集", processor.aggregate_project_costs, top_n=20)
-        department_costs = timed_step("部门成本汇总", processor.calculate_department_costs, top_n=15)
-        anomalies = timed_step("考勤/差旅交叉验证", processor.cross_check_attendance_travel)
-        booking_behavior = timed_step("预订行为分析", processor.analyze_booking_behavior)
-        attendance_summary = timed_step("考勤汇总", processor.get_attendance_summary)
-        over_standard_stats = timed_step("超标统计", processor.count_over_standard_orders)
-        order_stats = timed_step("订单统计", processor.count_total_orders)
-        over_standard_breakdown = {
-            k: v for k, v in over_standard_stats.items() 
-            if k != 'flight_over_types'
-        }
-        flight_over_type_breakdown = over_standard_stats.get('flight_over_types', {})
-        
-        # 计算总览数据
-        total_cost = sum(item['total_cost'] for item in department_costs)
-        avg_work_hours = attendance_summary.get('avg_work_hours', 0)
-        holiday_avg_work_hours = attendance_summary.get('holiday_avg_work_hours', 0)
-        anomaly_count = len(anomalies)
-        
-        # 转换部门数据格式为前端期望的结构
-        department_stats = [
-            {
-                'dept': item['department'],
-                'cost': item['total_cost'],
-                'avg_hours': item.get('avg_hours', 0),
-                'holiday_avg_hours': item.get('holiday_avg_hours', 0),
-                'headcount': item.get('person_count', 0)
-            }
-            for item in department_costs
-        ]
-        
-        # 转换项目数据格式为前端期望的结构（现在是Top 20 + "其他"）
-        project_top10 = [
-            {
-                'code': item['project_code'],
-                'name': item['project_name'],
-                'cost': item['total_cost'],
-                'flight_cost': item.get('flight_cost', 0),
-                'hotel_cost': item.get('hotel_cost', 0),
-                'train_cost': item.get('train_cost', 0)
-            }
-            for item in project_costs
-        ]
-        
-        # 转换异常数据格式为前端期望的结构
-        anomaly_list = [
-            {
-                'date': item.get('date', ''),
-                'name': item.get('name', ''),
-                'dept': item.get('department', ''),
-                'type': item.get('anomaly_type', 'Unknown'),
-                'status': item.get('attendance_status', ''),
-                'detail': item.get('description', '')
-            }
-            for item in anomalies
-        ]
-        
-        # 构建符合前端期望的数据结构
-        dashboard_data = {
-            'summary': {
-                'total_cost': round(total_cost, 2),
-                'avg_work_hours': round(avg_work_hours, 2),
-                'holiday_avg_work_hours': round(holiday_avg_work_hours, 2),
-                'anomaly_count': anomaly_count,
-                'total_orders': order_stats.get('total', 0),
-                'order_breakdown': order_stats,
-                'over_standard_count': over_standard_stats.get('total', 0),
-                'over_standard_breakdown': over_standard_breakdown,
-                'flight_over_type_breakdown': flight_over_type_breakdown,
-                'total_project_count': total_project_count
-            },
-            'department_stats': department_stats,
-            'project_top10': project_top10,
-            'anomalies': anomaly_list
-        }
-
-        logger.info(f"分析流程结束，总耗时 {time.perf_counter() - overall_start:.2f}s")
-        _mark_file_analyzed(file_path)
+        dashboard_data = await _run_excel("analyze", _excel_tasks().build_dashboard, file_path, months_list)
+        await execution.run_db("analyze", _mark_file_analyzed, file_path)
 
-        return AnalysisResult(
-            success=True,
-            message="分析完成",
-            data=dashboard_data
-        )
+        return analysis_response("分析完成", dashboard_data)
     
     except Exception as e:
         logger.exception(f"分析失败: {e}")
@@ -549,29 +574,28 @@ async def export_results(file_path: str):
         raise HTTPException(status_code=404, detail="文件不存在")
     
     try:
-        processor = ExcelProcessor(file_path)
-        processor.load_all_sheets(load_workbook_obj=True)
-        
-        # 执行分析
-        results = {
-            'project_costs': processor.aggregate_project_costs(),
-            'department_costs': processor.calculate_department_costs(),
-            'anomalies': processor.cross_check_attendance_travel()
-        }
-        
-        # 回写到 Excel
-        output_path = processor.write_analysis_results(results)
-        
-        # 返回文件
-        return FileResponse(
-            path=output_path,
-            filename=os.path.basename(output_path),
-            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-    
+        # 执行分析；工作簿在响应时流式生成（原 Sheet 在 zip 层复制，只生成分析结果 Sheet）
+        results = await _run_excel("export", _excel_tasks().export_analysis, file_path)
+    except Exception as e:
+        logger.exception(f"导出失败: {e}")
+        raise HTTPException(status_code=500, detail=f"导出失败: {str(e)}")
+
+    # 在发送响应头之前打开源文件并改写目录，无法识别的文件（如 .xls）直接返回错误
+    try:
+        chunks = iter_workbook_with_sheet(file_path, analysis_result_rows(results))
+    except WorkbookFormatError as e:
+        raise HTTPException(status_code=400, detail=f"导出失败: {str(e)}")
     except Exception as e:
+        logger.exception(f"导出失败: {e}")
         raise HTTPException(status_code=500, detail=f"导出失败: {str(e)}")
 
+    download_name = f"{Path(file_path).stem}_analyzed.xlsx"
+    return StreamingResponse(
+        chunks,
+        media_type=XLSX_MEDIA_TYPE,
+        headers={"Content-Disposition": f"attachment; filename*=utf-8''{quote(download_name)}"}
+    )
+
 
 @router.get("/sheets/{file_path:path}")
 async def get_sheets(file_path: str):
@@ -582,19 +606,11 @@ async def get_sheets(file_path: str):
         raise HTTPException(status_code=404, detail="文件不存在")
     
     try:
-        processor = ExcelProcessor(file_path)
-        sheets = processor.load_all_sheets()
+        sheets = await _run_excel("sheets", _excel_tasks().list_sheets, file_path)
         
         return {
             "success": True,
-            "sheets": [
-                {
-                    "name": name,
-                    "rows": len(df),
-                    "columns": len(df.columns)
-                }
-                for name, df in sheets.items()
-            ]
+            "sheets": sheets
         }
     
     except Exception as e:
@@ -611,9 +627,10 @@ async def delete_file(file_path: str):
     
     try:
         os.remove(file_path)
-        # 同步删除记录
-        records = [r for r in _load_upload_records() if r.get("file_path") != file_path]
-        _save_upload_records(records)
+        # 同步删除记录（已导入数据库的数据仍保留）
+        from app.db.crud import delete_upload_record
+        with SessionLocal() as db:
+            delete_upload_record(db, file_path)
         return {"success": True, "message": "文件已删除"}
     
     except Exception as e:
@@ -634,7 +651,6 @@ async def clear_data(file_path: str):
     if upload_dir not in target_path.parents:
         raise HTTPException(status_code=400, detail="只能清除上传目录下的文件")
 
-    records = _load_upload_records()
     cleared_file = False
     removed_records = 0
 
@@ -647,15 +663,11 @@ async def clear_data(file_path: str):
                 shutil.rmtree(target_path)
                 cleared_file = True
 
-        filtered_records = []
-        for item in records:
-            item_path = item.get("file_path")
-            if item_path and Path(item_path).resolve() == target_path:
-                removed_records += 1
-                continue
-            filtered_records.append(item)
-
-        _save_upload_records(filtered_records)
+        from app.db.crud import delete_upload_record
+        with SessionLocal() as db:
+            removed_records = delete_upload_record(db, file_path)
+            if str(target_path) != file_path:
+                removed_records += delete_upload_record(db, str(target_path))
 
         return {
             "success": True,
@@ -671,8 +683,11 @@ async def clear_data(file_path: str):
 
 @router.get("/projects")
 async def get_all_projects(
+    request: Request,
     file_path: Optional[str] = Query(None, description="文件路径（可选，不提供则从数据库读取）"),
     months: Optional[str] = Query(None, description="月份列表，逗号分隔 (例如: 2025-01,2025-02)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="每页条数（数据库模式，不提供则返回全部）"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor（数据库模式）"),
     db: Session = Depends(get_db)
 ):
     """
@@ -682,27 +697,27 @@ async def get_all_projects(
 
     Args:
         file_path: Excel 文件路径（可选）
-        months: 月份列表（数据库模式下使用）
+        months: 月份列表（数据库模式下必填；Excel 模式下可选，用于按月筛选）
+        limit: 每页条数（数据库模式，按游标分页）
+        cursor: 上一页返回的 next_cursor
     """
     # 如果没有提供file_path，从数据库获取
     if not file_path:
         if not months:
             raise HTTPException(status_code=400, detail="数据库模式下必须提供months参数")
 
-        try:
-            from app.db.crud import get_all_projects_from_db
+        etag = make_etag(request, data_version.current())
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
 
+        try:
             months_list = [m.strip() for m in months.split(',') if m.strip()]
-            project_details = get_all_projects_from_db(db, months_list)
-
-            return AnalysisResult(
-                success=True,
-                message="获取项目详情成功",
-                data={
-                    "projects": project_details,
-                    "total_count": len(project_details)
-                }
-            )
+            page = await cached_queries.projects_page(months_list, limit, cursor)
+
+            return with_etag(analysis_list_response("获取项目详情成功", page, "projects"), etag)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.exception(f"从数据库获取项目详情失败: {e}")
             raise HTTPException(status_code=500, detail=f"获取项目详情失败: {str(e)}")
@@ -712,18 +727,18 @@ async def get_all_projects(
         raise HTTPException(status_code=404, detail="文件不存在")
 
     try:
-        processor = ExcelProcessor(file_path)
-        processor.load_all_sheets(load_workbook_obj=False)
-
-        project_details = processor.get_all_project_details()
+        project_details = await _run_excel(
+            "projects", _excel_tasks().project_details, file_path, _resolve_months(months)
+        )
 
-        return AnalysisResult(
-            success=True,
-            message="获取项目详情成功",
-            data={
+        return analysis_list_response(
+            "获取项目详情成功",
+            {
                 "projects": project_details,
-                "total_count": len(project_details)
-            }
+                "total_count": len(project_details),
+                "next_cursor": None
+            },
+            "projects"
         )
 
     except Exception as e:
@@ -733,9 +748,12 @@ async def get_all_projects(
 
 @router.get("/projects/{project_code}/orders")
 async def get_project_orders(
+    request: Request,
     project_code: str,
     file_path: Optional[str] = Query(None, description="文件路径（可选，不提供则从数据库读取）"),
     months: Optional[str] = Query(None, description="月份列表，逗号分隔 (例如: 2025-01,2025-02)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="每页条数（数据库模式，不提供则返回全部）"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor（数据库模式）"),
     db: Session = Depends(get_db)
 ):
     """
@@ -746,28 +764,35 @@ async def get_project_orders(
     Args:
         file_path: Excel 文件路径（可选）
         project_code: 项目代码
-        months: 月份列表（数据库模式下使用）
+        months: 月份列表（数据库模式下必填；Excel 模式下可选，用于按月筛选）
+        limit: 每页条数（数据库模式，按游标分页）
+        cursor: 上一页返回的 next_cursor
     """
     # 如果没有提供file_path，从数据库获取
     if not file_path:
         if not months:
             raise HTTPException(status_code=400, detail="数据库模式下必须提供months参数")
 
+        etag = make_etag(request, data_version.current())
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
         try:
             from app.db.crud import get_project_orders_from_db
 
             months_list = [m.strip() for m in months.split(',') if m.strip()]
-            order_records = get_project_orders_from_db(db, project_code, months_list)
-
-            return AnalysisResult(
-                success=True,
-                message="获取项目订单记录成功",
-                data={
-                    "project_code": project_code,
-                    "orders": order_records,
-                    "total_count": len(order_records)
-                }
+            page = await execution.run_db(
+                "project_orders", get_project_orders_from_db, db, project_code, months_list, limit, cursor
             )
+
+            return with_etag(analysis_list_response(
+                "获取项目订单记录成功",
+                {"project_code": project_code, **page},
+                "orders"
+            ), etag)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.exception(f"从数据库获取项目订单记录失败: {e}")
             raise HTTPException(status_code=500, detail=f"获取项目订单记录失败: {str(e)}")
@@ -777,19 +802,19 @@ async def get_project_orders(
         raise HTTPException(status_code=404, detail="文件不存在")
 
     try:
-        processor = ExcelProcessor(file_path)
-        processor.load_all_sheets(load_workbook_obj=False)
-
-        order_records = processor.get_project_order_records(project_code)
+        order_records = await _run_excel(
+            "project_orders", _excel_tasks().project_orders, file_path, project_code, _resolve_months(months)
+        )
 
-        return AnalysisResult(
-            success=True,
-            message="获取项目订单记录成功",
-            data={
+        return analysis_list_response(
+            "获取项目订单记录成功",
+            {
                 "project_code": project_code,
                 "orders": order_records,
-                "total_count": len(order_records)
-            }
+                "total_count": len(order_records),
+                "next_cursor": None
+            },
+            "orders"
         )
 
     except Exception as e:
@@ -798,25 +823,23 @@ async def get_project_orders(
 
 
 @router.get("/departments/hierarchy")
-async def get_department_hierarchy(file_path: str):
+async def get_department_hierarchy(
+    file_path: str,
+    months: Optional[str] = Query(None, description="月份列表，逗号分隔 (例如: 2025-01,2025-02)")
+):
     """
-    获取部门层级结构
+    获取部门层级结构（可按月份筛选）
     """
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="文件不存在")
 
     try:
-        processor = ExcelProcessor(file_path)
-        processor.load_all_sheets(load_workbook_obj=False)
-
-        hierarchy = processor.get_department_hierarchy()
-
-        return AnalysisResult(
-            success=True,
-            message="获取部门层级结构成功",
-            data=hierarchy
+        hierarchy = await _run_excel(
+            "department_hierarchy", _excel_tasks().department_hierarchy, file_path, _resolve_months(months)
         )
 
+        return analysis_response("获取部门层级结构成功", hierarchy)
+
     except Exception as e:
         logger.exception(f"获取部门层级结构失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取部门层级结构失败: {str(e)}")
@@ -824,6 +847,7 @@ async def get_department_hierarchy(file_path: str):
 
 @router.get("/departments/list")
 async def get_department_list(
+    request: Request,
     file_path: Optional[str] = Query(None, description="文件路径（可选，不提供则从数据库读取）"),
     level: int = Query(..., description="部门层级 (1=一级, 2=二级, 3=三级)"),
     parent: Optional[str] = Query(None, description="父部门名称（level>1时必需）"),
@@ -839,7 +863,7 @@ async def get_department_list(
         file_path: Excel 文件路径（可选）
         level: 部门层级 (1=一级, 2=二级, 3=三级)
         parent: 父部门名称（level>1时必需）
-        months: 月份列表（数据库模式下使用）
+        months: 月份列表（数据库模式下必填；Excel 模式下可选，用于按月筛选）
     """
     if level not in [1, 2, 3]:
         raise HTTPException(status_code=400, detail="部门层级必须是1、2或3")
@@ -852,22 +876,24 @@ async def get_department_list(
         if not months:
             raise HTTPException(status_code=400, detail="数据库模式下必须提供months参数")
 
-        try:
-            from app.db.crud import get_department_list_from_db
+        etag = make_etag(request, data_version.current())
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
 
+        try:
             months_list = [m.strip() for m in months.split(',') if m.strip()]
-            departments = get_department_list_from_db(db, level, parent, months_list)
+            departments = await cached_queries.department_list(level, parent, months_list)
 
-            return AnalysisResult(
-                success=True,
-                message="获取部门列表成功",
-                data={
+            return with_etag(analysis_response(
+                "获取部门列表成功",
+                {
                     "level": level,
                     "parent": parent,
                     "departments": departments,
                     "total_count": len(departments)
                 }
-            )
+            ), etag)
         except Exception as e:
             logger.exception(f"从数据库获取部门列表失败: {e}")
             raise HTTPException(status_code=500, detail=f"获取部门列表失败: {str(e)}")
@@ -877,15 +903,13 @@ async def get_department_list(
         raise HTTPException(status_code=404, detail="文件不存在")
 
     try:
-        processor = ExcelProcessor(file_path)
-        processor.load_all_sheets(load_workbook_obj=False)
-
-        departments = processor.get_department_list(level, parent)
+        departments = await _run_excel(
+            "department_list", _excel_tasks().department_list, file_path, level, parent, _resolve_months(months)
+        )
 
-        return AnalysisResult(
-            success=True,
-            message="获取部门列表成功",
-            data={
+        return analysis_response(
+            "获取部门列表成功",
+            {
                 "level": level,
                 "parent": parent,
                 "departments": departments,
@@ -900,6 +924,7 @@ async def get_department_list(
 
 @router.get("/departments/details")
 async def get_department_details(
+    request: Request,
     file_path: Optional[str] = Query(None, description="文件路径（可选，不提供则从数据库读取）"),
     department_name: str = Query(..., description="部门名称"),
     level: int = Query(3, description="部门层级 (1=一级, 2=二级, 3=三级，默认3)"),
@@ -915,7 +940,7 @@ async def get_department_details(
         file_path: Excel 文件路径（可选）
         department_name: 部门名称
         level: 部门层级 (1=一级, 2=二级, 3=三级，默认3)
-        months: 月份列表（数据库模式下使用）
+        months: 月份列表（数据库模式下必填；Excel 模式下可选，用于按月筛选）
     """
     if level not in [1, 2, 3]:
         raise HTTPException(status_code=400, detail="部门层级必须是1、2或3")
@@ -925,20 +950,23 @@ async def get_department_details(
         if not months:
             raise HTTPException(status_code=400, detail="数据库模式下必须提供months参数")
 
+        etag = make_etag(request, data_version.current())
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
         try:
             from app.db.crud import get_department_details_from_db
 
             months_list = [m.strip() for m in months.split(',') if m.strip()]
-            details = get_department_details_from_db(db, department_name, level, months_list)
+            details = await execution.run_db(
+                "department_details", get_department_details_from_db, db, department_name, level, months_list
+            )
 
             if not details:
                 raise HTTPException(status_code=404, detail=f"未找到部门: {department_name}")
 
-            return AnalysisResult(
-                success=True,
-                message="获取部门详情成功",
-                data=details
-            )
+            return with_etag(analysis_response("获取部门详情成功", details), etag)
         except HTTPException:
             raise
         except Exception as e:
@@ -950,19 +978,14 @@ async def get_department_details(
         raise HTTPException(status_code=404, detail="文件不存在")
 
     try:
-        processor = ExcelProcessor(file_path)
-        processor.load_all_sheets(load_workbook_obj=False)
-
-        details = processor.get_department_detail_metrics(department_name, level)
+        details = await _run_excel(
+            "department_details", _excel_tasks().department_details, file_path, department_name, level, _resolve_months(months)
+        )
 
         if not details:
             raise HTTPException(status_code=404, detail=f"未找到部门: {department_name}")
 
-        return AnalysisResult(
-            success=True,
-            message="获取部门详情成功",
-            data=details
-        )
+        return analysis_response("获取部门详情成功", details)
 
     except HTTPException:
         raise
@@ -973,6 +996,7 @@ async def get_department_details(
 
 @router.get("/departments/level1/statistics")
 async def get_level1_department_statistics(
+    request: Request,
     file_path: Optional[str] = Query(None, description="文件路径（可选，不提供则从数据库读取）"),
     level1_name: str = Query(..., description="一级部门名称"),
     months: Optional[str] = Query(None, description="月份列表，逗号分隔 (例如: 2025-01)"),
@@ -986,7 +1010,7 @@ async def get_level1_department_statistics(
     Args:
         file_path: Excel 文件路径（可选）
         level1_name: 一级部门名称
-        months: 月份列表（数据库模式下使用）
+        months: 月份列表（数据库模式下必填；Excel 模式下可选，用于按月筛选）
 
     Returns:
         包含以下统计数据的字典:
@@ -1002,20 +1026,23 @@ async def get_level1_department_statistics(
         if not months:
             raise HTTPException(status_code=400, detail="数据库模式下必须提供months参数")
 
+        etag = make_etag(request, data_version.current())
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
         try:
             from app.db.crud import get_level1_department_statistics_from_db
 
             months_list = [m.strip() for m in months.split(',') if m.strip()]
-            statistics = get_level1_department_statistics_from_db(db, level1_name, months_list)
+            statistics = await execution.run_db(
+                "department_statistics", get_level1_department_statistics_from_db, db, level1_name, months_list
+            )
 
             if not statistics:
                 raise HTTPException(status_code=404, detail=f"未找到一级部门: {level1_name}")
 
-            return AnalysisResult(
-                success=True,
-                message="获取一级部门统计数据成功",
-                data=statistics
-            )
+            return with_etag(analysis_response("获取一级部门统计数据成功", statistics), etag)
         except HTTPException:
             raise
         except Exception as e:
@@ -1027,19 +1054,14 @@ async def get_level1_department_statistics(
         raise HTTPException(status_code=404, detail="文件不存在")
 
     try:
-        processor = ExcelProcessor(file_path)
-        processor.load_all_sheets(load_workbook_obj=False)
-
-        statistics = processor.get_level1_department_statistics(level1_name)
+        statistics = await _run_excel(
+            "department_statistics", _excel_tasks().level1_statistics, file_path, level1_name, _resolve_months(months)
+        )
 
         if not statistics:
             raise HTTPException(status_code=404, detail=f"未找到一级部门: {level1_name}")
 
-        return AnalysisResult(
-            success=True,
-            message="获取一级部门统计数据成功",
-            data=statistics
-        )
+        return analysis_response("获取一级部门统计数据成功", statistics)
 
     except HTTPException:
         raise
@@ -1050,6 +1072,7 @@ async def get_level1_department_statistics(
 
 @router.get("/departments/level2/statistics")
 async def get_level2_department_statistics(
+    request: Request,
     file_path: Optional[str] = Query(None, description="文件路径（可选，不提供则从数据库读取）"),
     level2_name: str = Query(..., description="二级部门名称"),
     months: Optional[str] = Query(None, description="月份列表，逗号分隔 (例如: 2025-01)"),
@@ -1063,7 +1086,7 @@ async def get_level2_department_statistics(
     Args:
         file_path: Excel 文件路径（可选）
         level2_name: 二级部门名称
-        months: 月份列表（数据库模式下使用）
+        months: 月份列表（数据库模式下必填；Excel 模式下可选，用于按月筛选）
 
     Returns:
         包含以下统计数据的字典:
@@ -1079,20 +1102,23 @@ async def get_level2_department_statistics(
         if not months:
             raise HTTPException(status_code=400, detail="数据库模式下必须提供months参数")
 
+        etag = make_etag(request, data_version.current())
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
         try:
             from app.db.crud import get_level2_department_statistics_from_db
 
             months_list = [m.strip() for m in months.split(',') if m.strip()]
-            statistics = get_level2_department_statistics_from_db(db, level2_name, months_list)
+            statistics = await execution.run_db(
+                "department_statistics", get_level2_department_statistics_from_db, db, level2_name, months_list
+            )
 
             if not statistics:
                 raise HTTPException(status_code=404, detail=f"未找到二级部门: {level2_name}")
 
-            return AnalysisResult(
-                success=True,
-                message="获取二级部门统计数据成功",
-                data=statistics
-            )
+            return with_etag(analysis_response("获取二级部门统计数据成功", statistics), etag)
         except HTTPException:
             raise
         except Exception as e:
@@ -1103,19 +1129,14 @@ async def get_level2_department_statistics(
         raise HTTPException(status_code=404, detail="文件不存在")
 
     try:
-        processor = ExcelProcessor(file_path)
-        processor.load_all_sheets(load_workbook_obj=False)
-
-        statistics = processor.get_level2_department_statistics(level2_name)
+        statistics = await _run_excel(
+            "department_statistics", _excel_tasks().level2_statistics, file_path, level2_name, _resolve_months(months)
+        )
 
         if not statistics:
             raise HTTPException(status_code=404, detail=f"未找到二级部门: {level2_name}")
 
-        return AnalysisResult(
-            success=True,
-            message="获取二级部门统计数据成功",
-            data=statistics
-        )
+        return analysis_response("获取二级部门统计数据成功", statistics)
 
     except HTTPException:
         raise
@@ -1155,6 +1176,7 @@ async def delete_month(
             raise HTTPException(status_code=400, detail="月份格式错误，应为 YYYY-MM")
 
         result = delete_month_data(db, month)
+        data_version.bump()
 
         return {
             "success": True,
@@ -1171,8 +1193,11 @@ async def delete_month(
 
 @router.get("/anomalies")
 async def get_anomalies(
+    request: Request,
     file_path: Optional[str] = Query(None, description="文件路径（可选，不提供则从数据库读取）"),
     months: Optional[str] = Query(None, description="月份列表，逗号分隔 (例如: 2025-01,2025-02)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="每页条数（数据库模式，不提供则返回全部）"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor（数据库模式）"),
     db: Session = Depends(get_db)
 ):
     """
@@ -1182,34 +1207,30 @@ async def get_anomalies(
 
     Args:
         file_path: Excel 文件路径（可选）
-        months: 月份列表（数据库模式下使用）
+        months: 月份列表（数据库模式下必填；Excel 模式下可选，用于按月筛选）
+        limit: 每页条数（数据库模式，按游标分页）
+        cursor: 上一页返回的 next_cursor
     """
     # 如果没有提供file_path，从数据库获取
     if not file_path:
         if not months:
             raise HTTPException(status_code=400, detail="数据库模式下必须提供months参数")
 
+        etag = make_etag(request, data_version.current())
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+
         try:
-            from app.db.crud import get_anomalies_by_month
+            from app.db.crud import get_anomalies_page
 
             months_list = [m.strip() for m in months.split(',') if m.strip()]
-            # 获取所有月份的异常记录
-            all_anomalies = []
-            for month in months_list:
-                anomalies = get_anomalies_by_month(db, month, limit=1000)
-                all_anomalies.extend(anomalies)
-
-            # 按日期降序排序
-            all_anomalies.sort(key=lambda x: x['date'], reverse=True)
-
-            return AnalysisResult(
-                success=True,
-                message="获取异常记录成功",
-                data={
-                    "anomalies": all_anomalies,
-                    "total_count": len(all_anomalies)
-                }
-            )
+            # 按 (日期, ID) 降序返回所有月份的异常记录
+            page = await execution.run_db("anomalies", get_anomalies_page, db, months_list, limit, cursor)
+
+            return with_etag(analysis_list_response("获取异常记录成功", page, "anomalies"), etag)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.exception(f"从数据库获取异常记录失败: {e}")
             raise HTTPException(status_code=500, detail=f"获取异常记录失败: {str(e)}")
@@ -1219,18 +1240,18 @@ async def get_anomalies(
         raise HTTPException(status_code=404, detail="文件不存在")
 
     try:
-        from app.db.crud import get_anomalies
-
-        months_list = [m.strip() for m in months.split(',')] if months else None
-        anomalies = get_anomalies(db, file_path, months=months_list, limit=1000)
+        anomalies = await _run_excel(
+            "anomalies", _excel_tasks().anomaly_records, file_path, _resolve_months(months), 1000
+        )
 
-        return AnalysisResult(
-            success=True,
-            message="获取异常记录成功",
-            data={
+        return analysis_list_response(
+            "获取异常记录成功",
+            {
                 "anomalies": anomalies,
-                "total_count": len(anomalies)
-            }
+                "total_count": len(anomalies),
+                "next_cursor": None
+            },
+            "anomalies"
         )
 
     except Exception as e:
@@ -42,11 +42,49 @@ class Settings(BaseSettings):
     jwt_algorithm: str = "HS256"
     default_admin_username: str = "admin"
     initial_admin_password_file: str = str(DEFAULT_INITIAL_PASSWORD_FILE)
+    auth_cache_ttl_seconds: int = 60  # 认证用户缓存时长，0 表示关闭
+    auth_cache_max_entries: int = 1024
 
     # 文件上传配置
     upload_dir: str = "./uploads"
     max_upload_size: int = 50  # MB
 
+    # 计算执行层配置
+    excel_executor: str = "process"  # process | thread
+    excel_workers: int = 2
+    # SQLite 使用 WAL 模式，每个会话独立连接，读查询可并发；解析入库在独立的单线程执行器中串行执行
+    db_workers: int = 4
+    endpoint_concurrency: int = 2  # 每个接口的默认最大并发数
+    hash_workers: int = 2  # bcrypt 密码哈希/校验线程数
+    hash_queue_limit: int = 32  # 排队等待的哈希任务上限，超出时返回 503
+
+    # SQL 统计：每个请求的语句数/耗时/重复语句（N+1），调试模式下附加到响应头
+    sql_instrumentation: bool = True
+    sql_report_size: int = 200  # 滚动报告保留的最近请求数
+    sql_n_plus_one_threshold: int = 5  # 同一语句形态在一个请求内执行达到该次数视为 N+1 嫌疑
+
+    # 日志写入放到后台线程（QueueHandler + QueueListener），请求线程不等待磁盘 IO
+    log_async: bool = True
+
+    # 进程内指标（Prometheus 文本格式，GET /metrics）
+    metrics_enabled: bool = True
+
+    # 启动后在后台导入分析模块（pandas/openpyxl）并预先启动计算进程池，首个分析请求不再承担冷启动耗时
+    startup_warmup: bool = True
+    startup_warmup_delay: float = 2.0  # 启动后延迟开始预热（秒），导入期间占用 GIL，避免拖慢最初的健康检查
+
+    # 数据库模式分析结果缓存（按数据版本失效）及预热
+    result_cache_size: int = 128  # 进程内缓存的结果条数，0 表示关闭
+    result_warmup: bool = True  # 上传解析完成后预计算涉及月份的 Dashboard / 部门列表 / 项目列表
+    result_warmup_recent_months: int = 3  # 启动预热（startup_warmup）时预计算最近 N 个月
+
+    # 响应头输出 W3C Server-Timing（Excel 分析步骤、crud 查询、SQL 总耗时等）
+    server_timing: bool = True
+
+    # 上传进度配置：多 worker 部署时使用 sqlite（各 worker 共享进度）
+    progress_backend: str = "memory"  # memory | sqlite
+    progress_ttl_hours: int = 24  # 进度记录保留时长，过期后由 cleanup_old_tasks 清理
+
     @field_validator("allowed_origins", mode="before")
     @classmethod
     def split_origins(cls, value):
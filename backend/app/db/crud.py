@@ -1,17 +1,27 @@
 """CRUD operations for database access."""
+import base64
+import binascii
 import hashlib
 import json
-from datetime import datetime, time, timedelta
-from typing import List, Optional, Tuple
-import pandas as pd
-from sqlalchemy import func, and_, or_, select, text, alias, case, bindparam
+import math
+import os
+from datetime import datetime, time, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Sequence, Tuple
+from sqlalchemy import func, and_, or_, select, text, alias, case, bindparam, Float
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, aliased
 from app.db.models import (
     Upload, Department, Project, Employee,
     AttendanceRecord, TravelExpense, Anomaly
 )
+from app.services import server_timing
 from app.utils.logger import get_logger
 
+if TYPE_CHECKING:
+    # pandas is only needed by the ingest helpers; imported there on first use
+    import pandas as pd
+
 logger = get_logger(__name__)
 
 
@@ -64,6 +74,56 @@ def _serialize_anomaly_row(row, date_format: str = '%Y-%m-%d') -> dict:
     }
 
 
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode keyset values (datetimes as ISO strings) into an opaque cursor."""
+    payload = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(',', ':')
+    )
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: Optional[str], kinds: Sequence[type]) -> Optional[list]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor: Opaque cursor string (None means first page)
+        kinds: Expected type of each key value (datetime, int or float)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(kinds):
+            raise ValueError
+        return [
+            datetime.fromisoformat(value) if kind is datetime else kind(value)
+            for kind, value in zip(kinds, values)
+        ]
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+
+def _keyset_after(sort_column, id_column, cursor_values: Optional[list]):
+    """Condition selecting rows strictly after the cursor for (sort DESC, id DESC) ordering."""
+    if not cursor_values:
+        return None
+    sort_value, id_value = cursor_values
+    return or_(sort_column < sort_value, and_(sort_column == sort_value, id_column < id_value))
+
+
+def _split_page(rows: list, limit: Optional[int], key: Callable[[Any], Sequence[Any]]) -> Tuple[list, Optional[str]]:
+    """Trim the look-ahead row fetched with limit + 1 and build the next cursor."""
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(key(rows[-1]))
+
+
 def calculate_file_hash(file_path: str) -> str:
     """Calculate SHA256 hash of a file."""
     sha256_hash = hashlib.sha256()
@@ -77,7 +137,7 @@ def get_or_create_department(db: Session, name: str, level: int = 1, parent_id:
     """Get or create a department, returning its ID."""
     import pandas as pd
 
-    if not name or (isinstance(name, str) and name.strip() == '') or (isinstance(name, float) and pd.isna(name)):
+    if not name or (isinstance(name, str) and name.strip() == '') or (isinstance(name, float) and math.isnan(name)):
         name = '未知部门'
 
     # Query by (name, level, parent_id) to support multi-level hierarchy
@@ -114,11 +174,11 @@ def get_or_create_department_hierarchy(db: Session, level1_name: str, level2_nam
     level1_id = get_or_create_department(db, level1_name, level=1, parent_id=None)
 
     level2_id = 0
-    if level2_name and not (isinstance(level2_name, float) and pd.isna(level2_name)):
+    if level2_name and not (isinstance(level2_name, float) and math.isnan(level2_name)):
         level2_id = get_or_create_department(db, level2_name, level=2, parent_id=level1_id)
 
     level3_id = 0
-    if level3_name and not (isinstance(level3_name, float) and pd.isna(level3_name)) and level2_id > 0:
+    if level3_name and not (isinstance(level3_name, float) and math.isnan(level3_name)) and level2_id > 0:
         level3_id = get_or_create_department(db, level3_name, level=3, parent_id=level2_id)
 
     return level1_id, level2_id, level3_id
@@ -128,9 +188,9 @@ def get_or_create_project(db: Session, code: str, name: str) -> int:
     """Get or create a project, returning its ID."""
     import pandas as pd
     
-    if not code or (isinstance(code, str) and code.strip() == '') or (isinstance(code, float) and pd.isna(code)):
+    if not code or (isinstance(code, str) and code.strip() == '') or (isinstance(code, float) and math.isnan(code)):
         code = '未知项目'
-    if not name or (isinstance(name, str) and name.strip() == '') or (isinstance(name, float) and pd.isna(name)):
+    if not name or (isinstance(name, str) and name.strip() == '') or (isinstance(name, float) and math.isnan(name)):
         name = '未知项目'
     
     project = db.query(Project).filter_by(code=code).first()
@@ -145,7 +205,7 @@ def get_or_create_employee(db: Session, name: str, level1_id: int, level2_id: Op
     """Get or create an employee with full department hierarchy, returning their ID."""
     import pandas as pd
 
-    if not name or (isinstance(name, str) and name.strip() == '') or (isinstance(name, float) and pd.isna(name)):
+    if not name or (isinstance(name, str) and name.strip() == '') or (isinstance(name, float) and math.isnan(name)):
         name = '未知员工'
 
     employee = db.query(Employee).filter_by(name=name).first()
@@ -185,6 +245,7 @@ def create_or_get_upload_record(
     existing_upload = db.query(Upload).filter_by(file_hash=file_hash).first()
     
     if existing_upload:
+        existing_upload.upload_time = datetime.utcnow()
         existing_upload.file_path = file_path
         existing_upload.file_name = file_name
         existing_upload.file_size = file_size
@@ -212,7 +273,188 @@ def delete_upload_data(db: Session, upload_id: int):
     db.flush()
 
 
-def batch_insert_attendance(db: Session, upload_id: int, df: pd.DataFrame) -> int:
+def _local_time_str(value: Optional[datetime], fmt: str) -> Optional[str]:
+    """Format a naive UTC datetime from the uploads table in local time."""
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc).astimezone().strftime(fmt)
+
+
+def list_upload_records(db: Session) -> List[dict]:
+    """
+    List upload metadata in the legacy upload_records.json shape.
+
+    Reads only the columns needed for the listing, oldest upload first.
+    """
+    rows = db.query(
+        Upload.file_path, Upload.file_name, Upload.file_size, Upload.sheets_info,
+        Upload.upload_time, Upload.parse_status, Upload.last_analyzed
+    ).order_by(Upload.upload_time, Upload.id).all()
+
+    records = []
+    for file_path, file_name, file_size, sheets_info, upload_time, parse_status, last_analyzed in rows:
+        try:
+            sheets = json.loads(sheets_info) if sheets_info else []
+        except ValueError:
+            sheets = []
+        records.append({
+            "file_path": file_path,
+            "file_name": file_name,
+            "file_size": file_size,
+            "sheets": sheets,
+            "upload_time": _local_time_str(upload_time, "%Y%m%d_%H%M%S"),
+            "parsed": parse_status == "parsed",
+            "last_analyzed_at": _local_time_str(last_analyzed, "%Y-%m-%d %H:%M:%S"),
+        })
+    return records
+
+
+def mark_upload_analyzed(db: Session, file_path: str, file_name: Optional[str] = None) -> bool:
+    """
+    Mark an upload as parsed/analyzed with a single UPDATE statement.
+
+    Returns False when no upload row exists for file_path.
+    """
+    values = {"parse_status": "parsed", "last_analyzed": datetime.utcnow()}
+    if file_name:
+        values["file_name"] = file_name
+    updated = db.query(Upload).filter(Upload.file_path == file_path).update(
+        values, synchronize_session=False
+    )
+    db.commit()
+    return updated > 0
+
+
+def add_upload_record(db: Session, file_path: str) -> bool:
+    """
+    Insert a minimal upload row for a file that was never parsed into the database.
+
+    Skips files whose content is already recorded under another path.
+    """
+    file_hash = calculate_file_hash(file_path)
+    if db.query(Upload.id).filter(Upload.file_hash == file_hash).first():
+        return False
+    db.add(Upload(
+        file_name=Path(file_path).name,
+        file_path=file_path,
+        file_size=os.path.getsize(file_path),
+        file_hash=file_hash,
+        sheets_info=json.dumps([]),
+        parse_status="parsed",
+        last_analyzed=datetime.utcnow(),
+    ))
+    db.commit()
+    return True
+
+
+def delete_upload_record(db: Session, file_path: str) -> int:
+    """
+    Delete upload rows for file_path that no longer own any imported data.
+
+    Rows whose attendance/travel/anomaly data is still in the database are kept
+    (the data stays queryable; delete_month_data removes them with their data).
+    Returns the number of deleted rows.
+    """
+    uploads = db.query(Upload).filter(Upload.file_path == file_path).all()
+    deleted = 0
+    for upload in uploads:
+        has_data = (
+            db.query(AttendanceRecord.id).filter_by(upload_id=upload.id).first()
+            or db.query(TravelExpense.id).filter_by(upload_id=upload.id).first()
+            or db.query(Anomaly.id).filter_by(upload_id=upload.id).first()
+        )
+        if not has_data:
+            db.delete(upload)
+            deleted += 1
+    db.commit()
+    return deleted
+
+
+def migrate_upload_records_file(db: Session, path: Path) -> int:
+    """
+    Import a legacy upload_records.json into the uploads table (one-off).
+
+    Existing rows get the original file name and analysis time; files without a
+    row are inserted if they still exist on disk. The JSON file is renamed to
+    *.migrated afterwards. Returns the number of imported records.
+
+    Every worker runs this at startup: the file is first renamed to a claim name
+    (atomic), so only one worker imports it and the others return 0. A failed
+    import is rolled back and the file is put back for the next start.
+    """
+    claimed = path.with_name(path.name + ".migrating")
+    try:
+        path.rename(claimed)
+    except FileNotFoundError:
+        # Nothing to migrate, or another worker has claimed the file
+        return 0
+    except OSError as e:
+        logger.warning(f"Failed to claim legacy upload records {path}: {e}")
+        return 0
+
+    try:
+        imported = _import_upload_records(db, claimed)
+    except (OSError, ValueError, IntegrityError) as e:
+        db.rollback()
+        logger.warning(f"Failed to migrate legacy upload records {path}: {e}")
+        try:
+            claimed.rename(path)
+        except OSError:
+            pass
+        return 0
+
+    claimed.rename(path.with_name(path.name + ".migrated"))
+    logger.info(f"Migrated {imported} legacy upload records from {path}")
+    return imported
+
+
+def _import_upload_records(db: Session, path: Path) -> int:
+    """Import the records of a claimed upload_records.json and commit."""
+    records = json.loads(path.read_text(encoding="utf-8"))
+
+    imported = 0
+    for record in records if isinstance(records, list) else []:
+        file_path = record.get("file_path")
+        if not file_path:
+            continue
+        last_analyzed = None
+        if record.get("last_analyzed_at"):
+            try:
+                last_analyzed = datetime.strptime(
+                    record["last_analyzed_at"], "%Y-%m-%d %H:%M:%S"
+                ).astimezone(timezone.utc).replace(tzinfo=None)
+            except ValueError:
+                pass
+
+        upload = db.query(Upload).filter(Upload.file_path == file_path).first()
+        if upload is None:
+            if not os.path.exists(file_path):
+                continue
+            file_hash = calculate_file_hash(file_path)
+            if db.query(Upload.id).filter(Upload.file_hash == file_hash).first():
+                continue
+            upload = Upload(
+                file_path=file_path,
+                file_size=os.path.getsize(file_path),
+                file_hash=file_hash,
+                sheets_info=json.dumps(record.get("sheets") or []),
+                parse_status="parsed" if record.get("parsed") else "pending",
+            )
+            db.add(upload)
+        if record.get("file_name"):
+            upload.file_name = record["file_name"]
+        elif upload.file_name is None:
+            upload.file_name = Path(file_path).name
+        if last_analyzed is not None and upload.last_analyzed is None:
+            upload.last_analyzed = last_analyzed
+        imported += 1
+
+    db.commit()
+    return imported
+
+
+@server_timing.timed("db.insert_attendance")
+def batch_insert_attendance(db: Session, upload_id: int, df: "pd.DataFrame") -> int:
     """Batch insert attendance records from DataFrame."""
     import pandas as pd
 
@@ -304,10 +546,11 @@ def batch_insert_attendance(db: Session, upload_id: int, df: pd.DataFrame) -> in
     return len(records)
 
 
+@server_timing.timed("db.insert_travel")
 def batch_insert_travel_expenses(
     db: Session,
     upload_id: int,
-    df: pd.DataFrame,
+    df: "pd.DataFrame",
     expense_type: str
 ) -> int:
     """Batch insert travel expense records from DataFrame."""
@@ -420,8 +663,11 @@ def batch_insert_travel_expenses(
     return len(records)
 
 
+@server_timing.timed("db.insert_anomalies")
 def batch_insert_anomalies(db: Session, upload_id: int, anomalies: List[dict]) -> int:
     """Batch insert anomaly records."""
+    import pandas as pd
+
     records = []
     for anomaly in anomalies:
         dept_name = anomaly.get('dept') or anomaly.get('department') or '未知部门'
@@ -551,6 +797,7 @@ def get_anomalies(
     return [_serialize_anomaly_row(row) for row in result]
 
 
+@server_timing.timed("db.available_months")
 def get_available_months(db: Session, file_path: str) -> List[str]:
     """Get list of available months (YYYY-MM format) for a file."""
     upload = db.query(Upload).filter_by(file_path=file_path).first()
@@ -1379,6 +1626,7 @@ def get_dashboard_summary_by_month(db: Session, month: str) -> dict:
     return get_dashboard_summary(db, [month])
 
 
+@server_timing.timed("db.summary")
 def get_dashboard_summary(db: Session, months: List[str]) -> dict:
     """Get dashboard summary aggregated from ALL files for given months (multi-month supported)."""
     ranges = _month_ranges(months)
@@ -1441,6 +1689,7 @@ def get_department_stats_by_month(db: Session, month: str, top_n: int = 15) -> L
     return get_department_stats(db, [month], top_n)
 
 
+@server_timing.timed("db.department_stats")
 def get_department_stats(db: Session, months: List[str], top_n: int = 15) -> List[dict]:
     """Get department statistics aggregated from ALL files for the given months."""
     ranges = _month_ranges(months)
@@ -1511,6 +1760,7 @@ def get_project_stats_by_month(db: Session, month: str, top_n: int = 20) -> List
     return get_project_stats(db, [month], top_n)
 
 
+@server_timing.timed("db.project_stats")
 def get_project_stats(db: Session, months: List[str], top_n: int = 20) -> List[dict]:
     """Get project statistics aggregated from ALL files for the given months."""
     ranges = _month_ranges(months)
@@ -1563,17 +1813,16 @@ def get_anomalies_by_month(db: Session, month: str, limit: int = 50) -> List[dic
     return get_anomalies(db, [month], limit)
 
 
-def get_anomalies(db: Session, months: List[str], limit: int = 200) -> List[dict]:
-    """Get anomalies aggregated from ALL files for the given months."""
+def _anomaly_query(db: Session, months: List[str]):
+    """Base query for anomalies of the given months, or None if nothing matches."""
     ranges = _month_ranges(months)
     upload_ids = get_all_uploads_for_months(db, months)
 
     if not ranges or not upload_ids:
-        return []
-
-    date_filter_anomaly = _date_range_filter(Anomaly.date, ranges)
+        return None
 
-    results = db.query(
+    return db.query(
+        Anomaly.id.label('id'),
         Anomaly.date.label('date'),
         Employee.name.label('name'),
         Department.name.label('dept'),
@@ -1587,13 +1836,68 @@ def get_anomalies(db: Session, months: List[str], limit: int = 200) -> List[dict
         Department, Employee.department_id == Department.id
     ).filter(
         Anomaly.upload_id.in_(upload_ids),
-        date_filter_anomaly,
+        _date_range_filter(Anomaly.date, ranges),
         Anomaly.attendance_status == '上班'
-    ).order_by(
-        Anomaly.date.desc()
-    ).limit(limit).all()
+    )
+
+
+def _fetch_anomaly_rows(db: Session, months: List[str], limit: Optional[int], cursor: Optional[str]) -> list:
+    """Fetch anomaly rows ordered by (date DESC, id DESC), one past limit for paging."""
+    query = _anomaly_query(db, months)
+    if query is None:
+        return []
+
+    after = _keyset_after(Anomaly.date, Anomaly.id, decode_cursor(cursor, (datetime, int)))
+    if after is not None:
+        query = query.filter(after)
+    query = query.order_by(Anomaly.date.desc(), Anomaly.id.desc())
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query.all()
 
-    return [_serialize_anomaly_row(row, '%Y/%m/%d') for row in results]
+
+@server_timing.timed("db.anomalies")
+def get_anomalies(db: Session, months: List[str], limit: int = 200, cursor: Optional[str] = None) -> List[dict]:
+    """Get anomalies aggregated from ALL files for the given months."""
+    rows = _fetch_anomaly_rows(db, months, limit, cursor)[:limit]
+    return [_serialize_anomaly_row(row, '%Y/%m/%d') for row in rows]
+
+
+@server_timing.timed("db.anomaly_count")
+def count_anomalies(db: Session, months: List[str]) -> int:
+    """Exact number of anomalies for the given months (not capped by any page size)."""
+    query = _anomaly_query(db, months)
+    if query is None:
+        return 0
+    return query.with_entities(func.count(Anomaly.id)).scalar() or 0
+
+
+@server_timing.timed("db.anomalies_page")
+def get_anomalies_page(
+    db: Session,
+    months: List[str],
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> dict:
+    """
+    Get one page of anomalies using keyset pagination on (date, id).
+
+    Args:
+        db: Database session
+        months: List of months to filter (YYYY-MM format)
+        limit: Page size (None returns all remaining rows)
+        cursor: Cursor returned as next_cursor by the previous page
+
+    Returns:
+        Dict with anomalies, exact total_count and next_cursor (None on the last page)
+    """
+    rows = _fetch_anomaly_rows(db, months, limit, cursor)
+    rows, next_cursor = _split_page(rows, limit, lambda row: (row.date, row.id))
+    return {
+        'anomalies': [_serialize_anomaly_row(row, '%Y/%m/%d') for row in rows],
+        'total_count': count_anomalies(db, months),
+        'next_cursor': next_cursor
+    }
 
 
 def get_total_project_count_by_month(db: Session, month: str) -> int:
@@ -1601,6 +1905,7 @@ def get_total_project_count_by_month(db: Session, month: str) -> int:
     return get_total_project_count(db, [month])
 
 
+@server_timing.timed("db.project_count")
 def get_total_project_count(db: Session, months: List[str]) -> int:
     """Get total count of distinct projects for the given months."""
     ranges = _month_ranges(months)
@@ -1627,6 +1932,7 @@ def get_order_breakdown_by_month(db: Session, month: str) -> dict:
     return get_order_breakdown(db, [month])
 
 
+@server_timing.timed("db.order_breakdown")
 def get_order_breakdown(db: Session, months: List[str]) -> dict:
     """Get order breakdown by expense type (count, not cost) for given months."""
     ranges = _month_ranges(months)
@@ -1672,6 +1978,7 @@ def get_over_standard_breakdown_by_month(db: Session, month: str) -> dict:
     return get_over_standard_breakdown(db, [month])
 
 
+@server_timing.timed("db.over_standard")
 def get_over_standard_breakdown(db: Session, months: List[str]) -> dict:
     """Get over standard order breakdown by expense type for the given months."""
     ranges = _month_ranges(months)
@@ -1718,6 +2025,7 @@ def get_flight_over_type_breakdown_by_month(db: Session, month: str) -> dict:
     return get_flight_over_type_breakdown(db, [month])
 
 
+@server_timing.timed("db.flight_over_types")
 def get_flight_over_type_breakdown(db: Session, months: List[str]) -> dict:
     """Get flight over type breakdown for the given months."""
     import re
@@ -1762,6 +2070,7 @@ def get_flight_over_type_breakdown(db: Session, months: List[str]) -> dict:
     return breakdown
 
 
+@server_timing.timed("db.dashboard")
 def get_dashboard_data(
     db: Session,
     months: Optional[List[str]] = None,
@@ -1779,6 +2088,7 @@ def get_dashboard_data(
     department_stats = get_department_stats(db, months, top_n=15)
     project_stats = get_project_stats(db, months, top_n=20)
     anomalies = get_anomalies(db, months, limit=200)
+    anomaly_count = count_anomalies(db, months)
     total_project_count = get_total_project_count(db, months)
     order_breakdown = get_order_breakdown(db, months)
     over_standard_breakdown = get_over_standard_breakdown(db, months)
@@ -1787,7 +2097,7 @@ def get_dashboard_data(
     return {
         'summary': {
             **summary,
-            'anomaly_count': len(anomalies),
+            'anomaly_count': anomaly_count,
             'order_breakdown': order_breakdown,
             'over_standard_breakdown': over_standard_breakdown,
             'flight_over_type_breakdown': flight_over_type_breakdown,
@@ -1819,6 +2129,7 @@ def get_dashboard_data(
 
 
 
+@server_timing.timed("db.department_list")
 def get_department_list_from_db(
     db: Session,
     level: int,
@@ -1973,6 +2284,7 @@ def get_department_list_from_db(
     return departments
 
 
+@server_timing.timed("db.department_details")
 def get_department_details_from_db(
     db: Session,
     department_name: str,
@@ -2308,39 +2620,63 @@ def get_department_details_from_db(
     }
 
 
+@server_timing.timed("db.projects")
 def get_all_projects_from_db(
     db: Session,
-    months: Optional[List[str]] = None
-) -> List[dict]:
+    months: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> dict:
     """
-    Get all projects from database with optional month filtering.
+    Get projects from database with optional month filtering.
+
+    Projects are sorted by (total_cost DESC, project id DESC) and paged with a
+    keyset cursor on the same keys; person and department lists are loaded
+    for the returned page only.
 
     Args:
         db: Database session
         months: List of months to filter (YYYY-MM format)
+        limit: Page size (None returns all remaining projects)
+        cursor: Cursor returned as next_cursor by the previous page
 
     Returns:
-        List of project detail dicts
+        Dict with projects, exact total_count and next_cursor (None on the last page)
     """
     if not months:
         raise ValueError("Months parameter is required")
 
+    cursor_values = decode_cursor(cursor, (float, int))
+    empty = {'projects': [], 'total_count': 0, 'next_cursor': None}
+
     ranges = _month_ranges(months)
     if not ranges:
-        return []
+        return empty
 
     # Get upload IDs for the given months
     upload_ids = get_all_uploads_for_months(db, months)
     if not upload_ids:
-        return []
+        return empty
 
-    date_filter_travel = _date_range_filter(TravelExpense.date, ranges)
+    travel_filters = [
+        TravelExpense.upload_id.in_(upload_ids),
+        _date_range_filter(TravelExpense.date, ranges)
+    ]
 
-    project_result = db.query(
+    total_count = db.query(func.count(func.distinct(Project.id))).join(
+        TravelExpense, Project.id == TravelExpense.project_id
+    ).join(
+        Employee, TravelExpense.employee_id == Employee.id
+    ).filter(*travel_filters).scalar() or 0
+
+    # Raw float sum so the cursor round-trips exactly (Numeric would round to 2 places)
+    total_cost = func.sum(TravelExpense.amount, type_=Float)
+
+    query = db.query(
         Project.id.label('project_id'),
         Project.code,
         Project.name,
-        func.sum(TravelExpense.amount).label('total_cost'),
+        total_cost.label('total_cost'),
         func.count(TravelExpense.id).label('record_count'),
         func.sum(case((TravelExpense.expense_type == 'flight', TravelExpense.amount), else_=0)).label('flight_cost'),
         func.sum(case((TravelExpense.expense_type == 'hotel', TravelExpense.amount), else_=0)).label('hotel_cost'),
@@ -2357,42 +2693,52 @@ def get_all_projects_from_db(
     ).join(
         Employee, TravelExpense.employee_id == Employee.id
     ).filter(
-        TravelExpense.upload_id.in_(upload_ids),
-        date_filter_travel if date_filter_travel is not None else True
+        *travel_filters
     ).group_by(
         Project.id, Project.code, Project.name
-    ).order_by(
-        func.sum(TravelExpense.amount).desc()
-    ).all()
+    )
 
-    results = []
-    for row in project_result:
-        # Get person list for this project
-        persons = db.query(Employee.name).join(
-            TravelExpense, Employee.id == TravelExpense.employee_id
-        ).filter(
-            TravelExpense.project_id == row.project_id,
-            TravelExpense.upload_id.in_(upload_ids),
-            date_filter_travel if date_filter_travel is not None else True
-        ).distinct().all()
-        person_list = [p.name for p in persons]
+    after = _keyset_after(total_cost, Project.id, cursor_values)
+    if after is not None:
+        query = query.having(after)
+    query = query.order_by(total_cost.desc(), Project.id.desc())
+    if limit is not None:
+        query = query.limit(limit + 1)
 
-        # Get department list for this project
-        departments = db.query(Department.name).join(
-            Employee, Department.id == Employee.department_id
-        ).join(
-            TravelExpense, Employee.id == TravelExpense.employee_id
-        ).filter(
-            TravelExpense.project_id == row.project_id,
-            TravelExpense.upload_id.in_(upload_ids),
-            date_filter_travel if date_filter_travel is not None else True
-        ).distinct().all()
-        department_list = [d.name for d in departments]
+    project_result, next_cursor = _split_page(
+        query.all(), limit, lambda row: (float(row.total_cost or 0), row.project_id)
+    )
+    if not project_result:
+        return {'projects': [], 'total_count': total_count, 'next_cursor': None}
+
+    # Person and department lists for the projects on this page (one query each)
+    page_ids = [row.project_id for row in project_result]
+    person_map = {project_id: [] for project_id in page_ids}
+    for project_id, name in db.query(TravelExpense.project_id, Employee.name).join(
+        Employee, TravelExpense.employee_id == Employee.id
+    ).filter(
+        TravelExpense.project_id.in_(page_ids),
+        *travel_filters
+    ).distinct().all():
+        person_map[project_id].append(name)
 
+    department_map = {project_id: [] for project_id in page_ids}
+    for project_id, name in db.query(TravelExpense.project_id, Department.name).join(
+        Employee, TravelExpense.employee_id == Employee.id
+    ).join(
+        Department, Employee.department_id == Department.id
+    ).filter(
+        TravelExpense.project_id.in_(page_ids),
+        *travel_filters
+    ).distinct().all():
+        department_map[project_id].append(name)
+
+    results = []
+    for row in project_result:
         results.append({
             'code': row.code,
             'name': row.name,
-            'total_cost': float(row.total_cost or 0),
+            'total_cost': round(float(row.total_cost or 0), 2),
             'flight_cost': float(row.flight_cost or 0),
             'hotel_cost': float(row.hotel_cost or 0),
             'train_cost': float(row.train_cost or 0),
@@ -2406,13 +2752,14 @@ def get_all_projects_from_db(
                 'end': row.date_end.strftime('%Y-%m-%d') if row.date_end else ''
             },
             'over_standard_count': row.over_standard_count or 0,
-            'person_list': person_list,
-            'department_list': department_list
+            'person_list': person_map[row.project_id],
+            'department_list': department_map[row.project_id]
         })
 
-    return results
+    return {'projects': results, 'total_count': total_count, 'next_cursor': next_cursor}
 
 
+@server_timing.timed("db.level1_statistics")
 def get_level1_department_statistics_from_db(
     db: Session,
     level1_name: str,
@@ -2581,6 +2928,7 @@ def get_level1_department_statistics_from_db(
     }
 
 
+@server_timing.timed("db.level2_statistics")
 def get_level2_department_statistics_from_db(
     db: Session,
     level2_name: str,
@@ -2764,37 +3112,66 @@ def get_level2_department_statistics_from_db(
     }
 
 
+@server_timing.timed("db.project_orders")
 def get_project_orders_from_db(
     db: Session,
     project_code: str,
-    months: Optional[List[str]] = None
-) -> List[dict]:
+    months: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> dict:
     """
-    Get all order records for a specific project from database.
+    Get order records for a specific project from database.
+
+    Orders are sorted by (date DESC, id DESC) and paged with a keyset cursor
+    on the same columns, so each page is served from the project/date index.
 
     Args:
         db: Database session
         project_code: Project code
         months: List of months to filter (YYYY-MM format)
+        limit: Page size (None returns all remaining orders)
+        cursor: Cursor returned as next_cursor by the previous page
 
     Returns:
-        List of order record dicts
+        Dict with orders, exact total_count and next_cursor (None on the last page)
     """
     if not months:
         raise ValueError("Months parameter is required")
 
+    cursor_values = decode_cursor(cursor, (datetime, int))
+    empty = {'orders': [], 'total_count': 0, 'next_cursor': None}
+
     ranges = _month_ranges(months)
     if not ranges:
-        return []
+        return empty
 
     # Get upload IDs for the given months
     upload_ids = get_all_uploads_for_months(db, months)
     if not upload_ids:
-        return []
+        return empty
 
-    date_filter_travel = _date_range_filter(TravelExpense.date, ranges)
+    project_ids = [row.id for row in db.query(Project.id).filter(Project.code == project_code).all()]
+    if not project_ids:
+        return empty
 
-    result = db.query(
+    order_filters = [
+        TravelExpense.upload_id.in_(upload_ids),
+        TravelExpense.project_id.in_(project_ids),
+        _date_range_filter(TravelExpense.date, ranges)
+    ]
+
+    total_count = db.query(func.count(TravelExpense.id)).join(
+        Employee, TravelExpense.employee_id == Employee.id
+    ).join(
+        Department, Employee.department_id == Department.id
+    ).filter(*order_filters).scalar() or 0
+
+    after = _keyset_after(TravelExpense.date, TravelExpense.id, cursor_values)
+    if after is not None:
+        order_filters.append(after)
+
+    query = db.query(
         TravelExpense.id.label('id'),
         Project.code.label('project_code'),
         Project.name.label('project_name'),
@@ -2813,12 +3190,14 @@ def get_project_orders_from_db(
     ).join(
         Department, Employee.department_id == Department.id
     ).filter(
-        TravelExpense.upload_id.in_(upload_ids),
-        Project.code == project_code,
-        date_filter_travel if date_filter_travel is not None else True
+        *order_filters
     ).order_by(
-        TravelExpense.date.desc()
-    ).all()
+        TravelExpense.date.desc(), TravelExpense.id.desc()
+    )
+    if limit is not None:
+        query = query.limit(limit + 1)
+
+    result, next_cursor = _split_page(query.all(), limit, lambda row: (row.date, row.id))
 
     records = []
     for row in result:
@@ -2836,9 +3215,10 @@ def get_project_orders_from_db(
             'advance_days': row.advance_days
         })
 
-    return records
+    return {'orders': records, 'total_count': total_count, 'next_cursor': next_cursor}
 
 
+@server_timing.timed("db.delete_month")
 def delete_month_data(db: Session, month: str) -> dict:
     """
     Delete all data for a specific month from the database.
@@ -1,9 +1,8 @@
 """Database connection and initialization for CostMatrix."""
 import os
 from pathlib import Path
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
 from app.config import settings
 from app.utils.logger import get_logger
 
@@ -15,16 +14,30 @@ DB_PATH = DB_DIR / "costmatrix.db"
 
 DATABASE_URL = f"sqlite:///{DB_PATH}"
 
+# Each session checks out its own pooled connection. Sharing one connection across
+# threads (StaticPool) let any session that closed during an ingest roll back the
+# ingest's open transaction. With WAL, readers see the last committed data while a
+# writer is active; writers are serialized by SQLite (and ingests by the execution layer).
 engine = create_engine(
     DATABASE_URL,
     connect_args={
         "check_same_thread": False,
         "timeout": 30,
     },
-    poolclass=StaticPool,
     echo=False,
 )
 
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Per-connection settings (foreign_keys and busy_timeout are not persistent)."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-64000")
+    cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -35,12 +48,14 @@ def init_db():
 
         Base.metadata.create_all(bind=engine)
 
+        # create_all only creates indexes for new tables; add later indexes to existing databases
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+
+        # journal_mode is persistent in the database file
         with engine.connect() as conn:
-            conn.execute(text("PRAGMA journal_mode=DELETE"))
-            conn.execute(text("PRAGMA synchronous=NORMAL"))
-            conn.execute(text("PRAGMA cache_size=-64000"))
-            conn.execute(text("PRAGMA foreign_keys=ON"))
-            conn.execute(text("PRAGMA busy_timeout=30000"))
+            conn.execute(text("PRAGMA journal_mode=WAL"))
             conn.commit()
 
         logger.info(f"Database initialized successfully at {DB_PATH}")
@@ -0,0 +1,278 @@
+"""Per-request SQL instrumentation.
+
+SQLAlchemy engine events record every statement executed while a request is
+being served: statement count, total DB time, the slowest statements and how
+often each statement shape repeats (N+1 candidates). Stats are attached to the
+request through a context variable, so work done in executor threads is
+counted as long as the context is propagated (see ExecutionLayer).
+
+Finished requests are kept in a bounded rolling report for the debug endpoint.
+Statement durations (and lock timeouts) also feed the process metrics registry,
+and the request's DB total is reported as the "sql" Server-Timing metric.
+"""
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.services import metrics, server_timing
+
+# Response headers added in debug mode
+HEADER_STATEMENTS = "X-DB-Statements"
+HEADER_TIME = "X-DB-Time-Ms"
+HEADER_N_PLUS_ONE = "X-DB-N-Plus-One"
+DEBUG_HEADERS = (HEADER_STATEMENTS, HEADER_TIME, HEADER_N_PLUS_ONE)
+
+# Slowest statements kept per request
+SLOWEST_PER_REQUEST = 3
+# Statement text is truncated in reports
+MAX_STATEMENT_LENGTH = 300
+
+_WHITESPACE_RE = re.compile(r"\s+")
+# Expanded IN lists ("IN (?, ?, ?)") differ only by length; collapse them into one shape
+_IN_LIST_RE = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("sql_query_stats", default=None)
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a SQL statement so repeated executions map to the same shape."""
+    shape = _WHITESPACE_RE.sub(" ", statement).strip()
+    shape = _LITERAL_RE.sub("?", shape)
+    return _IN_LIST_RE.sub("(?)", shape)
+
+
+class QueryStats:
+    """Statements executed on behalf of one request."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes: Counter = Counter()
+        self.shape_ms: Dict[str, float] = {}
+        self.slowest: List[Tuple[float, str]] = []
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        shape = statement_shape(statement)
+        with self._lock:
+            self.count += 1
+            self.total_ms += elapsed_ms
+            self.shapes[shape] += 1
+            self.shape_ms[shape] = self.shape_ms.get(shape, 0.0) + elapsed_ms
+            if len(self.slowest) < SLOWEST_PER_REQUEST or elapsed_ms > self.slowest[-1][0]:
+                self.slowest.append((elapsed_ms, shape[:MAX_STATEMENT_LENGTH]))
+                self.slowest.sort(key=lambda item: item[0], reverse=True)
+                del self.slowest[SLOWEST_PER_REQUEST:]
+
+    def repeated_shapes(self, threshold: int) -> List[Dict[str, Any]]:
+        """Statement shapes executed at least `threshold` times (N+1 candidates)."""
+        with self._lock:
+            return [
+                {
+                    "statement": shape[:MAX_STATEMENT_LENGTH],
+                    "count": count,
+                    "total_ms": round(self.shape_ms[shape], 2),
+                }
+                for shape, count in self.shapes.most_common()
+                if count >= threshold
+            ]
+
+    def summary(self, threshold: int) -> Dict[str, Any]:
+        repeated = self.repeated_shapes(threshold)
+        with self._lock:
+            return {
+                "statements": self.count,
+                "db_ms": round(self.total_ms, 2),
+                "slowest": [
+                    {"statement": shape, "ms": round(elapsed, 2)} for elapsed, shape in self.slowest
+                ],
+                "n_plus_one": repeated,
+            }
+
+
+def current_stats() -> Optional[QueryStats]:
+    """Stats of the request being served in this context, if any."""
+    return _current_stats.get()
+
+
+def begin_request() -> Tuple[QueryStats, Any]:
+    stats = QueryStats()
+    return stats, _current_stats.set(stats)
+
+
+def end_request(token: Any) -> None:
+    _current_stats.reset(token)
+
+
+class SQLReport:
+    """Rolling in-memory report of recent requests."""
+
+    def __init__(self, size: int):
+        self._lock = threading.Lock()
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=max(1, size))
+
+    def add(self, method: str, path: str, status: int, duration_ms: float, summary: Dict[str, Any]) -> None:
+        entry = {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "method": method,
+            "path": path,
+            "status": status,
+            "duration_ms": round(duration_ms, 2),
+            **summary,
+        }
+        with self._lock:
+            self._entries.append(entry)
+
+    def snapshot(self, limit: int = 50) -> Dict[str, Any]:
+        """Recent requests (newest first) plus per-path and N+1 aggregates over the window."""
+        with self._lock:
+            entries = list(self._entries)
+
+        paths: Dict[str, Dict[str, Any]] = {}
+        n_plus_one: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            key = f"{entry['method']} {entry['path']}"
+            item = paths.setdefault(key, {"requests": 0, "statements": 0, "db_ms": 0.0, "max_statements": 0})
+            item["requests"] += 1
+            item["statements"] += entry["statements"]
+            item["db_ms"] += entry["db_ms"]
+            item["max_statements"] = max(item["max_statements"], entry["statements"])
+            for repeated in entry["n_plus_one"]:
+                candidate = n_plus_one.setdefault(
+                    repeated["statement"], {"statement": repeated["statement"], "requests": 0, "max_count": 0, "paths": set()}
+                )
+                candidate["requests"] += 1
+                candidate["max_count"] = max(candidate["max_count"], repeated["count"])
+                candidate["paths"].add(key)
+
+        for item in paths.values():
+            item["avg_statements"] = round(item["statements"] / item["requests"], 2)
+            item["avg_db_ms"] = round(item["db_ms"] / item["requests"], 2)
+            item["db_ms"] = round(item["db_ms"], 2)
+
+        return {
+            "window": len(entries),
+            "paths": dict(sorted(paths.items(), key=lambda kv: kv[1]["db_ms"], reverse=True)),
+            "n_plus_one": sorted(
+                ({**candidate, "paths": sorted(candidate["paths"])} for candidate in n_plus_one.values()),
+                key=lambda candidate: candidate["max_count"],
+                reverse=True,
+            ),
+            "recent": entries[::-1][:limit],
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+sql_report = SQLReport(settings.sql_report_size)
+
+
+# Start times of in-flight statements; thread-local because pooled connections
+# are handed to different threads over their lifetime
+_local = threading.local()
+
+
+def _start_times() -> List[float]:
+    starts = getattr(_local, "starts", None)
+    if starts is None:
+        starts = _local.starts = []
+    return starts
+
+
+def _statement_kind(statement: str) -> str:
+    keyword = statement.lstrip()[:8].upper()
+    if keyword.startswith(("SELECT", "PRAGMA", "WITH")):
+        return "read"
+    if keyword.startswith(("COMMIT", "ROLLBACK")):
+        return "commit"
+    return "write"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _start_times().append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = _start_times()
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    metrics.sqlite_statement_seconds.labels(_statement_kind(statement)).observe(elapsed)
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed * 1000)
+
+
+def _handle_error(exception_context):
+    starts = _start_times()
+    if starts:
+        starts.pop()
+    message = str(exception_context.original_exception).lower()
+    if "database is locked" in message or "database is busy" in message:
+        metrics.sqlite_busy_total.inc()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach the statement hooks to an engine (idempotent)."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class SQLInstrumentationMiddleware:
+    """ASGI middleware: collect per-request SQL stats, add debug headers, feed the report."""
+
+    def __init__(self, app, debug_headers: bool = False, n_plus_one_threshold: int = 5):
+        self.app = app
+        self.debug_headers = debug_headers
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = begin_request()
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if stats.count:
+                    server_timing.record("sql", stats.total_ms, f"statements: {stats.count}")
+                if self.debug_headers:
+                    repeated = stats.repeated_shapes(self.n_plus_one_threshold)
+                    headers = list(message.get("headers", []))
+                    headers.append((HEADER_STATEMENTS.lower().encode(), str(stats.count).encode()))
+                    headers.append((HEADER_TIME.lower().encode(), f"{stats.total_ms:.2f}".encode()))
+                    headers.append((HEADER_N_PLUS_ONE.lower().encode(), str(len(repeated)).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end_request(token)
+            if stats.count:
+                sql_report.add(
+                    scope["method"],
+                    scope["path"],
+                    status_code,
+                    (time.perf_counter() - start) * 1000,
+                    stats.summary(self.n_plus_one_threshold),
+                )
@@ -157,6 +157,7 @@ class TravelExpense(Base):
         Index("idx_travel_upload", "upload_id"),
         Index("idx_travel_emp_date", "employee_id", "date"),
         Index("idx_travel_emp", "employee_id"),
+        Index("idx_travel_proj_date", "project_id", "date", "id"),
     )
 
 
@@ -179,4 +180,5 @@ class Anomaly(Base):
     __table_args__ = (
         Index("idx_anomalies_upload", "upload_id"),
         Index("idx_anomalies_date", "date", "employee_id"),
+        Index("idx_anomalies_date_id", "date", "id"),
     )
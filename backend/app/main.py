@@ -1,6 +1,12 @@
 """
 FastAPI 主应用入口
 """
+import time
+
+# 模块导入耗时从这里开始计算（启动日志与 costmatrix_startup_seconds 指标）
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
 import sys
 from pathlib import Path
 
@@ -14,10 +20,24 @@ if PROJECT_ROOT and str(PROJECT_ROOT) not in sys.path:
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from app.config import settings
 from app.api.routes import router
-from app.db.database import init_db, SessionLocal
+from app.db.database import init_db, SessionLocal, engine
+from app.db.crud import migrate_upload_records_file
+from app.db.instrumentation import DEBUG_HEADERS, SQLInstrumentationMiddleware, instrument_engine
 from app.services.auth_service import ensure_initial_admin
+from app.services.executor import execution
+from app.services.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, registry as metrics_registry, startup_seconds
+from app.services.server_timing import HEADER as SERVER_TIMING_HEADER, ServerTimingMiddleware
+from app.services.upload_progress import progress_manager
+from app.services.warmup import warm_up
+from app.utils.logger import get_logger
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+logger = get_logger("main")
+# 后台预热任务（保留引用，关闭时取消）
+_warmup_task = None
 
 app = FastAPI(
     title=settings.app_name,
@@ -33,22 +53,65 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=(list(DEBUG_HEADERS) if settings.debug else []) + ([SERVER_TIMING_HEADER] if settings.server_timing else []),
 )
 
+# SQL 语句耗时同时用于指标和按请求统计
+instrument_engine(engine)
+
+# 按请求统计 SQL 语句数/耗时/N+1，报告见 /api/debug/sql-report
+if settings.sql_instrumentation:
+    app.add_middleware(
+        SQLInstrumentationMiddleware,
+        debug_headers=settings.debug,
+        n_plus_one_threshold=settings.sql_n_plus_one_threshold,
+    )
+
+# 响应头输出各阶段耗时（在 SQL 统计之外，以便带上 sql 耗时）
+if settings.server_timing:
+    app.add_middleware(ServerTimingMiddleware)
+
+# 请求耗时指标（最外层，包含其他中间件的耗时）
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(router, prefix="/api", tags=["analysis"])
 
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize database on startup."""
+    global _warmup_task
+    started = time.perf_counter()
     init_db()
 
     cache_dir = Path(settings.upload_dir) / "cache"
     cache_dir.mkdir(parents=True, exist_ok=True)
 
-    # 确保默认管理员账号存在
+    # 清理过期的上传进度记录
+    progress_manager.cleanup_old_tasks()
+
+    # 确保默认管理员账号存在；旧版 upload_records.json 导入 uploads 表
     with SessionLocal() as db:
         ensure_initial_admin(db)
+        migrate_upload_records_file(db, Path(settings.upload_dir) / "upload_records.json")
+
+    init_seconds = time.perf_counter() - started
+    startup_seconds.labels("import").set(IMPORT_SECONDS)
+    startup_seconds.labels("init").set(init_seconds)
+    logger.info(f"服务启动完成：模块导入 {IMPORT_SECONDS * 1000:.0f}ms，初始化 {init_seconds * 1000:.0f}ms")
+
+    # 分析模块在首次使用时导入；开启预热时在后台提前导入并启动计算工作进程
+    if settings.startup_warmup:
+        _warmup_task = asyncio.create_task(warm_up(settings.startup_warmup_delay))
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """关闭计算执行层"""
+    if _warmup_task is not None and not _warmup_task.done():
+        _warmup_task.cancel()
+    execution.shutdown()
 
 
 @app.get("/")
@@ -62,6 +125,13 @@ async def root():
     }
 
 
+if settings.metrics_enabled:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus 文本格式的进程内指标"""
+        return Response(content=metrics_registry.render(), media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,106 @@
+"""
+认证主体缓存
+get_current_user 每次请求都要解码 JWT 并按用户名查询 users 表。这里按令牌缓存解码后的
+用户信息（短 TTL，且不超过令牌自身的过期时间），命中时不访问数据库。
+
+用户信息变更（update_user / delete_user / change_password）时更新用户版本文件，
+所有缓存条目随之失效；版本保存在文件中，多 worker 部署时各进程同时失效。
+"""
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+from app.db.database import DB_DIR
+from app.db.models import User
+from app.services import metrics
+from app.services.data_version import DataVersion
+
+USERS_VERSION_FILE = DB_DIR / "users_version"
+
+# 缓存的用户字段（命中时据此构造游离的 User 对象，不与任何会话绑定）
+PRINCIPAL_FIELDS = ("id", "username", "password_hash", "is_admin", "is_active", "created_at", "updated_at")
+
+
+class PrincipalCache:
+    """令牌 -> 用户信息的短期缓存，附带命中率统计"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int, version: DataVersion):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.version = version
+        self._lock = threading.Lock()
+        # token -> (过期时间, 用户版本, 用户字段)
+        self._entries: Dict[str, Tuple[float, str, Dict[str, Any]]] = {}
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, token: str, version: str) -> Optional[User]:
+        """查询缓存，命中时返回新的游离 User 对象"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and (entry[0] <= now or entry[1] != version):
+                del self._entries[token]
+                entry = None
+            if entry is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        metrics.record_cache("principal", entry is not None)
+        return User(**entry[2]) if entry is not None else None
+
+    def put(self, token: str, version: str, user: User, token_exp: Optional[float] = None) -> None:
+        """缓存用户信息；version 需在查询用户之前读取，避免缓存查询期间被修改的数据"""
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, time.monotonic() + (token_exp - time.time()))
+        values = {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[token] = (expires_at, version, values)
+
+    def _evict(self) -> None:
+        """清除过期条目；仍然已满时淘汰最早写入的条目"""
+        now = time.monotonic()
+        for token in [token for token, entry in self._entries.items() if entry[0] <= now]:
+            del self._entries[token]
+        while len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def invalidate(self) -> None:
+        """用户信息变更后使所有缓存失效（包括其他 worker 进程）"""
+        self.version.bump()
+        with self._lock:
+            self._entries.clear()
+            self._invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率统计"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self._invalidations,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.auth_cache_ttl_seconds,
+    max_entries=settings.auth_cache_max_entries,
+    version=DataVersion(USERS_VERSION_FILE, name="用户版本"),
+)
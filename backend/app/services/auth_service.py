@@ -1,6 +1,7 @@
 """
 认证与用户管理服务
 """
+import functools
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
@@ -8,30 +9,60 @@ from typing import Optional
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
 from app.config import settings
-from app.db.database import get_db
+from app.db.database import SessionLocal, get_db
 from app.db.models import User
+from app.services.auth_cache import principal_cache
+from app.services.executor import execution, ExecutorBusyError
 from app.utils.logger import get_logger
 
 logger = get_logger("auth_service")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 auth_scheme = HTTPBearer(auto_error=False)
 
 
+@functools.lru_cache(maxsize=None)
+def _pwd_context():
+    """passlib 首次校验/生成密码时才导入（缩短服务启动时间）"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
 def verify_password(plain_password: str, password_hash: str) -> bool:
     """验证密码"""
     try:
-        return pwd_context.verify(plain_password, password_hash)
+        return _pwd_context().verify(plain_password, password_hash)
     except Exception:
         return False
 
 
 def get_password_hash(password: str) -> str:
     """生成密码哈希"""
-    return pwd_context.hash(password)
+    return _pwd_context().hash(password)
+
+
+async def _run_hash(func, *args):
+    """在密码哈希线程池中执行 bcrypt 计算，避免阻塞事件循环"""
+    try:
+        return await execution.run_hash(func, *args)
+    except ExecutorBusyError:
+        logger.warning("密码校验排队已满，拒绝请求")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="请求过多，请稍后重试",
+            headers={"Retry-After": "1"},
+        )
+
+
+async def verify_password_async(plain_password: str, password_hash: str) -> bool:
+    """验证密码（在哈希线程池中执行）"""
+    return await _run_hash(verify_password, plain_password, password_hash)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """生成密码哈希（在哈希线程池中执行）"""
+    return await _run_hash(get_password_hash, password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -88,17 +119,23 @@ def ensure_initial_admin(db: Session) -> User:
     return user
 
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
-    """校验用户名和密码"""
-    user = db.query(User).filter(User.username == username).first()
+async def authenticate_user(username: str, password: str) -> Optional[User]:
+    """
+    校验用户名和密码
+
+    用户在独立的短会话中查询，查询结束即归还连接：bcrypt 校验排队期间不占用数据库连接
+    （登录高峰时连接池会被耗尽）。返回的对象已与会话分离，已加载的属性仍可读取
+    """
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.username == username).first()
     if not user or not user.is_active:
         return None
-    if not verify_password(password, user.password_hash):
+    if not await verify_password_async(password, user.password_hash):
         return None
     return user
 
 
-def change_password(
+async def change_password(
     db: Session,
     user: User,
     current_password: str,
@@ -107,20 +144,25 @@ def change_password(
     """
     更新用户密码（需提供当前密码）
     """
-    if not verify_password(current_password, user.password_hash):
+    # 当前用户可能来自认证缓存（游离对象），重新从数据库加载
+    db_user = db.get(User, user.id)
+    if db_user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="用户不存在")
+    if not await verify_password_async(current_password, db_user.password_hash):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="当前密码不正确")
 
-    user.password_hash = get_password_hash(new_password)
-    db.add(user)
+    db_user.password_hash = await get_password_hash_async(new_password)
+    db.add(db_user)
     db.commit()
+    principal_cache.invalidate()
 
 
-def create_user(db: Session, username: str, password: str, is_admin: bool = False) -> User:
+async def create_user(db: Session, username: str, password: str, is_admin: bool = False) -> User:
     """创建新用户"""
     existing = db.query(User).filter(User.username == username).first()
     if existing:
         raise HTTPException(status_code=400, detail="用户名已存在")
-    password_hash = get_password_hash(password)
+    password_hash = await get_password_hash_async(password)
     user = User(
         username=username,
         password_hash=password_hash,
@@ -133,7 +175,7 @@ def create_user(db: Session, username: str, password: str, is_admin: bool = Fals
     return user
 
 
-def update_user(
+async def update_user(
     db: Session,
     target: User,
     password: Optional[str] = None,
@@ -142,7 +184,7 @@ def update_user(
 ) -> User:
     """更新用户信息"""
     if password:
-        target.password_hash = get_password_hash(password)
+        target.password_hash = await get_password_hash_async(password)
     if is_admin is not None:
         target.is_admin = is_admin
     if is_active is not None:
@@ -151,6 +193,7 @@ def update_user(
     db.add(target)
     db.commit()
     db.refresh(target)
+    principal_cache.invalidate()
     return target
 
 
@@ -158,13 +201,14 @@ def delete_user(db: Session, target: User):
     """删除用户"""
     db.delete(target)
     db.commit()
+    principal_cache.invalidate()
 
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(auth_scheme),
     db: Session = Depends(get_db),
 ) -> User:
-    """获取当前用户（验证 JWT）"""
+    """获取当前用户（验证 JWT，命中认证缓存时不查询数据库）"""
     if credentials is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -173,6 +217,11 @@ async def get_current_user(
         )
 
     token = credentials.credentials
+    users_version = principal_cache.version.current()
+    cached = principal_cache.get(token, users_version)
+    if cached is not None:
+        return cached
+
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.jwt_algorithm])
         username: Optional[str] = payload.get("sub")
@@ -186,6 +235,8 @@ async def get_current_user(
     user = db.query(User).filter(User.username == username).first()
     if user is None or not user.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="用户不存在或已被禁用")
+
+    principal_cache.put(token, users_version, user, payload.get("exp"))
     return user
 
 
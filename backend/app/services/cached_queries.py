@@ -0,0 +1,59 @@
+"""
+带结果缓存的数据库模式查询
+Dashboard、部门列表、项目列表的数据库查询统一经过这里：先查结果缓存，未命中时在数据库执行器中计算。
+路由与预热任务（warmup.py）使用同一组函数，保证缓存键一致，预热结果可被请求直接命中。
+"""
+from typing import Any, Dict, List, Optional
+
+from app.db.database import SessionLocal
+from app.services.executor import execution
+from app.services.result_cache import result_cache
+
+# 与前端项目列表首屏一致的每页条数，预热时使用
+PROJECTS_FIRST_PAGE_SIZE = 20
+
+
+async def dashboard(months: List[str]) -> Dict[str, Any]:
+    """Dashboard 数据（结果只与月份有关，季度 / 年份已在路由中展开为月份）"""
+    from app.db.crud import get_dashboard_data
+
+    def _query():
+        with SessionLocal() as db:
+            return get_dashboard_data(db=db, months=months)
+
+    async def _compute():
+        return await execution.run_db("analyze", _query)
+
+    return await result_cache.get_or_compute("analyze", {"months": months}, _compute)
+
+
+async def department_list(level: int, parent: Optional[str], months: List[str]) -> List[Dict[str, Any]]:
+    """指定层级的部门列表"""
+    from app.db.crud import get_department_list_from_db
+
+    def _query():
+        with SessionLocal() as db:
+            return get_department_list_from_db(db, level, parent, months)
+
+    async def _compute():
+        return await execution.run_db("department_list", _query)
+
+    return await result_cache.get_or_compute(
+        "department_list", {"level": level, "parent": parent, "months": months}, _compute
+    )
+
+
+async def projects_page(months: List[str], limit: Optional[int], cursor: Optional[str]) -> Dict[str, Any]:
+    """项目列表（一页）；游标无效时抛出 ValueError"""
+    from app.db.crud import get_all_projects_from_db
+
+    def _query():
+        with SessionLocal() as db:
+            return get_all_projects_from_db(db, months, limit, cursor)
+
+    async def _compute():
+        return await execution.run_db("projects", _query)
+
+    return await result_cache.get_or_compute(
+        "projects", {"months": months, "limit": limit, "cursor": cursor}, _compute
+    )
@@ -0,0 +1,66 @@
+"""
+数据版本服务
+数据库中的分析数据只在上传解析、删除月份时变化。每次变化生成新的版本号并写入
+数据目录下的版本文件，供 ETag 等缓存判断使用：读取版本只需一次 stat，不查询数据库；
+版本保存在文件中，服务重启或多进程部署时各进程看到的版本一致。
+"""
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple
+
+from app.db.database import DB_DIR
+from app.utils.logger import get_logger
+
+logger = get_logger("data_version")
+
+DATA_VERSION_FILE = DB_DIR / "data_version"
+
+
+class DataVersion:
+    """基于版本文件的数据版本号"""
+
+    def __init__(self, path: Path, name: str = "数据版本"):
+        self.path = path
+        self.name = name
+        self._lock = threading.RLock()
+        # ((inode, mtime_ns), version)：写入使用 os.replace，每次更新 inode 都会变化
+        self._cached: Optional[Tuple[Tuple[int, int], str]] = None
+
+    def _write(self, version: str):
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(version, encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def current(self) -> str:
+        """当前数据版本（版本文件不存在时初始化）"""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return self.bump()
+
+        key = (stat.st_ino, stat.st_mtime_ns)
+        cached = self._cached
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        with self._lock:
+            version = self.path.read_text(encoding="utf-8").strip()
+            if not version:
+                return self.bump()
+            self._cached = (key, version)
+            return version
+
+    def bump(self) -> str:
+        """数据发生变化后生成新版本"""
+        version = uuid.uuid4().hex
+        with self._lock:
+            self._write(version)
+            stat = self.path.stat()
+            self._cached = ((stat.st_ino, stat.st_mtime_ns), version)
+        logger.info(f"{self.name}已更新: {version}")
+        return version
+
+
+data_version = DataVersion(DATA_VERSION_FILE)
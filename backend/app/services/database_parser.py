@@ -1,4 +1,6 @@
 """Database parsing service to insert Excel data into database."""
+import logging
+import time
 from typing import List, Optional, Callable
 import pandas as pd
 from sqlalchemy.orm import Session
@@ -9,11 +11,21 @@ from app.db.crud import (
     batch_insert_travel_expenses,
     batch_insert_anomalies,
 )
-from app.services.excel_processor import ExcelProcessor
+from app.services import metrics, server_timing
+from app.services.excel_processor import ExcelProcessor, ANALYSIS_SHEETS
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Server-Timing metric names must be ASCII tokens; sheet names are mapped here
+_INGEST_TIMING_NAMES = {
+    "状态明细": "ingest.attendance",
+    "机票": "ingest.flight",
+    "酒店": "ingest.hotel",
+    "火车票": "ingest.train",
+    "anomalies": "ingest.anomalies",
+}
+
 
 class DatabaseParser:
     """Parse Excel file and insert data into database."""
@@ -30,6 +42,16 @@ class DatabaseParser:
             self.progress_callback(progress, message)
         self.logger.info(f"Progress {progress}%: {message}")
 
+    @staticmethod
+    def _record_ingest(sheet: str, rows: int, started: float) -> None:
+        """Record ingest throughput (cleaning + insert) for one sheet, also as a timing span."""
+        elapsed = time.perf_counter() - started
+        metrics.ingest_rows_total.labels(sheet).inc(rows)
+        metrics.ingest_seconds_total.labels(sheet).inc(elapsed)
+        if elapsed > 0:
+            metrics.ingest_rows_per_second.labels(sheet).set(rows / elapsed)
+        server_timing.record(_INGEST_TIMING_NAMES.get(sheet, "ingest"), elapsed * 1000, f"{rows} rows")
+
     def parse_and_insert(self, db: Session) -> dict:
         """
         Parse Excel file and insert all data into database.
@@ -41,10 +63,11 @@ class DatabaseParser:
             self._update_progress(45, "正在读取Excel文件...")
             
             self.logger.info(f"Starting database parsing for {self.file_path}")
-            sheets_data = self.processor.load_all_sheets()
+            # Only the attendance and travel sheets are parsed; extra summary sheets are skipped
+            sheets_data = self.processor.load_all_sheets(required_sheets=ANALYSIS_SHEETS)
 
-            # Get sheet names
-            sheet_names = list(sheets_data.keys())
+            # Get sheet names (all sheets in the workbook, not just the parsed ones)
+            sheet_names = self.processor.get_sheet_names()
 
             self._update_progress(50, "正在创建上传记录...")
             
@@ -73,11 +96,13 @@ class DatabaseParser:
             # Insert attendance data
             if "状态明细" in sheets_data:
                 self._update_progress(55, "正在解析考勤数据...")
+                started = time.perf_counter()
                 attendance_df = self.processor.clean_attendance_data()
                 if not attendance_df.empty:
                     stats["attendance_count"] = batch_insert_attendance(
                         db, upload_record.id, attendance_df
                     )
+                    self._record_ingest("状态明细", stats["attendance_count"], started)
                     self.logger.info(
                         f"Inserted {stats['attendance_count']} attendance records"
                     )
@@ -107,16 +132,17 @@ class DatabaseParser:
                 if sheet_name in sheets_data:
                     self._update_progress(progress_value - 5, f"正在解析{sheet_name}数据...")
                     self.logger.info(f"[{sheet_name}] 开始解析差旅数据")
-                    
+                    started = time.perf_counter()
+
                     expense_df = self.processor.clean_travel_data(sheet_name)
                     
                     if not expense_df.empty:
                         self.logger.info(f"[{sheet_name}] 清洗后数据: {len(expense_df)} 行")
-                        self.logger.info(f"[{sheet_name}] 数据列: {list(expense_df.columns)}")
-                        self.logger.info(f"[{sheet_name}] 前3行数据预览:")
-                        for idx in range(min(3, len(expense_df))):
-                            row_data = expense_df.iloc[idx].to_dict()
-                            self.logger.info(f"[{sheet_name}]   行{idx}: {row_data}")
+                        # Column list and row previews are only built when DEBUG is enabled
+                        if self.logger.isEnabledFor(logging.DEBUG):
+                            self.logger.debug(f"[{sheet_name}] 数据列: {list(expense_df.columns)}")
+                            for idx in range(min(3, len(expense_df))):
+                                self.logger.debug(f"[{sheet_name}]   行{idx}: {expense_df.iloc[idx].to_dict()}")
                         
                         # 如果差旅表中一级部门为空，尝试从考勤表中填充
                         if attendance_df is not None and '一级部门' in expense_df.columns:
@@ -130,6 +156,7 @@ class DatabaseParser:
                             db, upload_record.id, expense_df, sheet_name
                         )
                         stats[count_key] = count
+                        self._record_ingest(sheet_name, count, started)
                         self.logger.info(f"Inserted {count} {sheet_name} records")
                         self._update_progress(progress_value, f"✅ 已写入{sheet_name}数据: {count} 条")
                     else:
@@ -144,11 +171,13 @@ class DatabaseParser:
                 t in sheets_data for t in ["机票", "酒店", "火车票"]
             ):
                 self._update_progress(88, "正在分析异常数据...")
+                started = time.perf_counter()
                 anomalies = self.processor.cross_check_attendance_travel()
                 if anomalies:
                     stats["anomalies_count"] = batch_insert_anomalies(
                         db, upload_record.id, anomalies
                     )
+                    self._record_ingest("anomalies", stats["anomalies_count"], started)
                     self.logger.info(f"Inserted {stats['anomalies_count']} anomaly records")
                     self._update_progress(90, f"✅ 已写入异常数据: {stats['anomalies_count']} 条")
 
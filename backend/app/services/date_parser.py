@@ -0,0 +1,210 @@
+"""
+日期列解析服务
+按列采样推断日期格式（Excel 序列号 / datetime / 字符串日期 / 纯时间），
+再对整列走对应的向量化解析路径，避免逐值的 Python 判断和 dateutil 兜底解析。
+推断结果按 (sheet, 列名, 模板签名) 缓存（LRU，最多 FORMAT_CACHE_SIZE 项），同一模板的后续文件直接复用。
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time as dt_time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.utils.logger import get_logger
+
+logger = get_logger("date_parser")
+
+# 纯时间值（如 '22:17'、'08:30:00'），不能被解析为“今天”的日期
+TIME_ONLY_PATTERN = re.compile(r"^\s*\d{1,2}:\d{2}(:\d{2})?\s*$")
+
+FORMAT_EMPTY = "empty"
+FORMAT_DATETIME = "datetime"
+FORMAT_EXCEL_SERIAL = "excel_serial"
+FORMAT_TIME_ONLY = "time_only"
+FORMAT_MIXED = "mixed"
+
+# 按常见程度排列的字符串日期格式
+STRING_DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y/%m/%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y/%m/%d %H:%M",
+    "%Y%m%d",
+]
+
+# Excel 序列号合理范围（约 1954 年 ~ 2119 年），超出范围的数字不视为日期
+EXCEL_SERIAL_RANGE = (20000, 80000)
+EXCEL_EPOCH = "1899-12-30"
+
+SAMPLE_SIZE = 50
+VALIDATE_SAMPLE_SIZE = 5
+
+# 格式推断缓存 (sheet, 列名, 模板签名) -> 格式；解析在多个工作线程中进行，读写加锁
+FORMAT_CACHE_SIZE = 64
+_format_cache: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+_format_cache_lock = threading.Lock()
+
+
+def template_signature(columns: Iterable[Any]) -> str:
+    """根据列名生成模板签名，列结构相同的文件共享格式推断结果"""
+    joined = "|".join(str(c).strip() for c in columns)
+    return hashlib.md5(joined.encode("utf-8")).hexdigest()
+
+
+def clear_format_cache():
+    """清空格式推断缓存"""
+    with _format_cache_lock:
+        _format_cache.clear()
+
+
+def _get_cached_format(key: Tuple[str, str, str]) -> Optional[str]:
+    with _format_cache_lock:
+        fmt = _format_cache.get(key)
+        if fmt is not None:
+            _format_cache.move_to_end(key)
+        return fmt
+
+
+def _put_cached_format(key: Tuple[str, str, str], fmt: str) -> None:
+    with _format_cache_lock:
+        _format_cache[key] = fmt
+        _format_cache.move_to_end(key)
+        while len(_format_cache) > FORMAT_CACHE_SIZE:
+            _format_cache.popitem(last=False)
+
+
+def _sample(non_null: pd.Series, size: int) -> List[Any]:
+    """从首、中、尾均匀采样，避免只看表头附近的数据"""
+    if len(non_null) <= size:
+        return non_null.tolist()
+    positions = np.linspace(0, len(non_null) - 1, size).astype(int)
+    return non_null.iloc[positions].tolist()
+
+
+def _classify(value: Any) -> Optional[str]:
+    """判定单个样本值的格式，无法识别返回 None"""
+    if isinstance(value, (datetime, date, pd.Timestamp, np.datetime64)):
+        return FORMAT_DATETIME
+    if isinstance(value, dt_time):
+        return FORMAT_TIME_ONLY
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_)):
+        low, high = EXCEL_SERIAL_RANGE
+        return FORMAT_EXCEL_SERIAL if low <= value <= high else None
+    if isinstance(value, str):
+        text = value.strip()
+        if TIME_ONLY_PATTERN.match(text):
+            return FORMAT_TIME_ONLY
+        for fmt in STRING_DATE_FORMATS:
+            try:
+                datetime.strptime(text, fmt)
+                return fmt
+            except ValueError:
+                continue
+    return None
+
+
+def infer_format(series: pd.Series) -> str:
+    """
+    采样推断列的日期格式
+
+    Returns:
+        FORMAT_* 常量或 STRING_DATE_FORMATS 中的格式串；样本格式不一致时返回 FORMAT_MIXED
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return FORMAT_DATETIME
+
+    non_null = series.dropna()
+    if non_null.empty:
+        return FORMAT_EMPTY
+
+    kinds = {_classify(v) for v in _sample(non_null, SAMPLE_SIZE)}
+    if len(kinds) == 1 and None not in kinds:
+        return kinds.pop()
+    return FORMAT_MIXED
+
+
+def _cached_format_still_valid(series: pd.Series, fmt: str) -> bool:
+    """用少量样本校验缓存的格式，防止同模板文件的列内容发生变化"""
+    if fmt == FORMAT_MIXED:
+        # 样本已是单一格式时重新推断，避免某个混合格式的文件让该列此后一直走兜底解析
+        kinds = {_classify(v) for v in _sample(series.dropna(), VALIDATE_SAMPLE_SIZE)}
+        return len(kinds) != 1 or None in kinds
+    if fmt == FORMAT_EMPTY:
+        return series.dropna().empty
+    if fmt == FORMAT_DATETIME and pd.api.types.is_datetime64_any_dtype(series):
+        return True
+    samples = _sample(series.dropna(), VALIDATE_SAMPLE_SIZE)
+    return all(_classify(v) == fmt for v in samples)
+
+
+def _parse_mixed(series: pd.Series) -> pd.Series:
+    """通用兜底路径：剔除纯时间值后逐值解析"""
+    cleaned = series.copy()
+    if cleaned.dtype == object:
+        is_time_obj = np.fromiter(
+            (isinstance(v, dt_time) for v in cleaned.to_numpy()), dtype=bool, count=len(cleaned)
+        )
+        cleaned[is_time_obj] = None
+        is_time_str = cleaned.astype(str).str.match(TIME_ONLY_PATTERN, na=False)
+        cleaned[is_time_str.to_numpy()] = None
+    return pd.to_datetime(cleaned, errors="coerce", format="mixed")
+
+
+def _convert(series: pd.Series, fmt: str) -> pd.Series:
+    """按推断格式整列向量化转换"""
+    if fmt == FORMAT_DATETIME:
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series
+        return pd.to_datetime(series, errors="coerce")
+    if fmt == FORMAT_EXCEL_SERIAL:
+        numeric = pd.to_numeric(series, errors="coerce")
+        return pd.to_datetime(numeric, unit="D", origin=EXCEL_EPOCH, errors="coerce")
+    if fmt in (FORMAT_TIME_ONLY, FORMAT_EMPTY):
+        return pd.Series(pd.NaT, index=series.index, dtype="datetime64[ns]")
+    if fmt == FORMAT_MIXED:
+        return _parse_mixed(series)
+    return pd.to_datetime(series.astype(str).str.strip(), format=fmt, errors="coerce")
+
+
+def parse_date_column(
+    series: Optional[pd.Series],
+    sheet_name: str = "",
+    column: str = "",
+    signature: str = ""
+) -> pd.Series:
+    """
+    将列解析为 datetime，纯时间值（如 '22:17' 或 datetime.time）解析为 NaT
+
+    Args:
+        series: 待解析的列
+        sheet_name: Sheet 名称（缓存键）
+        column: 列名（缓存键）
+        signature: 模板签名（缓存键，见 template_signature）；为空时不使用缓存
+    """
+    if series is None:
+        return pd.Series(dtype="datetime64[ns]")
+
+    cache_key = (sheet_name, column, signature)
+    fmt = _get_cached_format(cache_key) if signature else None
+    if fmt is None or not _cached_format_still_valid(series, fmt):
+        fmt = infer_format(series)
+        if signature:
+            _put_cached_format(cache_key, fmt)
+        logger.debug(f"[{sheet_name}] 列 {column} 推断日期格式: {fmt}")
+
+    result = _convert(series, fmt)
+
+    # 少量不符合推断格式的值（如个别手工录入）走兜底路径，保证与逐值解析结果一致
+    if fmt not in (FORMAT_MIXED, FORMAT_TIME_ONLY, FORMAT_EMPTY):
+        missed = result.isna().to_numpy() & series.notna().to_numpy()
+        if missed.any():
+            result = result.copy()
+            result[missed] = _parse_mixed(series[missed])
+
+    return result
@@ -2,6 +2,7 @@
 Excel 数据处理服务
 负责读取、分析、处理 Excel 文件
 """
+import logging
 import pandas as pd
 import numpy as np
 from openpyxl import load_workbook
@@ -9,54 +10,118 @@ from typing import Dict, List, Tuple, Any, Optional
 from datetime import datetime
 import re
 import os
+import threading
 import time
 from collections import Counter
 
-from app.utils.logger import get_logger
+from app.services import server_timing
+from app.utils.logger import LogSampler, get_logger
+from app.services.date_parser import TIME_ONLY_PATTERN, parse_date_column, template_signature
+from app.services.xlsx_export import ANALYSIS_SHEET_NAME, analysis_result_rows
+
+# 分析所需的 Sheet：考勤明细 + 三类差旅表；工作簿中的其他汇总 Sheet 不参与分析
+ATTENDANCE_SHEET = '状态明细'
+TRAVEL_SHEETS = ['机票', '酒店', '火车票']
+ANALYSIS_SHEETS = [ATTENDANCE_SHEET] + TRAVEL_SHEETS
+
+# 各差旅表的消费日期候选列（按优先级），用于汇总差旅数据与月份分区
+TRAVEL_SHEET_DATE_COLUMNS = {
+    '机票': ['起飞日期', '起飞日期.1', '起飞时间', '起飞时间.1'],
+    '酒店': ['入住日期', '入住时间'],
+    '火车票': ['出发日期', '出发时间']
+}
+
+MonthsKey = Optional[Tuple[str, ...]]
+
+# 部门差旅成本字段
+COST_COLUMNS = ['total_cost', 'flight_cost', 'hotel_cost', 'train_cost']
+
+
+def normalize_months(months: Optional[List[str]]) -> MonthsKey:
+    """
+    规范化月份筛选参数
+
+    - None 或空列表表示不过滤（返回 None）
+    - '2025-1' / '2025-01' 统一为 '2025-01'，去重并排序
+    - 格式非法的月份会被忽略；全部非法时返回空元组（结果为空）
+    """
+    if not months:
+        return None
+
+    normalized = set()
+    for month in months:
+        match = re.match(r'^\s*(\d{4})-(\d{1,2})\s*$', str(month))
+        if match and 1 <= int(match.group(2)) <= 12:
+            normalized.add(f"{match.group(1)}-{int(match.group(2)):02d}")
+    return tuple(sorted(normalized))
 
 
 class ExcelProcessor:
     """Excel 处理器"""
-    
+
     def __init__(self, file_path: str):
         self.file_path = file_path
         self.sheets_data: Dict[str, pd.DataFrame] = {}
+        self._sheet_names: Optional[List[str]] = None
         self.workbook = None
         self.logger = get_logger("excel_processor")
         self._attendance_cache: Optional[pd.DataFrame] = None
         self._travel_cache: Dict[str, pd.DataFrame] = {}
-        self._combined_travel_cache: Optional[pd.DataFrame] = None
-        
-    def load_all_sheets(self, load_workbook_obj: bool = False) -> Dict[str, pd.DataFrame]:
+        self._combined_travel_cache: Dict[MonthsKey, pd.DataFrame] = {}
+        # 月份分区索引：{sheet_name: {'YYYY-MM': 行位置数组}}，在清洗后的数据上构建
+        self._month_index: Dict[str, Dict[str, np.ndarray]] = {}
+        self._month_slice_cache: Dict[Tuple[str, MonthsKey], pd.DataFrame] = {}
+        self._person_cost_cache: Dict[MonthsKey, pd.DataFrame] = {}
+        # 部门下钻统计预计算结果：{months_key: {'level1': {部门: 统计}, 'level2': {部门: 统计}}}
+        self._department_stats_cache: Dict[MonthsKey, Dict[str, Dict[str, Any]]] = {}
+        # 后台预计算与部门统计请求可能同时进行，后到者等待并复用已完成的结果
+        self._department_stats_lock = threading.Lock()
+
+    def reset_caches(self):
+        """清空清洗结果和各项分析的缓存（保留已读取的原始 Sheet），下一次分析重新计算"""
+        self._attendance_cache = None
+        self._travel_cache = {}
+        self._combined_travel_cache = {}
+        self._month_index = {}
+        self._month_slice_cache = {}
+        self._person_cost_cache = {}
+        self._department_stats_cache = {}
+
+    @server_timing.timed("excel.load")
+    def load_all_sheets(
+        self,
+        load_workbook_obj: bool = False,
+        required_sheets: Optional[List[str]] = None
+    ) -> Dict[str, pd.DataFrame]:
         """
-        加载所有 Sheet 数据
+        加载 Sheet 数据
 
         Args:
             load_workbook_obj: 是否同时加载 openpyxl Workbook 对象（仅在需要回写时启用）
+            required_sheets: 仅解析指定的 Sheet（工作簿中不存在的会被忽略）；为空时解析全部。
+                未预加载的 Sheet 仍可在 get_sheet 时按需读取
         """
         try:
             start = time.perf_counter()
             self.logger.info(f"开始读取 Excel 文件: {self.file_path}")
-            all_sheets = pd.read_excel(self.file_path, sheet_name=None)
+            if required_sheets is None:
+                all_sheets = pd.read_excel(self.file_path, sheet_name=None)
+                self._sheet_names = list(all_sheets.keys())
+            else:
+                available = set(self.get_sheet_names())
+                targets = [name for name in required_sheets if name in available]
+                all_sheets = pd.read_excel(self.file_path, sheet_name=targets) if targets else {}
             elapsed = time.perf_counter() - start
 
             self.sheets_data = all_sheets
-            self._attendance_cache = None
-            self._travel_cache = {}
-            self._combined_travel_cache = None
+            self.reset_caches()
 
             sheet_names = ", ".join(all_sheets.keys())
             self.logger.info(f"Excel 读取完成（{sheet_names}），耗时 {elapsed:.2f}s")
             
             # 输出每个 Sheet 的基本信息
             for sheet_name, df in all_sheets.items():
-                self.logger.info(f"Sheet [{sheet_name}]: {len(df)} 行, {len(df.columns)} 列")
-                self.logger.info(f"  列名: {list(df.columns)}")
-                if len(df) > 0:
-                    self.logger.info(f"  前2行数据预览:")
-                    for idx in range(min(2, len(df))):
-                        row_data = df.iloc[idx].to_dict()
-                        self.logger.info(f"    行{idx}: {row_data}")
+                self._log_sheet_overview(sheet_name, df)
             
             # 部分分析场景不需要 Workbook，仅在回写等场景按需加载
             if load_workbook_obj:
@@ -70,10 +135,22 @@ class ExcelProcessor:
         except Exception as e:
             raise Exception(f"读取 Excel 文件失败: {str(e)}")
 
+    def _log_sheet_overview(self, sheet_name: str, df: pd.DataFrame):
+        """输出 Sheet 的行列数；列名及前两行预览仅在 DEBUG 级别构造和输出"""
+        self.logger.info(f"Sheet [{sheet_name}]: {len(df)} 行, {len(df.columns)} 列")
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        self.logger.debug(f"  列名: {list(df.columns)}")
+        for idx in range(min(2, len(df))):
+            self.logger.debug(f"    行{idx}: {df.iloc[idx].to_dict()}")
+
     def get_sheet_names(self) -> List[str]:
         """
         仅获取 Sheet 名称，避免读取全部数据导致耗时
         """
+        if self._sheet_names is not None:
+            return self._sheet_names
+
         try:
             workbook = load_workbook(
                 self.file_path,
@@ -83,14 +160,31 @@ class ExcelProcessor:
             )
             sheet_names = workbook.sheetnames
             workbook.close()
+            self._sheet_names = sheet_names
             return sheet_names
         except Exception as e:
             raise Exception(f"读取 Excel Sheet 名称失败: {str(e)}")
     
     def get_sheet(self, sheet_name: str) -> Optional[pd.DataFrame]:
-        """获取指定 Sheet"""
-        return self.sheets_data.get(sheet_name)
+        """获取指定 Sheet，未加载时按需读取；Sheet 不存在返回 None"""
+        if sheet_name in self.sheets_data:
+            return self.sheets_data[sheet_name]
+
+        if sheet_name not in self.get_sheet_names():
+            return None
+
+        try:
+            start = time.perf_counter()
+            df = pd.read_excel(self.file_path, sheet_name=sheet_name)
+        except Exception as e:
+            raise Exception(f"读取 Sheet [{sheet_name}] 失败: {str(e)}")
+
+        self.logger.info(f"按需读取 Sheet [{sheet_name}]，耗时 {time.perf_counter() - start:.2f}s")
+        self._log_sheet_overview(sheet_name, df)
+        self.sheets_data[sheet_name] = df
+        return df
     
+    @server_timing.timed("excel.clean_attendance")
     def clean_attendance_data(self, use_cache: bool = True) -> pd.DataFrame:
         """
         清洗考勤数据（状态明细）
@@ -107,7 +201,7 @@ class ExcelProcessor:
         
         # 处理日期格式
         if '日期' in df.columns:
-            df['日期'] = pd.to_datetime(df['日期'], errors='coerce')
+            df['日期'] = parse_date_column(df['日期'], ATTENDANCE_SHEET, '日期', template_signature(df.columns))
         
         # 处理工时数据
         if '工时' in df.columns:
@@ -126,9 +220,11 @@ class ExcelProcessor:
 
         if use_cache:
             self._attendance_cache = df
+            self._month_index['状态明细'] = self._build_month_index(df, ['日期'])
         
         return df
     
+    @server_timing.timed("excel.clean_travel")
     def clean_travel_data(self, sheet_name: str, use_cache: bool = True) -> pd.DataFrame:
         """
         清洗差旅数据（机票/酒店/火车票）
@@ -141,7 +237,9 @@ class ExcelProcessor:
             self.logger.warning(f"[{sheet_name}] Sheet 不存在")
             return pd.DataFrame()
 
-        self.logger.info(f"[{sheet_name}] 开始清洗数据 - 原始列名: {list(df.columns)}")
+        self.logger.info(f"[{sheet_name}] 开始清洗数据")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"[{sheet_name}] 原始列名: {list(df.columns)}")
         self.logger.info(f"[{sheet_name}] 原始行数: {len(df)}")
 
         df = df.copy()
@@ -160,80 +258,50 @@ class ExcelProcessor:
         else:
             self.logger.warning(f"[{sheet_name}] 未找到金额列（授信金额或金额）")
         
-        def _parse_datetime_avoiding_time_only(series: pd.Series) -> pd.Series:
-            """
-            将列解析为 datetime，并避免把纯时间值（如 '22:17' 或 datetime.time）解析为“今天”的日期。
-            """
-            if series is None:
-                return pd.Series(dtype="datetime64[ns]")
-
-            # 已经是 datetime 类型
-            try:
-                if pd.api.types.is_datetime64_any_dtype(series):
-                    return pd.to_datetime(series, errors="coerce")
-            except Exception:
-                pass
-
-            # 处理 datetime.time 或纯时间字符串
-            time_only_regex = re.compile(r"^\\s*\\d{1,2}:\\d{2}(:\\d{2})?\\s*$")
-
-            def _is_time_obj(v: Any) -> bool:
-                try:
-                    from datetime import time as dt_time
-                    return isinstance(v, dt_time)
-                except Exception:
-                    return False
+        # 日期列按 (sheet, 列名, 模板签名) 推断一次格式，再整列向量化解析
+        signature = template_signature(original_df.columns)
 
-            if series.dtype == object:
-                cleaned = series.copy()
-                mask_time_obj = cleaned.map(_is_time_obj)
-                cleaned.loc[mask_time_obj] = None
-
-                str_series = cleaned.astype(str)
-                mask_time_str = str_series.str.match(time_only_regex, na=False)
-                cleaned.loc[mask_time_str] = None
-
-                return pd.to_datetime(cleaned, errors="coerce")
-
-            return pd.to_datetime(series, errors="coerce")
+        def _parse_datetime_avoiding_time_only(column: str) -> pd.Series:
+            """将列解析为 datetime，纯时间值（如 '22:17' 或 datetime.time）解析为 NaT"""
+            return parse_date_column(original_df[column], sheet_name, column, signature)
 
         found_date_cols: List[str] = []
         if sheet_name == '机票':
             if '起飞时间' in original_df.columns:
-                df['起飞日期'] = _parse_datetime_avoiding_time_only(original_df['起飞时间'])
+                df['起飞日期'] = _parse_datetime_avoiding_time_only('起飞时间')
                 found_date_cols.append('起飞时间→起飞日期')
             if '起飞时间.1' in original_df.columns:
-                df['起飞日期.1'] = _parse_datetime_avoiding_time_only(original_df['起飞时间.1'])
+                df['起飞日期.1'] = _parse_datetime_avoiding_time_only('起飞时间.1')
                 found_date_cols.append('起飞时间.1→起飞日期.1')
         elif sheet_name == '酒店':
             # 以“入住日期”为主；若存在“入住时间”（含日期时间），补充到“入住日期.1”
             if '入住日期' in original_df.columns:
-                df['入住日期'] = _parse_datetime_avoiding_time_only(original_df['入住日期'])
+                df['入住日期'] = _parse_datetime_avoiding_time_only('入住日期')
                 found_date_cols.append('入住日期')
             if '入住时间' in original_df.columns:
-                dt_full = _parse_datetime_avoiding_time_only(original_df['入住时间'])
+                dt_full = _parse_datetime_avoiding_time_only('入住时间')
                 if dt_full.notna().any():
                     df['入住日期.1'] = dt_full
                     found_date_cols.append('入住时间→入住日期.1')
         elif sheet_name == '火车票':
             # “出发日期”是关键日期字段。旧逻辑会把“出发时间”(HH:MM)写入“出发日期”，导致日期被解析成“今天”。
             if '出发日期' in original_df.columns:
-                df['出发日期'] = _parse_datetime_avoiding_time_only(original_df['出发日期'])
+                df['出发日期'] = _parse_datetime_avoiding_time_only('出发日期')
                 found_date_cols.append('出发日期')
             elif '出发时间' in original_df.columns:
                 # 兜底：某些模板可能只提供“出发时间”(包含日期时间)
-                df['出发日期'] = _parse_datetime_avoiding_time_only(original_df['出发时间'])
+                df['出发日期'] = _parse_datetime_avoiding_time_only('出发时间')
                 found_date_cols.append('出发时间→出发日期')
 
             # 如果“出发时间”存在且是完整日期时间，写入“出发日期.1”；若仅是时间字符串，则与“出发日期”组合
             if '出发时间' in original_df.columns:
-                dt_full = _parse_datetime_avoiding_time_only(original_df['出发时间'])
+                dt_full = _parse_datetime_avoiding_time_only('出发时间')
                 if dt_full.notna().any():
                     df['出发日期.1'] = dt_full
                     found_date_cols.append('出发时间→出发日期.1')
                 elif '出发日期' in df.columns and df['出发日期'].notna().any():
                     time_str = original_df['出发时间'].astype(str).str.strip()
-                    time_only_mask = time_str.str.match(r"^\\d{1,2}:\\d{2}(:\\d{2})?$", na=False)
+                    time_only_mask = time_str.str.match(TIME_ONLY_PATTERN, na=False)
                     if time_only_mask.any():
                         date_str = df['出发日期'].dt.strftime('%Y-%m-%d')
                         combined = pd.to_datetime(date_str + ' ' + time_str, errors='coerce')
@@ -253,29 +321,29 @@ class ExcelProcessor:
             self.logger.warning(f"[{sheet_name}] 未找到姓名列（差旅人员姓名或预订人姓名）")
 
         self.logger.info(f"[{sheet_name}] 清洗后行数: {len(df)}")
-        self.logger.info(f"[{sheet_name}] 最终列名: {list(df.columns)}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"[{sheet_name}] 最终列名: {list(df.columns)}")
 
         if use_cache:
             self._travel_cache[sheet_name] = df
+            self._month_index[sheet_name] = self._build_month_index(
+                df, TRAVEL_SHEET_DATE_COLUMNS.get(sheet_name, [])
+            )
         
         return df
 
-    def _get_combined_travel_df(self) -> pd.DataFrame:
+    def _get_combined_travel_df(self, months: Optional[List[str]] = None) -> pd.DataFrame:
         """
-        获取带消费日期和差旅类型的汇总差旅数据（使用缓存避免重复计算）
+        获取带消费日期和差旅类型的汇总差旅数据（按月份筛选结果分别缓存）
         """
-        if self._combined_travel_cache is not None:
-            return self._combined_travel_cache
+        months_key = normalize_months(months)
+        if months_key in self._combined_travel_cache:
+            return self._combined_travel_cache[months_key]
 
         frames: List[pd.DataFrame] = []
-        date_columns = {
-            '机票': ['起飞日期', '起飞日期.1', '起飞时间', '起飞时间.1'],
-            '酒店': ['入住日期', '入住时间'],
-            '火车票': ['出发日期', '出发时间']
-        }
 
-        for sheet_name, date_cols in date_columns.items():
-            df = self.clean_travel_data(sheet_name)
+        for sheet_name, date_cols in TRAVEL_SHEET_DATE_COLUMNS.items():
+            df = self._travel_frame(sheet_name, months)
             if df.empty:
                 continue
             
@@ -300,9 +368,56 @@ class ExcelProcessor:
         combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
             columns=['姓名', '消费日期', '差旅类型']
         )
-        self._combined_travel_cache = combined
+        self._combined_travel_cache[months_key] = combined
         return combined
 
+    def _build_month_index(self, df: pd.DataFrame, date_cols: List[str]) -> Dict[str, np.ndarray]:
+        """
+        基于日期列构建月份分区索引：{'YYYY-MM': 行位置数组}
+
+        日期为空或无法解析的行不属于任何月份，月份筛选时会被排除。
+        """
+        date_col = next((col for col in date_cols if col in df.columns), None)
+        if df.empty or date_col is None:
+            return {}
+
+        dates = pd.to_datetime(df[date_col], errors='coerce')
+        month_keys = (dates.dt.year * 100 + dates.dt.month).to_numpy()
+        groups = pd.Series(month_keys).groupby(month_keys, sort=True).indices
+
+        return {
+            f"{int(key) // 100:04d}-{int(key) % 100:02d}": positions
+            for key, positions in groups.items()
+        }
+
+    def _slice_by_months(self, sheet_name: str, df: pd.DataFrame, months: Optional[List[str]]) -> pd.DataFrame:
+        """
+        使用月份分区索引截取数据，months 为空时返回完整数据
+        """
+        months_key = normalize_months(months)
+        if months_key is None or df.empty:
+            return df
+
+        cache_key = (sheet_name, months_key)
+        if cache_key in self._month_slice_cache:
+            return self._month_slice_cache[cache_key]
+
+        index = self._month_index.get(sheet_name, {})
+        parts = [index[month] for month in months_key if month in index]
+        positions = np.sort(np.concatenate(parts)) if parts else np.array([], dtype=np.intp)
+        sliced = df.iloc[positions]
+
+        self._month_slice_cache[cache_key] = sliced
+        return sliced
+
+    def _attendance_frame(self, months: Optional[List[str]] = None) -> pd.DataFrame:
+        """获取清洗后的考勤数据，可按月份筛选"""
+        return self._slice_by_months('状态明细', self.clean_attendance_data(), months)
+
+    def _travel_frame(self, sheet_name: str, months: Optional[List[str]] = None) -> pd.DataFrame:
+        """获取清洗后的差旅数据，可按月份筛选"""
+        return self._slice_by_months(sheet_name, self.clean_travel_data(sheet_name), months)
+
     def _unknown_status_mask(self, df: pd.DataFrame) -> pd.Series:
         """
         标记考勤状态为未知/缺失的记录，用于疑似异常统计
@@ -331,18 +446,21 @@ class ExcelProcessor:
         
         return "", project_str
     
-    def aggregate_project_costs(self, top_n: int = 20) -> List[Dict[str, Any]]:
+    @server_timing.timed("excel.project_costs")
+    def aggregate_project_costs(self, top_n: int = 20, months: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         项目成本归集
         
         Args:
             top_n: 返回前N个项目，其余汇总到"其他"（默认20）
+            months: 月份筛选（YYYY-MM），为空时统计全部数据
         """
-        self.logger.info("=" * 80)
-        self.logger.info("开始执行项目成本归集 - 详细模式（Backend服务）")
-        self.logger.info("=" * 80)
-        
+        self.logger.info("开始执行项目成本归集")
+        # 逐条记录、金额分布和逐项目明细只在 DEBUG 级别构造
+        verbose = self.logger.isEnabledFor(logging.DEBUG)
+
         results = []
+        total_count = 0
         
         # 处理所有差旅相关的 Sheet
         travel_sheets = ['机票', '酒店', '火车票']
@@ -351,13 +469,17 @@ class ExcelProcessor:
         sheet_stats = {}
         
         for sheet_name in travel_sheets:
-            self.logger.info(f"\n📋 处理差旅表: {sheet_name}")
+            self.logger.info(f"📋 处理差旅表: {sheet_name}")
             
-            # 获取原始数据（未清洗）以获取真实行数
+            df = self._travel_frame(sheet_name, months)
+
+            # 获取原始数据（未清洗）以获取真实行数；按月筛选时原始数据无法按月对应，以筛选结果为准
             df_raw = self.get_sheet(sheet_name)
-            original_count = 0 if df_raw is None else len(df_raw)
-            
-            df = self.clean_travel_data(sheet_name)
+            if months:
+                original_count = len(df)
+            else:
+                original_count = 0 if df_raw is None else len(df_raw)
+
             if df.empty:
                 self.logger.warning(f"   ⚠️  {sheet_name} 数据为空")
                 continue
@@ -403,7 +525,7 @@ class ExcelProcessor:
                 sheet_total_amount += amount
                 
                 # 输出前3条记录的详细信息
-                if record_count <= 3:
+                if verbose and record_count <= 3:
                     person = row.get('姓名', '未知')
                     date_val = row.get(date_col, '') if date_col else ''
                     # 安全的日期格式化
@@ -421,37 +543,22 @@ class ExcelProcessor:
                 'amount': sheet_total_amount
             }
             
-            # 统计金额分布 - 基于所有清洗后记录
-            zero_amount_count = (df[amount_col] == 0).sum() if amount_col in df.columns else 0
-            negative_amount_count = (df[amount_col] < 0).sum() if amount_col in df.columns else 0
-            positive_amount_count = (df[amount_col] > 0).sum() if amount_col in df.columns else 0
             filtered_count = original_count - len(df)
-            
-            # 计算正数/负数金额总和（基于所有清洗后记录）
-            negative_amount_sum = df[df[amount_col] < 0][amount_col].sum() if amount_col in df.columns and negative_amount_count > 0 else 0
-            positive_amount_sum = df[df[amount_col] > 0][amount_col].sum() if amount_col in df.columns and positive_amount_count > 0 else 0
-            # 所有记录的净总金额（用于日志显示，确保与正数+负数一致）
-            sheet_all_amount = df[amount_col].sum() if amount_col in df.columns else 0
-            
-            self.logger.info(f"   ✅ 处理完成:")
-            self.logger.info(f"      - 总记录数: {record_count}")
-            if empty_project_count > 0:
-                self.logger.info(f"      - 空项目记录: {empty_project_count} (已归入\"空项目\"类别)")
+            self.logger.info(f"   ✅ 处理完成: 总记录数 {record_count}，空项目记录 {empty_project_count}")
             if filtered_count > 0:
                 self.logger.warning(f"      ⚠️  数据清洗时过滤记录: {filtered_count}条")
-            
-            # 金额分布统计（基于所有清洗后记录）
-            self.logger.info(f"      - 金额分布（全部记录）:")
-            if positive_amount_count > 0:
-                self.logger.info(f"         • 正数金额: {positive_amount_count}条, 合计 ¥{positive_amount_sum:,.2f}")
-            if negative_amount_count > 0:
-                self.logger.warning(f"         • 负数金额: {negative_amount_count}条, 合计 ¥{negative_amount_sum:,.2f} (退款/调整)")
-            if zero_amount_count > 0:
-                self.logger.info(f"         • 零值金额: {zero_amount_count}条")
-            self.logger.info(f"         • 净总金额: ¥{sheet_all_amount:,.2f}")
+
+            # 金额分布统计（基于所有清洗后记录，仅用于日志）
+            if verbose and amount_col in df.columns:
+                amounts = df[amount_col]
+                self.logger.debug(f"      - 金额分布（全部记录）:")
+                self.logger.debug(f"         • 正数金额: {(amounts > 0).sum()}条, 合计 ¥{amounts[amounts > 0].sum():,.2f}")
+                self.logger.debug(f"         • 负数金额: {(amounts < 0).sum()}条, 合计 ¥{amounts[amounts < 0].sum():,.2f} (退款/调整)")
+                self.logger.debug(f"         • 零值金额: {(amounts == 0).sum()}条")
+                self.logger.debug(f"         • 净总金额: ¥{amounts.sum():,.2f}")
         
         # 输出汇总统计
-        self.logger.info(f"\n📊 差旅数据汇总:")
+        self.logger.info(f"📊 差旅数据汇总:")
         original_total_records = sum(stats['original_total'] for stats in sheet_stats.values())
         cleaned_total_records = sum(stats['cleaned_total'] for stats in sheet_stats.values())
         total_records = sum(stats['record_count'] for stats in sheet_stats.values())
@@ -471,7 +578,7 @@ class ExcelProcessor:
         
         # 按项目代码聚合
         if all_records:
-            self.logger.info(f"\n🔄 开始聚合项目数据...")
+            self.logger.info(f"🔄 开始聚合项目数据...")
             df_projects = pd.DataFrame(all_records)
             self.logger.debug(f"   - 待聚合记录数: {len(df_projects)}")
             
@@ -493,10 +600,10 @@ class ExcelProcessor:
                 self.logger.error(f"      原始总计: ¥{total_amount:,.2f}")
                 self.logger.error(f"      聚合总计: ¥{grouped_total:,.2f}")
             
-            self.logger.info(f"\n🏆 项目成本排名（Top {min(20, total_count)}）:")
-
             # 日志始终只显示前20个项目的详细信息（保持日志可读性）
             log_top_n = min(20, total_count)
+            if verbose:
+                self.logger.debug(f"🏆 项目成本排名（Top {log_top_n}）:")
 
             # 如果项目数量超过 top_n，将超出部分汇总到"其他"
             if total_count > top_n:
@@ -516,12 +623,8 @@ class ExcelProcessor:
                     train_cost = project_df[project_df['type'] == '火车票']['amount'].sum()
 
                     # 日志只输出前20个
-                    if idx < log_top_n:
-                        self.logger.info(f"\n   #{idx+1}. {row['project_code']} - {row['project_name']}")
-                        self.logger.info(f"      总成本: ¥{row['amount']:,.2f} | 订单数: {int(row['person'])}")
-                        self.logger.info(f"      ├─ 机票: ¥{flight_cost:,.2f}")
-                        self.logger.info(f"      ├─ 酒店: ¥{hotel_cost:,.2f}")
-                        self.logger.info(f"      └─ 火车票: ¥{train_cost:,.2f}")
+                    if verbose and idx < log_top_n:
+                        self._log_project_costs(idx, row, flight_cost, hotel_cost, train_cost)
 
                     results.append({
                         'project_code': row['project_code'],
@@ -542,9 +645,10 @@ class ExcelProcessor:
                 others_hotel_cost = float(df_projects[df_projects['project_code'].isin(others_df['project_code']) & (df_projects['type'] == '酒店')]['amount'].sum())
                 others_train_cost = float(df_projects[df_projects['project_code'].isin(others_df['project_code']) & (df_projects['type'] == '火车票')]['amount'].sum())
                 
-                self.logger.info(f"\n   #{top_n+1}. 其他")
-                self.logger.info(f"      汇总项目数: {total_count - top_n}")
-                self.logger.info(f"      总成本: ¥{others_total_cost:,.2f} | 订单数: {others_record_count}")
+                self.logger.info(
+                    f"   #{top_n+1}. 其他: 汇总项目数 {total_count - top_n}，"
+                    f"总成本 ¥{others_total_cost:,.2f} | 订单数 {others_record_count}"
+                )
                 
                 results.append({
                     'project_code': '其他',
@@ -571,12 +675,10 @@ class ExcelProcessor:
                     hotel_cost = project_df[project_df['type'] == '酒店']['amount'].sum()
                     train_cost = project_df[project_df['type'] == '火车票']['amount'].sum()
                     
-                    self.logger.info(f"\n   #{idx+1}. {row['project_code']} - {row['project_name']}")
-                    self.logger.info(f"      总成本: ¥{row['amount']:,.2f} | 订单数: {int(row['person'])}")
-                    self.logger.info(f"      ├─ 机票: ¥{flight_cost:,.2f}")
-                    self.logger.info(f"      ├─ 酒店: ¥{hotel_cost:,.2f}")
-                    self.logger.info(f"      └─ 火车票: ¥{train_cost:,.2f}")
-                    
+                    if verbose:
+                        self._log_project_costs(idx, row, flight_cost, hotel_cost, train_cost)
+
+
                     results.append({
                         'project_code': row['project_code'],
                         'project_name': row['project_name'],
@@ -589,20 +691,49 @@ class ExcelProcessor:
                     })
             
             # 最终汇总
-            self.logger.info(f"\n" + "=" * 80)
-            self.logger.info(f"✅ 项目成本归集完成")
-            self.logger.info(f"=" * 80)
-            self.logger.info(f"📊 最终统计:")
-            self.logger.info(f"   - 返回项目数: {len(results)}")
-            self.logger.info(f"   - 总成本: ¥{sum(r['total_cost'] for r in results):,.2f}")
-            self.logger.info(f"   - 总订单数: {sum(r['record_count'] for r in results)}")
-            self.logger.info("=" * 80 + "\n")
+            self.logger.info(
+                f"✅ 项目成本归集完成: 返回项目数 {len(results)}，"
+                f"总成本 ¥{sum(r['total_cost'] for r in results):,.2f}，"
+                f"总订单数 {sum(r['record_count'] for r in results)}"
+            )
         else:
             self.logger.warning("⚠️  没有找到任何项目记录")
 
         return results, total_count
     
-    def cross_check_attendance_travel(self) -> List[Dict[str, Any]]:
+    def _log_project_costs(self, idx: int, row: pd.Series, flight_cost: float, hotel_cost: float, train_cost: float):
+        """DEBUG 级别输出单个项目的成本明细"""
+        self.logger.debug(f"   #{idx+1}. {row['project_code']} - {row['project_name']}")
+        self.logger.debug(f"      总成本: ¥{row['amount']:,.2f} | 订单数: {int(row['person'])}")
+        self.logger.debug(f"      ├─ 机票: ¥{flight_cost:,.2f} | 酒店: ¥{hotel_cost:,.2f} | 火车票: ¥{train_cost:,.2f}")
+
+    def _log_hours_breakdown(
+        self,
+        prefix: str,
+        workday_data: Optional[pd.DataFrame],
+        valid_hours: Optional[pd.Series],
+        holiday_data: pd.DataFrame,
+        holiday_valid_hours: pd.Series
+    ):
+        """DEBUG 级别输出工时计算的明细（调用方需先判断 DEBUG 是否启用）"""
+        if workday_data is not None:
+            self.logger.debug(f"{prefix} 工作日('上班')记录数: {len(workday_data)}，有效工时记录(工时!=0且非NaN): {len(valid_hours)}")
+            if not valid_hours.empty:
+                self.logger.debug(f"{prefix} 工作日平均工时: {valid_hours.mean():.2f}小时")
+        self.logger.debug(f"{prefix} 节假日('公休日上班')记录数: {len(holiday_data)}")
+        if len(holiday_data) > 0:
+            self.logger.debug(f"{prefix} 节假日工时字段前5个值: {holiday_data['工时'].head(5).tolist()}")
+            self.logger.debug(f"{prefix} 节假日工时=0的记录数: {(holiday_data['工时'] == 0).sum()}")
+            self.logger.debug(f"{prefix} 节假日工时为NaN的记录数: {holiday_data['工时'].isna().sum()}")
+        self.logger.debug(f"{prefix} 节假日有效工时记录(工时!=0且非NaN): {len(holiday_valid_hours)}")
+        if not holiday_valid_hours.empty:
+            self.logger.debug(
+                f"{prefix} 节假日平均工时: {holiday_valid_hours.mean():.2f}小时 (基于{len(holiday_valid_hours)}条记录)，"
+                f"样本: {holiday_valid_hours.head(5).tolist()}"
+            )
+
+    @server_timing.timed("excel.cross_check")
+    def cross_check_attendance_travel(self, months: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         交叉验证：考勤数据 vs 差旅数据
 
@@ -614,7 +745,7 @@ class ExcelProcessor:
         anomalies = []
 
         # 获取考勤数据
-        attendance_df = self.clean_attendance_data()
+        attendance_df = self._attendance_frame(months)
         if attendance_df.empty or '当日状态判断' not in attendance_df.columns:
             return anomalies
         if '日期' not in attendance_df.columns:
@@ -641,7 +772,7 @@ class ExcelProcessor:
             return anomalies
 
         # 聚合所有差旅数据（姓名 + 消费日期 + 差旅类型），并缓存
-        travel_df = self._get_combined_travel_df()
+        travel_df = self._get_combined_travel_df(months)
         if travel_df.empty:
             return anomalies
 
@@ -677,11 +808,12 @@ class ExcelProcessor:
         self.logger.info(f"交叉验证完成，发现 {len(anomalies)} 条异常记录（上班状态有差旅消费）")
         return anomalies
     
-    def analyze_booking_behavior(self) -> Dict[str, Any]:
+    @server_timing.timed("excel.booking_behavior")
+    def analyze_booking_behavior(self, months: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         预订行为分析（机票）
         """
-        df = self.clean_travel_data('机票')
+        df = self._travel_frame('机票', months)
         if df.empty or '提前预定天数' not in df.columns:
             return {}
         
@@ -717,7 +849,8 @@ class ExcelProcessor:
             'cost_by_advance_days': sorted(cost_by_advance_list, key=lambda x: x['advance_days'])
         }
 
-    def count_over_standard_orders(self) -> Dict[str, Any]:
+    @server_timing.timed("excel.over_standard")
+    def count_over_standard_orders(self, months: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         统计各差旅类型的超标订单数量
 
@@ -726,9 +859,9 @@ class ExcelProcessor:
         - 酒店：按“是否超标”为“是”
         - 火车票：按“是否超标”为“是”
         """
-        flight_df = self.clean_travel_data('机票')
-        hotel_df = self.clean_travel_data('酒店')
-        train_df = self.clean_travel_data('火车票')
+        flight_df = self._travel_frame('机票', months)
+        hotel_df = self._travel_frame('酒店', months)
+        train_df = self._travel_frame('火车票', months)
 
         def _count_yes(df: pd.DataFrame, column: str) -> int:
             if df.empty or column not in df.columns:
@@ -800,13 +933,14 @@ class ExcelProcessor:
             'flight_over_types': {k: int(v) for k, v in flight_over_type_counter.items()},
         }
 
-    def count_total_orders(self) -> Dict[str, int]:
+    @server_timing.timed("excel.order_counts")
+    def count_total_orders(self, months: Optional[List[str]] = None) -> Dict[str, int]:
         """
         统计各差旅类型及总订单数
         """
-        flight_df = self.clean_travel_data('机票')
-        hotel_df = self.clean_travel_data('酒店')
-        train_df = self.clean_travel_data('火车票')
+        flight_df = self._travel_frame('机票', months)
+        hotel_df = self._travel_frame('酒店', months)
+        train_df = self._travel_frame('火车票', months)
 
         flight = 0 if flight_df is None else int(len(flight_df))
         hotel = 0 if hotel_df is None else int(len(hotel_df))
@@ -819,20 +953,24 @@ class ExcelProcessor:
             'train': train,
         }
     
-    def calculate_department_costs(self, top_n: int = 15) -> List[Dict[str, Any]]:
+    @server_timing.timed("excel.department_costs")
+    def calculate_department_costs(self, top_n: int = 15, months: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         部门成本汇总（包含平均工时和人数统计）
         
         Args:
             top_n: 返回前N个部门，其余汇总到"其他"（默认15）
+            months: 月份筛选（YYYY-MM），为空时统计全部数据
         """
         results = []
         
         # 获取考勤数据以计算工时和人数
-        attendance_df = self.clean_attendance_data()
+        attendance_df = self._attendance_frame(months)
         dept_attendance_stats = {}
         
         if not attendance_df.empty and '一级部门' in attendance_df.columns:
+            verbose = self.logger.isEnabledFor(logging.DEBUG)
+            warnings = LogSampler()
             # 计算每个部门的平均工时和人数
             for dept in attendance_df['一级部门'].unique():
                 if pd.isna(dept):
@@ -843,41 +981,31 @@ class ExcelProcessor:
                 if '工时' in dept_data.columns and '当日状态判断' in dept_data.columns:
                     # 工作日平均工时计算
                     workday_data = dept_data[dept_data['当日状态判断'] == '上班']
-                    self.logger.info(f"  [{dept}] 工作日('上班')记录数: {len(workday_data)}")
                     valid_hours = workday_data[workday_data['工时'] != 0]['工时'].dropna()
-                    self.logger.info(f"  [{dept}] 工作日有效工时记录(工时!=0且非NaN): {len(valid_hours)}")
                     if not valid_hours.empty:
                         avg_hours = float(valid_hours.mean())
-                        self.logger.info(f"  [{dept}] 工作日平均工时: {avg_hours:.2f}小时")
                     if pd.isna(avg_hours):
                         avg_hours = 0
-                        self.logger.info(f"  [{dept}] 工作日平均工时为NaN，设为0")
 
                     # 节假日平均工时计算（公休日上班）
                     holiday_data = dept_data[dept_data['当日状态判断'] == '公休日上班']
-                    self.logger.info(f"  [{dept}] 节假日('公休日上班')记录数: {len(holiday_data)}")
-                    if len(holiday_data) > 0:
-                        self.logger.info(f"  [{dept}] 节假日工时字段前5个值: {holiday_data['工时'].head(5).tolist()}")
-                        self.logger.info(f"  [{dept}] 节假日工时=0的记录数: {(holiday_data['工时'] == 0).sum()}")
-                        self.logger.info(f"  [{dept}] 节假日工时为NaN的记录数: {holiday_data['工时'].isna().sum()}")
                     holiday_valid_hours = holiday_data[holiday_data['工时'] != 0]['工时'].dropna()
-                    self.logger.info(f"  [{dept}] 节假日有效工时记录(工时!=0且非NaN): {len(holiday_valid_hours)}")
                     if not holiday_valid_hours.empty:
                         holiday_avg_hours = float(holiday_valid_hours.mean())
-                        self.logger.info(f"  [{dept}] 节假日平均工时: {holiday_avg_hours:.2f}小时 (基于{len(holiday_valid_hours)}条记录)")
-                        self.logger.info(f"  [{dept}] 节假日工时样本: {holiday_valid_hours.head(5).tolist()}")
-                    else:
-                        holiday_avg_hours = 0
-                        self.logger.warning(f"  [{dept}] ⚠️  节假日平均工时为0 - 没有有效工时记录")
                     if pd.isna(holiday_avg_hours):
                         holiday_avg_hours = 0
-                        self.logger.warning(f"  [{dept}] ⚠️  节假日平均工时为NaN，设为0")
+                    if verbose:
+                        self._log_hours_breakdown(f"  [{dept}]", workday_data, valid_hours, holiday_data, holiday_valid_hours)
+                    if holiday_valid_hours.empty and warnings.should_log():
+                        self.logger.warning(f"  [{dept}] ⚠️  节假日平均工时为0 - 没有有效工时记录")
                 person_count = dept_data['姓名'].nunique() if '姓名' in dept_data.columns else 0
                 dept_attendance_stats[dept] = {
                     'avg_hours': float(avg_hours),
                     'holiday_avg_hours': float(holiday_avg_hours),
                     'person_count': int(person_count)
                 }
+            if warnings.count() > warnings.first:
+                self.logger.warning(f"共 {warnings.count()} 个部门没有节假日有效工时记录（仅输出部分部门）")
         
         # 始终从明细表计算部门成本（不使用"差旅汇总" sheet）
         travel_data = {
@@ -889,7 +1017,7 @@ class ExcelProcessor:
         dept_costs = {}
         
         for sheet_name, cost_key in travel_data.items():
-            df = self.clean_travel_data(sheet_name)
+            df = self._travel_frame(sheet_name, months)
             if df.empty:
                 continue
             
@@ -985,11 +1113,12 @@ class ExcelProcessor:
         
         return top_results
     
-    def get_attendance_summary(self) -> Dict[str, Any]:
+    @server_timing.timed("excel.attendance_summary")
+    def get_attendance_summary(self, months: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         考勤数据汇总
         """
-        df = self.clean_attendance_data()
+        df = self._attendance_frame(months)
         if df.empty:
             return {}
 
@@ -1042,63 +1171,22 @@ class ExcelProcessor:
             self.workbook = load_workbook(self.file_path)
         
         # 创建分析结果 Sheet
-        sheet_name = "分析结果"
+        sheet_name = ANALYSIS_SHEET_NAME
         if sheet_name in self.workbook.sheetnames:
             del self.workbook[sheet_name]
         
         ws = self.workbook.create_sheet(sheet_name)
         
-        # 写入标题
-        ws.append(["CostMatrix 数据分析报告"])
-        ws.append([f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"])
-        ws.append([])
-        
-        # 写入项目成本
-        if 'project_costs' in results and results['project_costs']:
-            ws.append(["项目成本归集"])
-            ws.append(["项目代码", "项目名称", "总成本", "记录数"])
-            for item in results['project_costs']:
-                ws.append([
-                    item['project_code'],
-                    item['project_name'],
-                    item['total_cost'],
-                    item['record_count']
-                ])
-            ws.append([])
-        
-        # 写入部门成本
-        if 'department_costs' in results and results['department_costs']:
-            ws.append(["部门成本汇总"])
-            ws.append(["部门", "总成本", "机票", "酒店", "火车票"])
-            for item in results['department_costs']:
-                ws.append([
-                    item['department'],
-                    item['total_cost'],
-                    item['flight_cost'],
-                    item['hotel_cost'],
-                    item['train_cost']
-                ])
-            ws.append([])
-        
-        # 写入异常记录
-        if 'anomalies' in results and results['anomalies']:
-            ws.append(["交叉验证异常"])
-            ws.append(["姓名", "日期", "异常类型", "考勤状态", "说明"])
-            for item in results['anomalies']:
-                ws.append([
-                    item['name'],
-                    item['date'],
-                    item['anomaly_type'],
-                    item['attendance_status'],
-                    item['description']
-                ])
+        for row in analysis_result_rows(results):
+            ws.append(row)
         
         # 保存文件
         self.workbook.save(output_path)
 
         return output_path
 
-    def get_all_project_details(self) -> List[Dict[str, Any]]:
+    @server_timing.timed("excel.project_details")
+    def get_all_project_details(self, months: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         获取所有项目的详细信息（包括人员、日期范围、超标等）
 
@@ -1115,7 +1203,7 @@ class ExcelProcessor:
 
         # 收集所有差旅记录
         for sheet_name in travel_sheets:
-            df = self.clean_travel_data(sheet_name)
+            df = self._travel_frame(sheet_name, months)
             if df.empty or '项目' not in df.columns:
                 continue
 
@@ -1124,7 +1212,7 @@ class ExcelProcessor:
             date_col = next((col for col in date_cols if col in df.columns), None)
 
             # 获取考勤数据用于部门信息（作为备用）
-            attendance_df = self.clean_attendance_data()
+            attendance_df = self._attendance_frame(months)
             person_dept_map = {}
             if not attendance_df.empty and '姓名' in attendance_df.columns and '一级部门' in attendance_df.columns:
                 person_dept_map = attendance_df[['姓名', '一级部门']].drop_duplicates().set_index('姓名')['一级部门'].to_dict()
@@ -1273,12 +1361,14 @@ class ExcelProcessor:
 
         return results
 
-    def get_project_order_records(self, project_code: str) -> List[Dict[str, Any]]:
+    @server_timing.timed("excel.project_orders")
+    def get_project_order_records(self, project_code: str, months: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         获取指定项目的所有订单记录
 
         Args:
             project_code: 项目代码
+            months: 月份筛选（YYYY-MM），为空时统计全部数据
 
         Returns:
             该项目的所有订单记录列表
@@ -1286,14 +1376,11 @@ class ExcelProcessor:
         travel_sheets = ['机票', '酒店', '火车票']
         records = []
 
-        # 获取考勤数据用于部门信息
-        attendance_df = self.clean_attendance_data()
-        person_dept_map = {}
-        if not attendance_df.empty and '姓名' in attendance_df.columns and '一级部门' in attendance_df.columns:
-            person_dept_map = attendance_df[['姓名', '一级部门']].drop_duplicates().set_index('姓名')['一级部门'].to_dict()
+        # 考勤数据仅在差旅表缺少部门信息时才用于兜底，按需读取
+        person_dept_map: Optional[Dict[str, Any]] = None
 
         for sheet_name in travel_sheets:
-            df = self.clean_travel_data(sheet_name)
+            df = self._travel_frame(sheet_name, months)
             if df.empty or '项目' not in df.columns:
                 continue
 
@@ -1326,6 +1413,8 @@ class ExcelProcessor:
                     if pd.isna(department) or (isinstance(department, str) and department.strip() == ''):
                         department = None
                 if not department:
+                    if person_dept_map is None:
+                        person_dept_map = self._person_department_map(months)
                     department = person_dept_map.get(person, '未知部门')
                 else:
                     department = str(department).strip()
@@ -1385,7 +1474,15 @@ class ExcelProcessor:
 
         return records
 
-    def get_department_hierarchy(self) -> Dict[str, Any]:
+    def _person_department_map(self, months: Optional[List[str]] = None) -> Dict[str, Any]:
+        """从考勤数据构建 姓名 -> 一级部门 映射"""
+        attendance_df = self._attendance_frame(months)
+        if attendance_df.empty or '姓名' not in attendance_df.columns or '一级部门' not in attendance_df.columns:
+            return {}
+        return attendance_df[['姓名', '一级部门']].drop_duplicates().set_index('姓名')['一级部门'].to_dict()
+
+    @server_timing.timed("excel.department_hierarchy")
+    def get_department_hierarchy(self, months: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         获取部门层级结构
 
@@ -1396,7 +1493,7 @@ class ExcelProcessor:
                 'level3': {'二级部门1': ['三级部门1', '三级部门2'], ...}
             }
         """
-        df = self.clean_attendance_data()
+        df = self._attendance_frame(months)
         if df.empty:
             return {'level1': [], 'level2': {}, 'level3': {}}
 
@@ -1425,18 +1522,20 @@ class ExcelProcessor:
 
         return result
 
-    def get_department_list(self, level: int, parent: Optional[str] = None) -> List[Dict[str, Any]]:
+    @server_timing.timed("excel.department_list")
+    def get_department_list(self, level: int, parent: Optional[str] = None, months: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         获取部门列表
 
         Args:
             level: 部门层级 (1=一级, 2=二级, 3=三级)
             parent: 父部门名称（level>1时必需）
+            months: 月份筛选（YYYY-MM），为空时统计全部数据
 
         Returns:
             部门列表，每个部门包含人数、成本、平均工时等信息
         """
-        df = self.clean_attendance_data()
+        df = self._attendance_frame(months)
         if df.empty:
             self.logger.warning(f"get_department_list: 考勤数据为空，level={level}, parent={parent}")
             return []
@@ -1466,8 +1565,10 @@ class ExcelProcessor:
         self.logger.info(f"get_department_list: 找到 {len(departments)} 个{dept_col}: {departments[:5]}...")
 
         # 获取差旅数据用于成本计算
-        dept_costs = self._calculate_costs_by_department(filtered_df, dept_col)
+        dept_costs = self._calculate_costs_by_department(filtered_df, dept_col, months)
 
+        verbose = self.logger.isEnabledFor(logging.DEBUG)
+        warnings = LogSampler()
         results = []
         for dept in departments:
             dept_data = filtered_df[filtered_df[dept_col] == dept]
@@ -1485,18 +1586,12 @@ class ExcelProcessor:
             if '工时' in dept_data.columns and '当日状态判断' in dept_data.columns:
                 # 节假日平均工时计算（公休日上班）
                 holiday_data = dept_data[dept_data['当日状态判断'] == '公休日上班']
-                self.logger.info(f"[部门列表-{dept}] 节假日('公休日上班')记录数: {len(holiday_data)}")
-                if len(holiday_data) > 0:
-                    self.logger.info(f"[部门列表-{dept}] 节假日工时字段前5个值: {holiday_data['工时'].head(5).tolist()}")
-                    self.logger.info(f"[部门列表-{dept}] 节假日工时=0的记录数: {(holiday_data['工时'] == 0).sum()}")
-                    self.logger.info(f"[部门列表-{dept}] 节假日工时为NaN的记录数: {holiday_data['工时'].isna().sum()}")
                 holiday_valid_hours = holiday_data[holiday_data['工时'] != 0]['工时'].dropna()
-                self.logger.info(f"[部门列表-{dept}] 节假日有效工时记录(工时!=0且非NaN): {len(holiday_valid_hours)}")
                 if not holiday_valid_hours.empty:
                     holiday_avg_hours = float(holiday_valid_hours.mean())
-                    self.logger.info(f"[部门列表-{dept}] 节假日平均工时: {holiday_avg_hours:.2f}小时 (基于{len(holiday_valid_hours)}条记录)")
-                    self.logger.info(f"[部门列表-{dept}] 节假日工时样本: {holiday_valid_hours.head(5).tolist()}")
-                else:
+                if verbose:
+                    self._log_hours_breakdown(f"[部门列表-{dept}]", None, None, holiday_data, holiday_valid_hours)
+                if holiday_valid_hours.empty and warnings.should_log():
                     self.logger.warning(f"[部门列表-{dept}] ⚠️  节假日平均工时为0 - 没有有效工时记录")
 
             # 获取成本
@@ -1512,6 +1607,9 @@ class ExcelProcessor:
                 'holiday_avg_work_hours': round(holiday_avg_hours, 2)
             })
 
+        if warnings.count() > warnings.first:
+            self.logger.warning(f"get_department_list: 共 {warnings.count()} 个部门没有节假日有效工时记录（仅输出部分部门）")
+
         # 按成本降序排序
         results.sort(key=lambda x: x['total_cost'], reverse=True)
 
@@ -1519,85 +1617,102 @@ class ExcelProcessor:
 
         return results
 
-    def _calculate_costs_by_department(self, attendance_df: pd.DataFrame, dept_col: str) -> Dict[str, Dict[str, float]]:
+    def _person_travel_costs(self, months: Optional[List[str]] = None) -> pd.DataFrame:
         """
-        计算各部门的差旅成本
-
-        Args:
-            attendance_df: 考勤数据（已按部门筛选）
-            dept_col: 部门列名
+        按人员汇总差旅成本（向量化，按月份筛选结果缓存）
 
         Returns:
-            {部门名: {total_cost, flight_cost, hotel_cost, train_cost}}
+            index 为姓名，列为 COST_COLUMNS 的 DataFrame；仅包含有差旅记录的人员
         """
-        dept_costs = {}
+        months_key = normalize_months(months)
+        if months_key in self._person_cost_cache:
+            return self._person_cost_cache[months_key]
 
-        if attendance_df.empty:
-            self.logger.warning(f"_calculate_costs_by_department: attendance_df 为空")
-            return dept_costs
-
-        # 获取姓名到部门的映射（保留所有映射，一个人可能属于多个部门）
-        name_dept_map = {}
-        for _, row in attendance_df[['姓名', dept_col]].drop_duplicates().iterrows():
-            name = row.get('姓名')
-            dept = row.get(dept_col)
-            if not name or pd.isna(name) or not dept or pd.isna(dept):
+        cost_keys = {'机票': 'flight_cost', '酒店': 'hotel_cost', '火车票': 'train_cost'}
+        frames = []
+        for sheet_name, cost_key in cost_keys.items():
+            df = self._travel_frame(sheet_name, months)
+            if df.empty or '姓名' not in df.columns:
                 continue
-            if name not in name_dept_map:
-                name_dept_map[name] = []
-            if dept not in name_dept_map[name]:
-                name_dept_map[name].append(dept)
 
-        # 遍历差旅数据
-        travel_sheets = ['机票', '酒店', '火车票']
-        cost_keys = {'机票': 'flight_cost', '酒店': 'hotel_cost', '火车票': 'train_cost'}
+            amount_col = '授信金额' if '授信金额' in df.columns else '金额'
+            amounts = df[amount_col].fillna(0) if amount_col in df.columns else 0.0
+            frames.append(pd.DataFrame({'姓名': df['姓名'], 'cost_key': cost_key, 'amount': amounts}))
+
+        if frames:
+            records = pd.concat(frames, ignore_index=True)
+            records = records[records['姓名'].notna() & (records['姓名'] != '')]
+            costs = records.pivot_table(
+                index='姓名', columns='cost_key', values='amount', aggfunc='sum', fill_value=0
+            )
+        else:
+            costs = pd.DataFrame()
 
-        total_records = 0
-        matched_records = 0
+        costs = costs.reindex(columns=COST_COLUMNS[1:], fill_value=0.0).astype(float)
+        costs['total_cost'] = costs.sum(axis=1)
+        costs = costs[COST_COLUMNS]
 
-        for sheet_name in travel_sheets:
-            df = self.clean_travel_data(sheet_name)
-            if df.empty:
-                continue
+        self._person_cost_cache[months_key] = costs
+        return costs
 
-            amount_col = '授信金额' if '授信金额' in df.columns else '金额'
+    def _costs_by_group(
+        self,
+        attendance_df: pd.DataFrame,
+        group_cols: List[str],
+        months: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        按部门分组汇总差旅成本（一个人属于多个部门时，成本计入所有关联部门）
 
-            for _, row in df.iterrows():
-                total_records += 1
-                name = row.get('姓名', '')
-                if not name or pd.isna(name):
-                    continue
+        Returns:
+            index 为 group_cols，列为 COST_COLUMNS 的 DataFrame；仅包含有差旅记录匹配的部门
+        """
+        cols = group_cols + ['姓名']
+        if attendance_df.empty or any(col not in attendance_df.columns for col in cols):
+            return pd.DataFrame(columns=COST_COLUMNS)
 
-                depts = name_dept_map.get(name, [])
-                if not depts:
-                    continue
+        pairs = attendance_df[cols].dropna().drop_duplicates()
+        for col in cols:
+            pairs = pairs[pairs[col] != '']
 
-                matched_records += 1
-                amount = row.get(amount_col, 0) or 0
-                cost_key = cost_keys[sheet_name]
+        person_costs = self._person_travel_costs(months)
+        merged = pairs.merge(person_costs, left_on='姓名', right_index=True, how='inner')
+        return merged.groupby(group_cols, sort=False)[COST_COLUMNS].sum()
 
-                # 一个人可能属于多个部门，将成本分配到所有关联部门
-                for dept in depts:
-                    if dept not in dept_costs:
-                        dept_costs[dept] = {'total_cost': 0, 'flight_cost': 0, 'hotel_cost': 0, 'train_cost': 0}
-                    dept_costs[dept][cost_key] += amount
-                    dept_costs[dept]['total_cost'] += amount
+    def _calculate_costs_by_department(self, attendance_df: pd.DataFrame, dept_col: str, months: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+        """
+        计算各部门的差旅成本
 
-        self.logger.info(f"_calculate_costs_by_department: 差旅记录 {total_records} 条，匹配 {matched_records} 条，部门数 {len(dept_costs)}")
+        Args:
+            attendance_df: 考勤数据（已按部门筛选）
+            dept_col: 部门列名
+            months: 月份筛选（YYYY-MM），为空时统计全部数据
+
+        Returns:
+            {部门名: {total_cost, flight_cost, hotel_cost, train_cost}}
+        """
+        if attendance_df.empty:
+            self.logger.warning(f"_calculate_costs_by_department: attendance_df 为空")
+            return {}
+
+        dept_costs = self._costs_by_group(attendance_df, [dept_col], months).to_dict('index')
+        self.logger.info(f"_calculate_costs_by_department: 按 {dept_col} 汇总，部门数 {len(dept_costs)}")
         return dept_costs
 
-    def get_department_detail_metrics(self, department_name: str, level: int = 3) -> Dict[str, Any]:
+    @server_timing.timed("excel.department_details")
+    def get_department_detail_metrics(self, department_name: str, level: int = 3, months: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         获取指定部门的详细指标（12项）
 
         Args:
             department_name: 部门名称
             level: 部门层级 (1=一级, 2=二级, 3=三级)
+            months: 月份筛选（YYYY-MM），为空时统计全部数据
 
         Returns:
             包含12项指标的字典
         """
-        df = self.clean_attendance_data()
+        df = self._attendance_frame(months)
         if df.empty:
             return {}
 
@@ -1642,26 +1757,19 @@ class ExcelProcessor:
         if '工时' in dept_df.columns and '当日状态判断' in dept_df.columns:
             # 工作日平均工时计算
             workday_data = dept_df[dept_df['当日状态判断'] == '上班']
-            self.logger.info(f"[部门详情-{department_name}] 工作日('上班')记录数: {len(workday_data)}")
             valid_hours = workday_data[workday_data['工时'] != 0]['工时'].dropna()
-            self.logger.info(f"[部门详情-{department_name}] 工作日有效工时记录(工时!=0且非NaN): {len(valid_hours)}")
             if not valid_hours.empty:
                 avg_work_hours = float(valid_hours.mean())
-                self.logger.info(f"[部门详情-{department_name}] 工作日平均工时: {avg_work_hours:.2f}小时")
 
             # 节假日平均工时计算（公休日上班）
             holiday_data = dept_df[dept_df['当日状态判断'] == '公休日上班']
-            self.logger.info(f"[部门详情-{department_name}] 节假日('公休日上班')记录数: {len(holiday_data)}")
-            if len(holiday_data) > 0:
-                self.logger.info(f"[部门详情-{department_name}] 节假日工时字段前5个值: {holiday_data['工时'].head(5).tolist()}")
-                self.logger.info(f"[部门详情-{department_name}] 节假日工时=0的记录数: {(holiday_data['工时'] == 0).sum()}")
-                self.logger.info(f"[部门详情-{department_name}] 节假日工时为NaN的记录数: {holiday_data['工时'].isna().sum()}")
             holiday_valid_hours = holiday_data[holiday_data['工时'] != 0]['工时'].dropna()
-            self.logger.info(f"[部门详情-{department_name}] 节假日有效工时记录(工时!=0且非NaN): {len(holiday_valid_hours)}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self._log_hours_breakdown(
+                    f"[部门详情-{department_name}]", workday_data, valid_hours, holiday_data, holiday_valid_hours
+                )
             if not holiday_valid_hours.empty:
                 holiday_avg_work_hours = float(holiday_valid_hours.mean())
-                self.logger.info(f"[部门详情-{department_name}] 节假日平均工时: {holiday_avg_work_hours:.2f}小时 (基于{len(holiday_valid_hours)}条记录)")
-                self.logger.info(f"[部门详情-{department_name}] 节假日工时样本: {holiday_valid_hours.head(5).tolist()}")
             else:
                 holiday_avg_work_hours = 0
                 self.logger.warning(f"[部门详情-{department_name}] ⚠️  节假日平均工时为0 - 没有有效工时记录")
@@ -1759,12 +1867,14 @@ class ExcelProcessor:
             'longest_hours_ranking': longest_hours_ranking
         }
 
-    def get_level1_department_statistics(self, level1_name: str) -> Dict[str, Any]:
+    @server_timing.timed("excel.level1_statistics")
+    def get_level1_department_statistics(self, level1_name: str, months: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         获取一级部门的汇总统计数据（用于二级部门表格下方的统计展示）
 
         Args:
             level1_name: 一级部门名称
+            months: 月份筛选（YYYY-MM），为空时统计全部数据
 
         Returns:
             包含以下统计数据的字典:
@@ -1774,194 +1884,155 @@ class ExcelProcessor:
             - avg_hours_ranking: 平均工时排行榜（按人）
             - level2_department_stats: 二级部门统计列表（包含所有指标）
         """
-        df = self.clean_attendance_data()
-        if df.empty:
-            return {}
+        return self.precompute_department_statistics(months)['level1'].get(level1_name, {})
 
-        # 筛选该一级部门的数据
-        level1_df = df[df['一级部门'] == level1_name].copy()
+    @server_timing.timed("excel.level2_statistics")
+    def get_level2_department_statistics(self, level2_name: str, months: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        获取二级部门的汇总统计数据（用于三级部门表格下方的统计展示）
 
-        if level1_df.empty:
-            return {}
+        Args:
+            level2_name: 二级部门名称
+            months: 月份筛选（YYYY-MM），为空时统计全部数据
 
-        # 1. 累计差旅成本
-        total_travel_cost = 0
-        dept_costs = self._calculate_costs_by_department(level1_df, '二级部门')
-        for cost_info in dept_costs.values():
-            total_travel_cost += cost_info['total_cost']
+        Returns:
+            包含以下统计数据的字典:
+            - total_travel_cost: 累计差旅成本
+            - attendance_days_distribution: 考勤天数分布
+            - travel_ranking: 出差排行榜（按人）
+            - avg_hours_ranking: 平均工时排行榜（按人）
+            - level3_department_stats: 三级部门统计列表（包含所有指标）
+        """
+        return self.precompute_department_statistics(months)['level2'].get(level2_name, {})
 
-        # 2. 考勤天数分布（整个一级部门）
-        attendance_days_distribution = {}
-        if '当日状态判断' in level1_df.columns:
-            attendance_days_distribution = level1_df['当日状态判断'].value_counts().to_dict()
+    @server_timing.timed("excel.department_statistics")
+    def precompute_department_statistics(self, months: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        一次分组遍历计算所有一级、二级部门的下钻统计，结果按月份筛选缓存在处理器上
 
-        # 3. 出差排行榜（按人，在整个一级部门范围内）
-        travel_ranking = []
-        if '当日状态判断' in level1_df.columns:
-            travel_df = level1_df[level1_df['当日状态判断'] == '出差']
-            if not travel_df.empty and '姓名' in travel_df.columns:
-                travel_counts = travel_df['姓名'].value_counts().head(10)
-                travel_ranking = [
-                    {'name': name, 'value': int(count), 'detail': f'{count}天'}
-                    for name, count in travel_counts.items()
-                ]
+        Returns:
+            {'level1': {一级部门: 统计}, 'level2': {二级部门: 统计}}
+        """
+        months_key = normalize_months(months)
+        cached = self._department_stats_cache.get(months_key)
+        if cached is not None:
+            return cached
+        with self._department_stats_lock:
+            cached = self._department_stats_cache.get(months_key)
+            if cached is not None:
+                return cached
+            result = self._compute_department_statistics(months)
+            self._department_stats_cache[months_key] = result
+            return result
+
+    def _compute_department_statistics(self, months: Optional[List[str]]) -> Dict[str, Dict[str, Any]]:
+        """按月份筛选计算所有一级、二级部门的下钻统计（不读写缓存）"""
+        start = time.perf_counter()
+        df = self._attendance_frame(months)
+        level1_stats: Dict[str, Any] = {}
+        level2_stats: Dict[str, Any] = {}
+
+        if not df.empty and '一级部门' in df.columns:
+            # 二级部门成本以一级部门为范围统计（同名二级部门在不同一级部门下分别计算）
+            l2_cost_map = self._costs_by_group(df, ['一级部门', '二级部门'], months)['total_cost'].to_dict()
+            for level1_name, level1_df in df.groupby('一级部门', sort=False):
+                level2_costs = {l2: cost for (l1, l2), cost in l2_cost_map.items() if l1 == level1_name}
+                level1_stats[level1_name] = self._build_level1_statistics(level1_name, level1_df, level2_costs)
+
+        if not df.empty and '二级部门' in df.columns:
+            l2_total_map = self._costs_by_group(df, ['二级部门'], months)['total_cost'].to_dict()
+            l3_cost_map = self._costs_by_group(df, ['二级部门', '三级部门'], months)['total_cost'].to_dict()
+            for level2_name, level2_df in df.groupby('二级部门', sort=False):
+                level3_costs = {l3: cost for (l2, l3), cost in l3_cost_map.items() if l2 == level2_name}
+                if level2_name in l2_total_map:
+                    total_travel_cost = l2_total_map[level2_name]
+                else:
+                    # 兜底：按三级部门汇总成本
+                    total_travel_cost = sum(level3_costs.values())
+                level2_stats[level2_name] = self._build_level2_statistics(
+                    level2_name, level2_df, total_travel_cost, level3_costs
+                )
 
-        avg_hours_ranking = []
-        if '工时' in level1_df.columns and '姓名' in level1_df.columns and '当日状态判断' in level1_df.columns:
-            workday_df = level1_df[level1_df['当日状态判断'] == '上班']
-            person_avg_hours = workday_df[workday_df['工时'].notna() & (workday_df['工时'] != 0)].groupby('姓名')['工时'].mean()
-            person_avg_hours = person_avg_hours.sort_values(ascending=False)
-            for name, avg_hours in person_avg_hours.head(10).items():
-                avg_hours_ranking.append({
-                    'name': name,
-                    'value': float(round(avg_hours, 2)),
-                    'detail': f'{avg_hours:.2f}小时'
-                })
+        result = {'level1': level1_stats, 'level2': level2_stats}
+        self.logger.info(
+            f"部门下钻统计预计算完成：一级部门 {len(level1_stats)} 个，二级部门 {len(level2_stats)} 个，"
+            f"耗时 {time.perf_counter() - start:.2f}s"
+        )
+        return result
+
+    def _build_level1_statistics(
+        self,
+        level1_name: str,
+        level1_df: pd.DataFrame,
+        level2_costs: Dict[str, float]
+    ) -> Dict[str, Any]:
+        """基于一级部门的考勤数据与二级部门成本构建统计结果"""
+        attendance_days_distribution, travel_ranking, avg_hours_ranking = self._department_overview(level1_df)
 
-        # 5. 二级部门统计（包含所有指标）
         level2_department_stats = []
         if '二级部门' in level1_df.columns:
-            level2_list = level1_df['二级部门'].dropna().unique().tolist()
-
-            for l2_dept in level2_list:
-                l2_df = level1_df[level1_df['二级部门'] == l2_dept]
-
-                # 计算人数
-                person_count = l2_df['姓名'].nunique() if '姓名' in l2_df.columns else 0
-
-                # 计算平均工时
-                avg_hours = 0
-                holiday_avg_hours = 0
-                if '工时' in l2_df.columns and '当日状态判断' in l2_df.columns:
-                    valid_hours = l2_df[(l2_df['当日状态判断'] == '上班') & (l2_df['工时'] != 0)]['工时'].dropna()
-                    if not valid_hours.empty:
-                        avg_hours = float(valid_hours.mean())
-
-                    # 节假日平均工时计算（公休日上班）
-                    holiday_data = l2_df[l2_df['当日状态判断'] == '公休日上班']
-                    self.logger.info(f"[一级部门统计-{level1_name}/{l2_dept}] 节假日('公休日上班')记录数: {len(holiday_data)}")
-                    if len(holiday_data) > 0:
-                        self.logger.info(f"[一级部门统计-{level1_name}/{l2_dept}] 节假日工时字段前5个值: {holiday_data['工时'].head(5).tolist()}")
-                        self.logger.info(f"[一级部门统计-{level1_name}/{l2_dept}] 节假日工时=0的记录数: {(holiday_data['工时'] == 0).sum()}")
-                        self.logger.info(f"[一级部门统计-{level1_name}/{l2_dept}] 节假日工时为NaN的记录数: {holiday_data['工时'].isna().sum()}")
-                    holiday_valid_hours = holiday_data[holiday_data['工时'] != 0]['工时'].dropna()
-                    self.logger.info(f"[一级部门统计-{level1_name}/{l2_dept}] 节假日有效工时记录(工时!=0且非NaN): {len(holiday_valid_hours)}")
-                    if not holiday_valid_hours.empty:
-                        holiday_avg_hours = float(holiday_valid_hours.mean())
-                        self.logger.info(f"[一级部门统计-{level1_name}/{l2_dept}] 节假日平均工时: {holiday_avg_hours:.2f}小时 (基于{len(holiday_valid_hours)}条记录)")
-                        self.logger.info(f"[一级部门统计-{level1_name}/{l2_dept}] 节假日工时样本: {holiday_valid_hours.head(5).tolist()}")
-                    else:
-                        self.logger.warning(f"[一级部门统计-{level1_name}/{l2_dept}] ⚠️  节假日平均工时为0 - 没有有效工时记录")
-
-                # 工作日出勤天数
-                workday_attendance_days = 0
-                if '当日状态判断' in l2_df.columns:
-                    workday_attendance_days = int(l2_df[l2_df['当日状态判断'] == '上班'].shape[0])
-
-                # 公休日上班天数
-                weekend_work_days = 0
-                if '当日状态判断' in l2_df.columns:
-                    weekend_work_days = int(l2_df[l2_df['当日状态判断'] == '公休日上班'].shape[0])
-
-                # 周末出勤次数（同步公休日上班统计，保持与饼图数据一致）
-                weekend_attendance_count = weekend_work_days
-
-                # 出差天数
-                travel_days = 0
-                if '当日状态判断' in l2_df.columns:
-                    travel_days = int(l2_df[l2_df['当日状态判断'] == '出差'].shape[0])
-
-                # 请假天数
-                leave_days = 0
-                if '当日状态判断' in l2_df.columns:
-                    leave_days = int(l2_df[l2_df['当日状态判断'] == '请假'].shape[0])
-
-                # 未知天数（疑似异常）
-                unknown_mask = self._unknown_status_mask(l2_df)
-                anomaly_days = int(unknown_mask.sum())
-
-                # 晚上7:30后下班人数
-                late_after_1930_count = 0
-                if '最晚19:30之后' in l2_df.columns:
-                    late_after_1930_count = int(l2_df[l2_df['最晚19:30之后'] == '符合']['姓名'].nunique())
-
-                # 获取该二级部门的成本
-                cost_info = dept_costs.get(l2_dept, {'total_cost': 0})
-
-                level2_department_stats.append({
-                    'name': l2_dept,
-                    'person_count': person_count,
-                    'avg_work_hours': round(avg_hours, 2),
-                    'holiday_avg_work_hours': round(holiday_avg_hours, 2),
-                    'workday_attendance_days': workday_attendance_days,
-                    'weekend_work_days': weekend_work_days,
-                    'weekend_attendance_count': weekend_attendance_count,
-                    'travel_days': travel_days,
-                    'leave_days': leave_days,
-                    'anomaly_days': anomaly_days,
-                    'late_after_1930_count': late_after_1930_count,
-                    'total_cost': float(cost_info['total_cost'])
-                })
-
+            for l2_dept, l2_df in level1_df.groupby('二级部门', sort=False):
+                level2_department_stats.append(
+                    self._sub_department_stats(l2_dept, l2_df, level2_costs.get(l2_dept, 0))
+                )
             # 按成本降序排序
             level2_department_stats.sort(key=lambda x: x['total_cost'], reverse=True)
 
         return {
             'department_name': level1_name,
-            'total_travel_cost': round(total_travel_cost, 2),
+            'total_travel_cost': round(sum(level2_costs.values()), 2),
             'attendance_days_distribution': attendance_days_distribution,
             'travel_ranking': travel_ranking,
             'avg_hours_ranking': avg_hours_ranking,
             'level2_department_stats': level2_department_stats
         }
 
-    def get_level2_department_statistics(self, level2_name: str) -> Dict[str, Any]:
-        """
-        获取二级部门的汇总统计数据（用于三级部门表格下方的统计展示）
-
-        Args:
-            level2_name: 二级部门名称
-
-        Returns:
-            包含以下统计数据的字典:
-            - total_travel_cost: 累计差旅成本
-            - attendance_days_distribution: 考勤天数分布
-            - travel_ranking: 出差排行榜（按人）
-            - avg_hours_ranking: 平均工时排行榜（按人）
-            - level3_department_stats: 三级部门统计列表（包含所有指标）
-        """
-        df = self.clean_attendance_data()
-        if df.empty:
-            return {}
-
-        level2_df = df[df['二级部门'] == level2_name].copy()
-        if level2_df.empty:
-            return {}
-
+    def _build_level2_statistics(
+        self,
+        level2_name: str,
+        level2_df: pd.DataFrame,
+        total_travel_cost: float,
+        level3_costs: Dict[str, float]
+    ) -> Dict[str, Any]:
+        """基于二级部门的考勤数据与三级部门成本构建统计结果"""
         parent_department = None
         if '一级部门' in level2_df.columns:
             parents = level2_df['一级部门'].dropna().unique().tolist()
             parent_department = parents[0] if parents else None
 
-        # 1. 累计差旅成本（以二级部门为单位，确保包含未分配三级部门的数据）
-        level2_costs = self._calculate_costs_by_department(level2_df, '二级部门')
-        total_travel_cost = 0
-        if level2_name in level2_costs:
-            total_travel_cost = level2_costs[level2_name].get('total_cost', 0)
-        else:
-            # 兜底：按三级部门汇总成本
-            level3_costs = self._calculate_costs_by_department(level2_df, '三级部门')
-            total_travel_cost = sum(info.get('total_cost', 0) for info in level3_costs.values())
+        attendance_days_distribution, travel_ranking, avg_hours_ranking = self._department_overview(level2_df)
+
+        level3_department_stats = []
+        if '三级部门' in level2_df.columns:
+            for l3_dept, l3_df in level2_df.groupby('三级部门', sort=False):
+                level3_department_stats.append(
+                    self._sub_department_stats(l3_dept, l3_df, level3_costs.get(l3_dept, 0))
+                )
+            level3_department_stats.sort(key=lambda x: x['total_cost'], reverse=True)
 
-        # 2. 考勤天数分布（整个二级部门）
+        return {
+            'department_name': level2_name,
+            'parent_department': parent_department,
+            'total_travel_cost': round(total_travel_cost, 2),
+            'attendance_days_distribution': attendance_days_distribution,
+            'travel_ranking': travel_ranking,
+            'avg_hours_ranking': avg_hours_ranking,
+            'level3_department_stats': level3_department_stats
+        }
+
+    def _department_overview(self, dept_df: pd.DataFrame) -> Tuple[Dict[str, int], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        部门整体概览：考勤天数分布、出差排行榜（按人）、工作日平均工时排行榜（按人）
+        """
+        # 考勤天数分布
         attendance_days_distribution = {}
-        if '当日状态判断' in level2_df.columns:
-            attendance_days_distribution = level2_df['当日状态判断'].value_counts().to_dict()
+        if '当日状态判断' in dept_df.columns:
+            attendance_days_distribution = dept_df['当日状态判断'].value_counts().to_dict()
 
-        # 3. 出差排行榜（按人）
+        # 出差排行榜
         travel_ranking = []
-        if '当日状态判断' in level2_df.columns:
-            travel_df = level2_df[level2_df['当日状态判断'] == '出差']
+        if '当日状态判断' in dept_df.columns:
+            travel_df = dept_df[dept_df['当日状态判断'] == '出差']
             if not travel_df.empty and '姓名' in travel_df.columns:
                 travel_counts = travel_df['姓名'].value_counts().head(10)
                 travel_ranking = [
@@ -1969,10 +2040,10 @@ class ExcelProcessor:
                     for name, count in travel_counts.items()
                 ]
 
-        # 4. 平均工时排行榜（工作日）
+        # 平均工时排行榜（工作日）
         avg_hours_ranking = []
-        if '工时' in level2_df.columns and '姓名' in level2_df.columns and '当日状态判断' in level2_df.columns:
-            workday_df = level2_df[level2_df['当日状态判断'] == '上班']
+        if '工时' in dept_df.columns and '姓名' in dept_df.columns and '当日状态判断' in dept_df.columns:
+            workday_df = dept_df[dept_df['当日状态判断'] == '上班']
             person_avg_hours = workday_df[workday_df['工时'].notna() & (workday_df['工时'] != 0)].groupby('姓名')['工时'].mean()
             person_avg_hours = person_avg_hours.sort_values(ascending=False)
             for name, avg_hours in person_avg_hours.head(10).items():
@@ -1982,89 +2053,62 @@ class ExcelProcessor:
                     'detail': f'{avg_hours:.2f}小时'
                 })
 
-        # 5. 三级部门统计
-        level3_department_stats = []
-        if '三级部门' in level2_df.columns:
-            level3_list = level2_df['三级部门'].dropna().unique().tolist()
-            level3_costs = self._calculate_costs_by_department(level2_df, '三级部门')
+        return attendance_days_distribution, travel_ranking, avg_hours_ranking
 
-            for l3_dept in level3_list:
-                l3_df = level2_df[level2_df['三级部门'] == l3_dept]
+    def _sub_department_stats(self, dept_name: str, dept_df: pd.DataFrame, total_cost: float) -> Dict[str, Any]:
+        """下级部门表格中的一行统计指标"""
+        person_count = dept_df['姓名'].nunique() if '姓名' in dept_df.columns else 0
 
-                person_count = l3_df['姓名'].nunique() if '姓名' in l3_df.columns else 0
+        avg_hours = 0
+        holiday_avg_hours = 0
+        workday_attendance_days = 0
+        weekend_work_days = 0
+        travel_days = 0
+        leave_days = 0
+        if '当日状态判断' in dept_df.columns:
+            status = dept_df['当日状态判断']
+            if '工时' in dept_df.columns:
+                valid_hours = dept_df[(status == '上班') & (dept_df['工时'] != 0)]['工时'].dropna()
+                if not valid_hours.empty:
+                    avg_hours = float(valid_hours.mean())
 
-                avg_hours = 0
-                holiday_avg_hours = 0
-                if '工时' in l3_df.columns and '当日状态判断' in l3_df.columns:
-                    valid_hours = l3_df[(l3_df['当日状态判断'] == '上班') & (l3_df['工时'] != 0)]['工时'].dropna()
-                    if not valid_hours.empty:
-                        avg_hours = float(valid_hours.mean())
+                # 节假日平均工时计算（公休日上班）
+                holiday_data = dept_df[status == '公休日上班']
+                holiday_valid_hours = holiday_data[holiday_data['工时'] != 0]['工时'].dropna()
+                if not holiday_valid_hours.empty:
+                    holiday_avg_hours = float(holiday_valid_hours.mean())
 
-                    holiday_data = l3_df[l3_df['当日状态判断'] == '公休日上班']
-                    holiday_valid_hours = holiday_data[holiday_data['工时'] != 0]['工时'].dropna()
-                    if not holiday_valid_hours.empty:
-                        holiday_avg_hours = float(holiday_valid_hours.mean())
+            workday_attendance_days = int((status == '上班').sum())
+            weekend_work_days = int((status == '公休日上班').sum())
+            travel_days = int((status == '出差').sum())
+            leave_days = int((status == '请假').sum())
 
-                workday_attendance_days = 0
-                if '当日状态判断' in l3_df.columns:
-                    workday_attendance_days = int(l3_df[l3_df['当日状态判断'] == '上班'].shape[0])
-
-                weekend_work_days = 0
-                if '当日状态判断' in l3_df.columns:
-                    weekend_work_days = int(l3_df[l3_df['当日状态判断'] == '公休日上班'].shape[0])
-
-                weekend_attendance_count = weekend_work_days
-
-                travel_days = 0
-                if '当日状态判断' in l3_df.columns:
-                    travel_days = int(l3_df[l3_df['当日状态判断'] == '出差'].shape[0])
-
-                leave_days = 0
-                if '当日状态判断' in l3_df.columns:
-                    leave_days = int(l3_df[l3_df['当日状态判断'] == '请假'].shape[0])
-
-                unknown_mask = self._unknown_status_mask(l3_df)
-                anomaly_days = int(unknown_mask.sum())
-
-                late_after_1930_count = 0
-                if '最晚19:30之后' in l3_df.columns:
-                    late_after_1930_count = int(l3_df[l3_df['最晚19:30之后'] == '符合']['姓名'].nunique())
-
-                cost_info = level3_costs.get(l3_dept, {'total_cost': 0})
-
-                level3_department_stats.append({
-                    'name': l3_dept,
-                    'person_count': person_count,
-                    'avg_work_hours': round(avg_hours, 2),
-                    'holiday_avg_work_hours': round(holiday_avg_hours, 2),
-                    'workday_attendance_days': workday_attendance_days,
-                    'weekend_work_days': weekend_work_days,
-                    'weekend_attendance_count': weekend_attendance_count,
-                    'travel_days': travel_days,
-                    'leave_days': leave_days,
-                    'anomaly_days': anomaly_days,
-                    'late_after_1930_count': late_after_1930_count,
-                    'total_cost': float(cost_info.get('total_cost', 0))
-                })
+        # 未知天数（疑似异常）
+        anomaly_days = int(self._unknown_status_mask(dept_df).sum())
 
-            level3_department_stats.sort(key=lambda x: x['total_cost'], reverse=True)
+        # 晚上7:30后下班人数
+        late_after_1930_count = 0
+        if '最晚19:30之后' in dept_df.columns:
+            late_after_1930_count = int(dept_df[dept_df['最晚19:30之后'] == '符合']['姓名'].nunique())
 
         return {
-            'department_name': level2_name,
-            'parent_department': parent_department,
-            'total_travel_cost': round(total_travel_cost, 2),
-            'attendance_days_distribution': attendance_days_distribution,
-            'travel_ranking': travel_ranking,
-            'avg_hours_ranking': avg_hours_ranking,
-            'level3_department_stats': level3_department_stats
+            'name': dept_name,
+            'person_count': person_count,
+            'avg_work_hours': round(avg_hours, 2),
+            'holiday_avg_work_hours': round(holiday_avg_hours, 2),
+            'workday_attendance_days': workday_attendance_days,
+            'weekend_work_days': weekend_work_days,
+            # 周末出勤次数（同步公休日上班统计，保持与饼图数据一致）
+            'weekend_attendance_count': weekend_work_days,
+            'travel_days': travel_days,
+            'leave_days': leave_days,
+            'anomaly_days': anomaly_days,
+            'late_after_1930_count': late_after_1930_count,
+            'total_cost': float(total_cost)
         }
 
     def get_available_months(self) -> List[str]:
         """获取所有可用的月份列表（从差旅数据中提取，格式：YYYY-M，按时间升序排列）"""
-        # Ensure data is loaded
-        if not self.sheets_data:
-            self.load_all_sheets()
-
         months_set = set()
 
         flight_df = self.clean_travel_data('机票')
@@ -0,0 +1,268 @@
+"""
+Excel 模式计算任务
+供执行层在工作进程（或线程）中调用的模块级函数：只接收/返回可序列化的数据，
+不依赖请求上下文。同一工作进程内按文件复用已加载的处理器。
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app.services import metrics, profiling
+from app.services.excel_processor import ExcelProcessor, ATTENDANCE_SHEET, TRAVEL_SHEETS, ANALYSIS_SHEETS
+from app.utils.logger import get_logger
+
+logger = get_logger("excel_tasks")
+
+# 复用的处理器（按文件路径 + 修改时间 + 大小识别，文件变化后自动失效）
+PROCESSOR_CACHE_SIZE = 4
+_processor_cache: "OrderedDict[tuple, ExcelProcessor]" = OrderedDict()
+_processor_cache_lock = threading.Lock()
+
+# 部门下钻统计的后台预计算（每个工作进程一个线程，按提交顺序依次执行）
+_precompute_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_processor(file_path: str) -> ExcelProcessor:
+    """
+    获取已加载分析 Sheet 的处理器，同一文件的连续请求复用清洗结果和预计算统计
+    """
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+    with _processor_cache_lock:
+        processor = _processor_cache.get(key)
+        if processor is not None:
+            _processor_cache.move_to_end(key)
+    metrics.record_cache("excel_processor", processor is not None)
+    if processor is not None:
+        return processor
+
+    processor = ExcelProcessor(file_path)
+    processor.load_all_sheets(load_workbook_obj=False, required_sheets=ANALYSIS_SHEETS)
+
+    with _processor_cache_lock:
+        _processor_cache[key] = processor
+        while len(_processor_cache) > PROCESSOR_CACHE_SIZE:
+            _processor_cache.popitem(last=False)
+    return processor
+
+
+def _precompute_department_statistics(processor: ExcelProcessor) -> None:
+    try:
+        processor.precompute_department_statistics()
+    except Exception as e:
+        # 预计算失败只记录日志，部门统计在首次查询时再计算
+        logger.warning(f"部门统计预计算失败: {e}")
+
+
+def schedule_department_precompute(processor: ExcelProcessor) -> None:
+    """
+    在后台线程中预计算全部月份的一级 / 二级部门统计，不占用当前请求的耗时
+
+    Dashboard 返回后调用，首次查看部门下钻时直接读取（或等待进行中的）预计算结果
+    """
+    global _precompute_executor
+    with _processor_cache_lock:
+        if _precompute_executor is None:
+            _precompute_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="department-precompute")
+    _precompute_executor.submit(_precompute_department_statistics, processor)
+
+
+def build_dashboard(file_path: str, months_list: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    分析 Excel 文件，返回 Dashboard 数据
+    """
+    logger.info(f"开始分析文件: {file_path}，月份筛选: {months_list or '全部'}")
+    overall_start = time.perf_counter()
+
+    def timed_step(step_name: str, func, *args, **kwargs):
+        step_start = time.perf_counter()
+        with profiling.step_memory(step_name):
+            result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - step_start
+        metrics.analysis_step_seconds.labels(step_name).observe(elapsed)
+        logger.info(f"{step_name}完成，用时 {elapsed * 1000:.0f}ms")
+        return result
+
+    processor = timed_step("文件加载", get_processor, file_path)
+    
+    # 执行各项分析（部门Top 15，项目Top 20 + 其他）
+    project_costs, total_project_count = timed_step("项目成本归集", processor.aggregate_project_costs, top_n=20, months=months_list)
+    department_costs = timed_step("部门成本汇总", processor.calculate_department_costs, top_n=15, months=months_list)
+    anomalies = timed_step("考勤/差旅交叉验证", processor.cross_check_attendance_travel, months=months_list)
+    booking_behavior = timed_step("预订行为分析", processor.analyze_booking_behavior, months=months_list)
+    attendance_summary = timed_step("考勤汇总", processor.get_attendance_summary, months=months_list)
+    over_standard_stats = timed_step("超标统计", processor.count_over_standard_orders, months=months_list)
+    order_stats = timed_step("订单统计", processor.count_total_orders, months=months_list)
+    over_standard_breakdown = {
+        k: v for k, v in over_standard_stats.items() 
+        if k != 'flight_over_types'
+    }
+    flight_over_type_breakdown = over_standard_stats.get('flight_over_types', {})
+    
+    # 计算总览数据
+    total_cost = sum(item['total_cost'] for item in department_costs)
+    avg_work_hours = attendance_summary.get('avg_work_hours', 0)
+    holiday_avg_work_hours = attendance_summary.get('holiday_avg_work_hours', 0)
+    anomaly_count = len(anomalies)
+    
+    # 转换部门数据格式为前端期望的结构
+    department_stats = [
+        {
+            'dept': item['department'],
+            'cost': item['total_cost'],
+            'avg_hours': item.get('avg_hours', 0),
+            'holiday_avg_hours': item.get('holiday_avg_hours', 0),
+            'headcount': item.get('person_count', 0)
+        }
+        for item in department_costs
+    ]
+    
+    # 转换项目数据格式为前端期望的结构（现在是Top 20 + "其他"）
+    project_top10 = [
+        {
+            'code': item['project_code'],
+            'name': item['project_name'],
+            'cost': item['total_cost'],
+            'flight_cost': item.get('flight_cost', 0),
+            'hotel_cost': item.get('hotel_cost', 0),
+            'train_cost': item.get('train_cost', 0)
+        }
+        for item in project_costs
+    ]
+    
+    # 转换异常数据格式为前端期望的结构
+    anomaly_list = [
+        {
+            'date': item.get('date', ''),
+            'name': item.get('name', ''),
+            'dept': item.get('department', ''),
+            'type': item.get('anomaly_type', 'Unknown'),
+            'status': item.get('attendance_status', ''),
+            'detail': item.get('description', '')
+        }
+        for item in anomalies
+    ]
+    
+    # 构建符合前端期望的数据结构
+    dashboard_data = {
+        'summary': {
+            'total_cost': round(total_cost, 2),
+            'avg_work_hours': round(avg_work_hours, 2),
+            'holiday_avg_work_hours': round(holiday_avg_work_hours, 2),
+            'anomaly_count': anomaly_count,
+            'total_orders': order_stats.get('total', 0),
+            'order_breakdown': order_stats,
+            'over_standard_count': over_standard_stats.get('total', 0),
+            'over_standard_breakdown': over_standard_breakdown,
+            'flight_over_type_breakdown': flight_over_type_breakdown,
+            'total_project_count': total_project_count
+        },
+        'department_stats': department_stats,
+        'project_top10': project_top10,
+        'anomalies': anomaly_list
+    }
+
+    logger.info(f"分析流程结束，总耗时 {time.perf_counter() - overall_start:.2f}s")
+    # 部门下钻统计在返回 Dashboard 后于后台预计算，不计入本次分析耗时
+    schedule_department_precompute(processor)
+    return dashboard_data
+
+
+def export_analysis(file_path: str) -> Dict[str, Any]:
+    """
+    计算导出用的分析结果（项目成本、部门成本、交叉验证异常）
+
+    只返回结果数据，工作簿由 xlsx_export 在响应时流式生成，不加载 openpyxl 对象模型
+    """
+    processor = get_processor(file_path)
+    project_costs, _ = processor.aggregate_project_costs()
+    return {
+        'project_costs': project_costs,
+        'department_costs': processor.calculate_department_costs(),
+        'anomalies': processor.cross_check_attendance_travel()
+    }
+
+
+def list_sheets(file_path: str) -> List[Dict[str, Any]]:
+    """获取文件中所有 Sheet 的名称及行列数"""
+    processor = ExcelProcessor(file_path)
+    sheets = processor.load_all_sheets()
+    return [
+        {
+            "name": name,
+            "rows": len(df),
+            "columns": len(df.columns)
+        }
+        for name, df in sheets.items()
+    ]
+
+
+def project_details(file_path: str, months: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """获取所有项目的详细信息"""
+    return get_processor(file_path).get_all_project_details(months=months)
+
+
+def project_orders(file_path: str, project_code: str, months: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """获取指定项目的订单记录（仅解析差旅 Sheet）"""
+    processor = ExcelProcessor(file_path)
+    processor.load_all_sheets(load_workbook_obj=False, required_sheets=TRAVEL_SHEETS)
+    return processor.get_project_order_records(project_code, months=months)
+
+
+def department_hierarchy(file_path: str, months: Optional[List[str]] = None) -> Dict[str, Any]:
+    """获取部门层级结构（仅解析考勤 Sheet）"""
+    processor = ExcelProcessor(file_path)
+    processor.load_all_sheets(load_workbook_obj=False, required_sheets=[ATTENDANCE_SHEET])
+    return processor.get_department_hierarchy(months=months)
+
+
+def department_list(
+    file_path: str,
+    level: int,
+    parent: Optional[str] = None,
+    months: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """获取部门列表"""
+    return get_processor(file_path).get_department_list(level, parent, months=months)
+
+
+def department_details(
+    file_path: str,
+    department_name: str,
+    level: int,
+    months: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """获取指定部门的详细指标"""
+    return get_processor(file_path).get_department_detail_metrics(department_name, level, months=months)
+
+
+def level1_statistics(file_path: str, level1_name: str, months: Optional[List[str]] = None) -> Dict[str, Any]:
+    """获取一级部门的汇总统计数据"""
+    return get_processor(file_path).get_level1_department_statistics(level1_name, months=months)
+
+
+def level2_statistics(file_path: str, level2_name: str, months: Optional[List[str]] = None) -> Dict[str, Any]:
+    """获取二级部门的汇总统计数据"""
+    return get_processor(file_path).get_level2_department_statistics(level2_name, months=months)
+
+
+def anomaly_records(file_path: str, months: Optional[List[str]] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+    """获取考勤/差旅交叉验证的异常记录（与数据库模式返回相同结构，按日期降序）"""
+    anomalies = get_processor(file_path).cross_check_attendance_travel(months=months)
+    records = [
+        {
+            'date': item.get('date', ''),
+            'name': item.get('name', ''),
+            'dept': item.get('department', ''),
+            'type': item.get('anomaly_type', 'Unknown'),
+            'status': item.get('attendance_status', ''),
+            'detail': item.get('description', '')
+        }
+        for item in anomalies
+    ]
+    records.sort(key=lambda x: x['date'], reverse=True)
+    return records[:limit]
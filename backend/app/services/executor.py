@@ -0,0 +1,257 @@
+"""
+计算任务执行层
+Excel 模式的 pandas/openpyxl 计算放入有界进程池（可配置为线程池），数据库查询放入
+线程池，并按接口限制并发，避免长时间的同步计算阻塞事件循环（进度轮询、登录等请求）。
+上传文件的解析入库在独立的单线程执行器中依次执行（SQLite 同一时刻只允许一个写事务）。
+bcrypt 密码哈希/校验使用独立的小线程池，排队数量有上限，登录高峰时不会拖慢其他请求。
+"""
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from app.config import settings
+from app.services import metrics, profiling, server_timing
+from app.utils.logger import get_logger
+
+logger = get_logger("executor")
+
+# 各接口的最大并发数，未列出的接口使用 settings.endpoint_concurrency
+ENDPOINT_CONCURRENCY: Dict[str, int] = {
+    "analyze": 2,
+    "export": 1,
+    "sheets": 1,
+}
+
+
+class ExecutorBusyError(RuntimeError):
+    """排队任务数超过上限"""
+
+
+def _call_in_worker(
+    func: Callable[..., Any],
+    args: tuple,
+    kwargs: dict,
+    profile_options: Optional[profiling.ProfileOptions] = None,
+    collect_timing: bool = False
+) -> tuple:
+    """
+    在工作进程中执行任务，返回 (结果, 指标增量, 剖析数据, Server-Timing 记录)
+
+    本进程记录的指标增量、剖析结果及各阶段耗时（如有）随结果带回主进程合并
+    """
+    timing = server_timing.TimingContext() if collect_timing else None
+    if timing is not None:
+        func = functools.partial(timing.run, func)
+    if profile_options is not None:
+        result, profile = profiling.run_profiled(profile_options, func, args, kwargs)
+    else:
+        result, profile = func(*args, **kwargs), None
+    return result, metrics.registry.drain(), profile, timing.export() if timing is not None else None
+
+
+class ExecutionLayer:
+    """有界执行器 + 按接口并发限制"""
+
+    def __init__(
+        self,
+        cpu_mode: str = "process",
+        cpu_workers: int = 2,
+        db_workers: int = 1,
+        default_limit: int = 2,
+        endpoint_limits: Optional[Dict[str, int]] = None,
+        hash_workers: int = 2,
+        hash_queue_limit: int = 32
+    ):
+        self.cpu_mode = cpu_mode
+        self.cpu_workers = max(1, cpu_workers)
+        self.db_workers = max(1, db_workers)
+        self.default_limit = max(1, default_limit)
+        self.endpoint_limits = endpoint_limits or {}
+        self.hash_workers = max(1, hash_workers)
+        self.hash_queue_limit = max(0, hash_queue_limit)
+        self._cpu_executor: Optional[Executor] = None
+        self._db_executor: Optional[ThreadPoolExecutor] = None
+        self._hash_executor: Optional[ThreadPoolExecutor] = None
+        self._ingest_executor: Optional[ThreadPoolExecutor] = None
+        # 正在执行和排队中的哈希任务数（只在事件循环线程中修改）
+        self._hash_pending = 0
+        # 各执行器已提交未完成的任务数（含排队，只在事件循环线程中修改）
+        self._pending: Dict[str, int] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def _get_cpu_executor(self) -> Executor:
+        with self._lock:
+            if self._cpu_executor is None:
+                if self.cpu_mode == "process":
+                    # spawn 避免在已启动线程的服务进程中 fork
+                    self._cpu_executor = ProcessPoolExecutor(
+                        max_workers=self.cpu_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    self._cpu_executor = ThreadPoolExecutor(
+                        max_workers=self.cpu_workers,
+                        thread_name_prefix="excel-worker"
+                    )
+                logger.info(f"计算执行器已启动: {self.cpu_mode} x {self.cpu_workers}")
+            return self._cpu_executor
+
+    def _get_db_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._db_executor is None:
+                self._db_executor = ThreadPoolExecutor(
+                    max_workers=self.db_workers,
+                    thread_name_prefix="db-worker"
+                )
+            return self._db_executor
+
+    def _get_ingest_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._ingest_executor is None:
+                self._ingest_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-worker")
+            return self._ingest_executor
+
+    def _get_hash_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._hash_executor is None:
+                self._hash_executor = ThreadPoolExecutor(
+                    max_workers=self.hash_workers,
+                    thread_name_prefix="hash-worker"
+                )
+            return self._hash_executor
+
+    def _semaphore(self, endpoint: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(endpoint)
+        if semaphore is None:
+            limit = self.endpoint_limits.get(endpoint, self.default_limit)
+            semaphore = self._semaphores.setdefault(endpoint, asyncio.Semaphore(limit))
+        return semaphore
+
+    async def _run(self, executor: Executor, pool: str, endpoint: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        in_process = not isinstance(executor, ThreadPoolExecutor)
+        session = profiling.current_session()
+        timing = server_timing.current()
+        if in_process:
+            call = functools.partial(
+                _call_in_worker, func, args, kwargs, session.options if session is not None else None, timing is not None
+            )
+        else:
+            call = functools.partial(func, *args, **kwargs)
+            if session is not None:
+                call = functools.partial(session.run, call)
+            # 线程中沿用请求的 contextvars（SQL 统计、Server-Timing 等按请求记录的数据）
+            call = functools.partial(contextvars.copy_context().run, call)
+
+        pending = metrics.executor_pending.labels(pool)
+        pending.inc()
+        self._pending[pool] = self._pending.get(pool, 0) + 1
+        try:
+            wait_start = time.perf_counter()
+            async with self._semaphore(endpoint):
+                metrics.executor_wait_seconds.labels(endpoint).observe(time.perf_counter() - wait_start)
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(executor, call)
+        finally:
+            pending.dec()
+            self._pending[pool] -= 1
+
+        if in_process:
+            result, deltas, profile, spans = result
+            metrics.registry.merge(deltas)
+            if session is not None:
+                session.merge(profile)
+            if timing is not None:
+                timing.merge(spans)
+        return result
+
+    def pending(self, pool: str) -> int:
+        """执行器（cpu / db / ingest）中已提交未完成的任务数，供低优先级任务判断是否空闲"""
+        return self._pending.get(pool, 0)
+
+    async def run_cpu(self, endpoint: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在计算执行器中运行 CPU 密集任务
+
+        进程模式下 func 及其参数、返回值必须可被 pickle（使用模块级函数）
+        """
+        try:
+            return await self._run(self._get_cpu_executor(), "cpu", endpoint, func, *args, **kwargs)
+        except BrokenProcessPool:
+            # 工作进程异常退出（如内存不足）后进程池不可用，重建以免后续请求全部失败
+            logger.error("计算进程池已损坏，将在下次请求时重建")
+            with self._lock:
+                broken, self._cpu_executor = self._cpu_executor, None
+            if broken is not None:
+                broken.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    async def run_db(self, endpoint: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """在数据库线程池中运行同步查询"""
+        return await self._run(self._get_db_executor(), "db", endpoint, func, *args, **kwargs)
+
+    async def run_ingest(self, endpoint: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """在解析入库执行器中运行写入任务，多个任务按提交顺序依次执行"""
+        return await self._run(self._get_ingest_executor(), "ingest", endpoint, func, *args, **kwargs)
+
+    async def warm_up(self, func: Callable[[], Any]) -> None:
+        """
+        预先启动计算进程池的全部工作进程，并在每个进程中执行 func（如导入分析模块）
+
+        线程池模式下工作线程与主进程共享已导入的模块，不需要预热
+        """
+        executor = self._get_cpu_executor()
+        if isinstance(executor, ThreadPoolExecutor):
+            return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(executor, func) for _ in range(self.cpu_workers)))
+
+    async def run_hash(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在密码哈希线程池中运行 bcrypt 计算（bcrypt 计算期间释放 GIL）
+
+        同时最多 hash_workers 个任务执行，其余排队；排队数超过 hash_queue_limit 时
+        抛出 ExecutorBusyError，由调用方返回 503
+        """
+        if self._hash_pending >= self.hash_workers + self.hash_queue_limit:
+            raise ExecutorBusyError("密码校验请求过多")
+        self._hash_pending += 1
+        pending = metrics.executor_pending.labels("hash")
+        pending.inc()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_hash_executor(), functools.partial(func, *args, **kwargs)
+            )
+        finally:
+            self._hash_pending -= 1
+            pending.dec()
+
+    def shutdown(self):
+        """关闭执行器（应用退出时调用）"""
+        with self._lock:
+            executors = [self._cpu_executor, self._db_executor, self._hash_executor, self._ingest_executor]
+            self._cpu_executor = None
+            self._db_executor = None
+            self._hash_executor = None
+            self._ingest_executor = None
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+
+execution = ExecutionLayer(
+    cpu_mode=settings.excel_executor,
+    cpu_workers=settings.excel_workers,
+    db_workers=settings.db_workers,
+    default_limit=settings.endpoint_concurrency,
+    endpoint_limits=ENDPOINT_CONCURRENCY,
+    hash_workers=settings.hash_workers,
+    hash_queue_limit=settings.hash_queue_limit
+)
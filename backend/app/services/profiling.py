@@ -0,0 +1,321 @@
+"""
+按需性能剖析
+管理员通过 /api/debug/profile 在服务端重放一个 GET 请求，请求期间:
+    - cprofile 模式：确定性剖析，返回按累计耗时排序的前 N 个函数
+    - sample 模式：按固定间隔采样线程调用栈，返回折叠栈（collapsed stack，可直接生成火焰图）
+    - memory=True 时用 tracemalloc 记录 Excel 分析各步骤的峰值内存
+
+剖析会话通过 contextvar 传递：执行层在线程池中沿用请求上下文，在进程池中把剖析选项
+随任务发送到工作进程，剖析结果随返回值带回。未开启剖析时各处只有一次 contextvar 读取。
+
+事件循环线程的剖析/采样会包含同时段其他请求在事件循环上的开销；tracemalloc 为进程级，
+线程池模式下并发请求的分配也会计入。
+"""
+import cProfile
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+PROFILE_MODES = ("cprofile", "sample")
+# 采样模式下折叠栈的最大深度
+MAX_STACK_DEPTH = 64
+# 栈顶位于这些文件时视为线程空闲（事件循环等待 IO；uvloop 的等待发生在 C 代码中，
+# 此时 Python 栈顶停留在 asyncio.run）
+_IDLE_LEAF_FILES = ("selectors.py", os.path.join("asyncio", "runners.py"))
+# 报告中的函数位置只保留源码根目录之后的相对路径
+_SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 标准库与第三方库只保留包内路径
+_LIBRARY_PREFIX_RE = re.compile(r"^.*?[/\\](?:site-packages|dist-packages|lib[/\\]python\d+\.\d+)[/\\]")
+
+# 同一时间只允许一个剖析会话（cProfile 与 tracemalloc 均为线程/进程级状态）
+profile_lock = threading.Lock()
+
+_current_session: ContextVar[Optional["ProfileSession"]] = ContextVar("profile_session", default=None)
+
+
+@dataclass(frozen=True)
+class ProfileOptions:
+    """剖析选项（需可被 pickle，发送到工作进程）"""
+    mode: str = "cprofile"
+    top_n: int = 30
+    memory: bool = False
+    sample_interval: float = 0.005
+
+
+class _RawStats:
+    """让 pstats.Stats 接收从工作进程带回的原始统计数据"""
+
+    def __init__(self, stats: Dict[Any, Any]):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(_SOURCE_ROOT + os.sep):
+        return os.path.relpath(filename, _SOURCE_ROOT)
+    return _LIBRARY_PREFIX_RE.sub("", filename)
+
+
+def _frame_label(code) -> str:
+    return f"{_short_path(code.co_filename)}:{code.co_name}"
+
+
+class _StackSampler:
+    """后台线程按间隔采样指定线程的调用栈，累计折叠栈计数"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._threads: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_thread(self, thread_id: int) -> None:
+        with self._lock:
+            self._threads[thread_id] = self._threads.get(thread_id, 0) + 1
+
+    def remove_thread(self, thread_id: int) -> None:
+        with self._lock:
+            count = self._threads.get(thread_id, 0) - 1
+            if count > 0:
+                self._threads[thread_id] = count
+            else:
+                self._threads.pop(thread_id, None)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                thread_ids = list(self._threads)
+            frames = sys._current_frames()
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                if frame.f_code.co_filename.endswith(_IDLE_LEAF_FILES):
+                    # 事件循环空闲（等待 IO）不计入
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+
+class ProfileSession:
+    """一次剖析的累计结果（可合并多个线程及工作进程的数据）"""
+
+    def __init__(self, options: ProfileOptions):
+        self.options = options
+        self._lock = threading.Lock()
+        self._stats: Optional[pstats.Stats] = None
+        self._sampler = _StackSampler(options.sample_interval) if options.mode == "sample" else None
+        self._extra_stacks: Counter = Counter()
+        self._extra_samples = 0
+        self.memory_steps: List[Dict[str, Any]] = []
+        self._started_tracemalloc = False
+
+    def start(self) -> None:
+        if self._sampler is not None:
+            self._sampler.start()
+        if self.options.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def stop(self) -> None:
+        if self._sampler is not None:
+            self._sampler.stop()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _add_stats(self, raw: Any) -> None:
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(raw)
+            else:
+                self._stats.add(raw)
+
+    @contextmanager
+    def profile_thread(self) -> Iterator[None]:
+        """剖析当前线程中执行的代码块"""
+        if self._sampler is not None:
+            thread_id = threading.get_ident()
+            self._sampler.add_thread(thread_id)
+            try:
+                yield
+            finally:
+                self._sampler.remove_thread(thread_id)
+            return
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._add_stats(profiler)
+
+    def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """在当前线程中剖析执行 func（执行层线程池调用）"""
+        token = _current_session.set(self)
+        try:
+            with self.profile_thread():
+                return func(*args, **kwargs)
+        finally:
+            _current_session.reset(token)
+
+    def record_memory(self, step: str, peak_bytes: int, retained_bytes: int) -> None:
+        with self._lock:
+            self.memory_steps.append({
+                "step": step,
+                "peak_kb": round(peak_bytes / 1024, 1),
+                "retained_kb": round(retained_bytes / 1024, 1),
+            })
+
+    def export(self) -> Dict[str, Any]:
+        """导出可 pickle 的结果（工作进程 -> 主进程）"""
+        with self._lock:
+            stats = dict(self._stats.stats) if self._stats is not None else None
+        stacks, samples = (dict(self._sampler.stacks), self._sampler.samples) if self._sampler else ({}, 0)
+        return {"stats": stats, "stacks": stacks, "samples": samples, "memory_steps": list(self.memory_steps)}
+
+    def merge(self, partial: Optional[Dict[str, Any]]) -> None:
+        if not partial:
+            return
+        if partial["stats"]:
+            self._add_stats(_RawStats(partial["stats"]))
+        with self._lock:
+            self._extra_stacks.update(partial["stacks"])
+            self._extra_samples += partial["samples"]
+            self.memory_steps.extend(partial["memory_steps"])
+
+    def _top_functions(self) -> List[Dict[str, Any]]:
+        if self._stats is None:
+            return []
+        rows = []
+        for (filename, line, name), (_, calls, total, cumulative, _) in self._stats.stats.items():
+            rows.append({
+                "function": f"{_short_path(filename)}:{line}({name})" if line else name,
+                "calls": calls,
+                "tottime_ms": round(total * 1000, 2),
+                "cumtime_ms": round(cumulative * 1000, 2),
+            })
+        rows.sort(key=lambda row: row["cumtime_ms"], reverse=True)
+        return rows[:self.options.top_n]
+
+    def report(self) -> Dict[str, Any]:
+        report: Dict[str, Any] = {"options": asdict(self.options)}
+        if self._sampler is not None:
+            stacks = Counter(self._sampler.stacks)
+            stacks.update(self._extra_stacks)
+            report["samples"] = self._sampler.samples + self._extra_samples
+            report["collapsed"] = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+        else:
+            report["top"] = self._top_functions()
+        if self.options.memory:
+            report["memory_steps"] = self.memory_steps
+        return report
+
+
+def current_session() -> Optional[ProfileSession]:
+    return _current_session.get()
+
+
+@contextmanager
+def activate(session: ProfileSession) -> Iterator[None]:
+    """在当前上下文中启用剖析会话（当前线程即事件循环线程同时被剖析）"""
+    token = _current_session.set(session)
+    session.start()
+    try:
+        with session.profile_thread():
+            yield
+    finally:
+        session.stop()
+        _current_session.reset(token)
+
+
+def run_profiled(options: ProfileOptions, func: Callable[..., Any], args: tuple, kwargs: dict) -> Tuple[Any, Dict[str, Any]]:
+    """在工作进程中剖析执行任务，返回 (结果, 剖析数据)"""
+    session = ProfileSession(options)
+    session.start()
+    try:
+        result = session.run(func, *args, **kwargs)
+    finally:
+        session.stop()
+    return result, session.export()
+
+
+@contextmanager
+def step_memory(step: str) -> Iterator[None]:
+    """记录代码块的 tracemalloc 峰值内存（仅在开启内存剖析的会话中生效）"""
+    session = _current_session.get()
+    if session is None or not session.options.memory or not tracemalloc.is_tracing():
+        yield
+        return
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    try:
+        yield
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        session.record_memory(step, peak - before, current - before)
+
+
+async def replay_request(app, scope: Dict[str, Any], path: str, query_string: str) -> Dict[str, Any]:
+    """
+    在进程内重放一个 GET 请求（沿用原请求的请求头，用于认证），返回状态码、耗时和响应大小
+    """
+    inner_scope = {
+        "type": "http",
+        "asgi": scope.get("asgi", {"version": "3.0"}),
+        "http_version": scope.get("http_version", "1.1"),
+        "method": "GET",
+        "scheme": scope.get("scheme", "http"),
+        "server": scope.get("server"),
+        "client": scope.get("client"),
+        "root_path": scope.get("root_path", ""),
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": query_string.encode("latin-1"),
+        # 不使用条件请求，确保真正执行查询
+        "headers": [(key, value) for key, value in scope.get("headers", []) if key != b"if-none-match"],
+        "state": {},
+    }
+    response: Dict[str, Any] = {"status": None, "bytes": 0}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["bytes"] += len(message.get("body", b""))
+
+    start = time.perf_counter()
+    await app(inner_scope, receive, send)
+    response["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return response
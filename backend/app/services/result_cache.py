@@ -0,0 +1,109 @@
+"""
+分析结果缓存（数据库模式）
+Dashboard、部门列表、项目列表等聚合查询的结果按 (接口, 规范化参数) 缓存在进程内。
+条目记录计算时的数据版本，数据版本变化（上传解析、删除月份）后自动失效；版本基于版本文件，
+多 worker 部署时各进程同时失效。上传解析完成后及服务启动时由预热任务提前计算（见 warmup.py）。
+未命中时按 (键, 数据版本) 合并并发的相同计算（见 single_flight.py），同一时刻只执行一次。
+
+缓存的结果对象由多个请求共享，调用方只读不改。剖析请求（/api/debug/profile）不经过缓存，
+剖析的是实际查询。
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from app.config import settings
+from app.services import metrics, profiling
+from app.services.data_version import DataVersion, data_version
+from app.services.single_flight import single_flight
+
+_MISSING = object()
+
+
+def make_key(endpoint: str, params: Dict[str, Any]) -> Tuple[Hashable, ...]:
+    """规范化缓存键：月份列表去重排序，参数按名称排序"""
+    normalized = []
+    for name, value in sorted(params.items()):
+        if name == "months" and value is not None:
+            value = tuple(sorted(set(value)))
+        elif isinstance(value, list):
+            value = tuple(value)
+        normalized.append((name, value))
+    return (endpoint, tuple(normalized))
+
+
+class ResultCache:
+    """按数据版本失效的 LRU 结果缓存"""
+
+    def __init__(self, max_entries: int, version: DataVersion):
+        self.max_entries = max_entries
+        self.version = version
+        self._lock = threading.Lock()
+        # key -> (数据版本, 结果)
+        self._entries: "OrderedDict[Tuple[Hashable, ...], Tuple[str, Any]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Tuple[Hashable, ...], version: str) -> Any:
+        """命中时返回结果，否则返回 _MISSING（结果本身可以是 None）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] != version:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        metrics.record_cache("result", entry is not None)
+        return entry[1] if entry is not None else _MISSING
+
+    def put(self, key: Tuple[Hashable, ...], version: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def contains(self, endpoint: str, params: Dict[str, Any]) -> bool:
+        """当前数据版本下是否已有结果（不计入命中率）"""
+        version = self.version.current()
+        with self._lock:
+            entry = self._entries.get(make_key(endpoint, params))
+        return entry is not None and entry[0] == version
+
+    async def get_or_compute(
+        self, endpoint: str, params: Dict[str, Any], compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        返回缓存结果，未命中时 await compute() 计算并缓存；并发的相同请求共享同一次计算
+
+        数据版本在计算之前读取：计算期间数据发生变化时，结果按旧版本缓存，随即失效
+        """
+        if profiling.current_session() is not None:
+            return await compute()
+        key = make_key(endpoint, params)
+        version = self.version.current()
+        if self.enabled:
+            value = self.get(key, version)
+            if value is not _MISSING:
+                return value
+
+        async def _compute_and_store():
+            value = await compute()
+            if self.enabled:
+                self.put(key, version, value)
+            return value
+
+        return await single_flight.do(endpoint, (key, version), _compute_and_store)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries}
+
+
+result_cache = ResultCache(settings.result_cache_size, data_version)
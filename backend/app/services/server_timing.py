@@ -0,0 +1,165 @@
+"""
+Server-Timing 响应头（W3C Server Timing）
+
+每个请求持有一个计时上下文（contextvar），ExcelProcessor、crud 查询函数和 DatabaseParser
+通过 span / timed / record 把各阶段耗时记录进去，响应头中按名称汇总输出，例如:
+
+    Server-Timing: excel.project_costs;dur=812.4, sql;dur=35.2;desc="statements: 41", total;dur=1203.7
+
+浏览器开发者工具的 Network -> Timing 面板可直接查看。执行层在线程池中沿用请求上下文；
+进程池模式下工作进程记录的耗时随结果带回主进程合并（见 executor._call_in_worker）。
+没有计时上下文时（脚本等）各记录点只有一次 contextvar 读取；上传解析等后台任务自行建立上下文，
+耗时随任务结果返回。
+
+指标名须为 HTTP token（ASCII 字母、数字及 . _ - 等），不使用中文步骤名。
+同名指标多次记录时耗时累加，desc 中给出次数；响应头发出后的记录（如流式响应）不再输出。
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+HEADER = "Server-Timing"
+# 单个响应头中最多输出的指标数（按首次记录顺序）
+MAX_METRICS = 32
+
+_current_timing: ContextVar[Optional["TimingContext"]] = ContextVar("server_timing", default=None)
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class TimingContext:
+    """一个请求（或一次后台任务）的各阶段耗时"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 名称 -> [累计耗时 ms, 次数, 描述]，按首次记录顺序
+        self._metrics: Dict[str, List[Any]] = {}
+
+    def record(self, name: str, duration_ms: float, description: Optional[str] = None) -> None:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                self._metrics[name] = [duration_ms, 1, description]
+            else:
+                metric[0] += duration_ms
+                metric[1] += 1
+                if description is not None:
+                    metric[2] = description
+
+    def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """以本上下文为当前计时上下文执行 func（工作进程 / 后台任务中使用）"""
+        token = _current_timing.set(self)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current_timing.reset(token)
+
+    def export(self) -> List[Tuple[str, float, int, Optional[str]]]:
+        """导出可 pickle 的记录（工作进程 -> 主进程）"""
+        with self._lock:
+            return [(name, duration, count, desc) for name, (duration, count, desc) in self._metrics.items()]
+
+    def merge(self, exported: Optional[List[Tuple[str, float, int, Optional[str]]]]) -> None:
+        if not exported:
+            return
+        with self._lock:
+            for name, duration, count, description in exported:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    self._metrics[name] = [duration, count, description]
+                else:
+                    metric[0] += duration
+                    metric[1] += count
+
+    def summary(self) -> Dict[str, float]:
+        """名称 -> 累计耗时（ms），用于写入任务结果等 JSON 场景"""
+        return {name: round(duration, 2) for name, duration, _, _ in self.export()}
+
+    def header_value(self, total_ms: Optional[float] = None) -> str:
+        parts = []
+        for name, duration, count, description in self.export()[:MAX_METRICS]:
+            if description is None and count > 1:
+                description = f"calls: {count}"
+            part = f"{name};dur={duration:.1f}"
+            if description:
+                part += f";desc={_quote(description)}"
+            parts.append(part)
+        if total_ms is not None:
+            parts.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(parts)
+
+
+def current() -> Optional[TimingContext]:
+    return _current_timing.get()
+
+
+def record(name: str, duration_ms: float, description: Optional[str] = None) -> None:
+    """向当前计时上下文记录一段耗时（没有上下文时忽略）"""
+    context = _current_timing.get()
+    if context is not None:
+        context.record(name, duration_ms, description)
+
+
+@contextmanager
+def span(name: str, description: Optional[str] = None) -> Iterator[None]:
+    """记录代码块耗时"""
+    context = _current_timing.get()
+    if context is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        context.record(name, (time.perf_counter() - start) * 1000, description)
+
+
+def timed(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """装饰器：记录函数每次调用的耗时"""
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            context = _current_timing.get()
+            if context is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                context.record(name, (time.perf_counter() - start) * 1000)
+        return wrapper
+    return decorator
+
+
+class ServerTimingMiddleware:
+    """ASGI 中间件：为每个请求建立计时上下文，在响应头中输出 Server-Timing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = TimingContext()
+        token = _current_timing.set(context)
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                value = context.header_value(total_ms=(time.perf_counter() - start) * 1000)
+                headers = list(message.get("headers", []))
+                headers.append((HEADER.lower().encode(), value.encode("latin-1", errors="replace")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_timing.reset(token)
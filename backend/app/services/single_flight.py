@@ -0,0 +1,56 @@
+"""
+相同请求合并（single-flight）
+报表链接被分享后，很多人会在同一时刻打开同一个页面。参数相同的耗时计算（数据库聚合查询、
+Excel 文件解析分析）在进行中时，后到的请求不再重复提交，而是等待同一次计算并共享其结果。
+
+键由调用方构建，须包含接口名、规范化参数和数据版本（数据库模式为数据版本号，Excel 模式为
+文件的修改时间和大小），数据变化后的请求不会拿到旧数据的计算结果。
+计算在独立任务中执行：发起计算的请求断开连接被取消时，不影响其它等待中的请求。
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.services import metrics, server_timing
+
+
+class SingleFlight:
+    """按键合并进行中的异步计算（只在事件循环线程中使用）"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, "asyncio.Task"] = {}
+
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, endpoint: str, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行 compute() 并返回结果；同一 key 的计算进行中时等待并共享其结果（包括异常）
+
+        结果对象由多个请求共享，调用方只读不改
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            metrics.single_flight_total.labels(endpoint, "shared").inc()
+            start = time.perf_counter()
+            try:
+                return await asyncio.shield(task)
+            finally:
+                # 共享结果的请求没有自己的计算耗时，记录等待时间
+                server_timing.record("coalesced", (time.perf_counter() - start) * 1000, endpoint)
+
+        metrics.single_flight_total.labels(endpoint, "executed").inc()
+        task = asyncio.ensure_future(compute())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._forget(key, task))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: "asyncio.Task") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 所有等待者都已取消时，避免 "Task exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
+
+
+single_flight = SingleFlight()
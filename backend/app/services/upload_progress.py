@@ -1,39 +1,337 @@
 """
 Upload progress manager
 Tracks upload progress for real-time updates
+
+Progress state lives in a pluggable backend: the in-process memory backend
+(single worker) or the SQLite backend, which is shared by all uvicorn workers
+on the host. Push subscribers (SSE/WebSocket) are woken by local updates and,
+with a shared backend, also poll for updates written by other workers; the poll
+interval backs off while a task is idle. Reads issued from the event loop go
+through the DB executor when the backend is shared, so a locked SQLite file
+never blocks other requests.
 """
+import asyncio
+import copy
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+import json
+import sqlite3
+import threading
 import time
-from typing import Dict, Any, Optional
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 from threading import Lock
-from datetime import datetime
+from datetime import datetime, timedelta
 
+from app.config import settings
+from app.services.executor import execution
 from app.utils.logger import get_logger
 
 logger = get_logger("upload_progress")
 
+# Event types pushed to subscribers; completed/failed are terminal
+EVENT_SNAPSHOT = "snapshot"
+EVENT_PROGRESS = "progress"
+EVENT_STEP = "step"
+EVENT_COMPLETED = "completed"
+EVENT_FAILED = "failed"
+
+# Fields of a task other than its steps
+TASK_FIELDS = (
+    "task_id", "file_name", "status", "progress", "current_step",
+    "error", "result", "created_at", "updated_at",
+)
+
+# How often expired tasks are purged (checked when tasks are created)
+CLEANUP_INTERVAL_SECONDS = 600
+
+
+class ProgressBackend(ABC):
+    """Storage interface for upload progress tasks"""
+
+    # True when the state is visible to other processes
+    shared = False
+
+    @abstractmethod
+    def create(self, task: Dict[str, Any]) -> None:
+        """Store a new task, replacing any task with the same id"""
+
+    @abstractmethod
+    def update(self, task_id: str, fields: Dict[str, Any]) -> bool:
+        """Update task fields; returns False if the task does not exist"""
+
+    @abstractmethod
+    def add_step(self, task_id: str, step: Dict[str, Any]) -> bool:
+        """Append a step; returns False if the task does not exist"""
+
+    @abstractmethod
+    def get(self, task_id: str, step_offset: int = 0) -> Optional[Dict[str, Any]]:
+        """Get a task with its steps starting at step_offset"""
+
+    @abstractmethod
+    def delete(self, task_id: str) -> None:
+        """Delete a task and its steps"""
+
+    @abstractmethod
+    def delete_created_before(self, cutoff: datetime) -> List[str]:
+        """Delete tasks created before cutoff; returns the deleted task ids"""
+
+
+class MemoryProgressBackend(ProgressBackend):
+    """In-process dict backend (single worker)"""
 
-class UploadProgressManager:
-    """Manages upload progress tracking"""
-    
     def __init__(self):
         self._progress: Dict[str, Dict[str, Any]] = {}
         self._lock = Lock()
-    
+
+    def create(self, task: Dict[str, Any]) -> None:
+        with self._lock:
+            self._progress[task["task_id"]] = task
+
+    def update(self, task_id: str, fields: Dict[str, Any]) -> bool:
+        with self._lock:
+            task = self._progress.get(task_id)
+            if task is None:
+                return False
+            task.update(fields)
+            return True
+
+    def add_step(self, task_id: str, step: Dict[str, Any]) -> bool:
+        with self._lock:
+            task = self._progress.get(task_id)
+            if task is None:
+                return False
+            task["steps"].append(step)
+            task["updated_at"] = step["completed_at"]
+            return True
+
+    def get(self, task_id: str, step_offset: int = 0) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            task = self._progress.get(task_id)
+            if task is None:
+                return None
+            snapshot = {key: copy.deepcopy(value) for key, value in task.items() if key != "steps"}
+            snapshot["steps"] = list(task["steps"][step_offset:])
+            return snapshot
+
+    def delete(self, task_id: str) -> None:
+        with self._lock:
+            self._progress.pop(task_id, None)
+
+    def delete_created_before(self, cutoff: datetime) -> List[str]:
+        with self._lock:
+            expired = [
+                task_id for task_id, task in self._progress.items()
+                if datetime.fromisoformat(task["created_at"]) < cutoff
+            ]
+            for task_id in expired:
+                del self._progress[task_id]
+            return expired
+
+
+class SQLiteProgressBackend(ProgressBackend):
+    """
+    SQLite file backend shared by all workers on the host.
+
+    Uses its own database file in WAL mode (not the analytics database), one
+    connection per thread, and appends steps as rows so an update never
+    rewrites the whole step list.
+    """
+
+    shared = True
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS upload_progress (
+                task_id TEXT PRIMARY KEY,
+                file_name TEXT,
+                status TEXT NOT NULL,
+                progress INTEGER NOT NULL DEFAULT 0,
+                current_step TEXT,
+                error TEXT,
+                result TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_upload_progress_created ON upload_progress (created_at);
+            CREATE TABLE IF NOT EXISTS upload_progress_steps (
+                task_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                step TEXT NOT NULL,
+                completed_at TEXT NOT NULL,
+                PRIMARY KEY (task_id, seq)
+            );
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Explicit write transaction. The connection is in autocommit mode
+        (isolation_level=None), so `with conn:` alone would not group statements.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def create(self, task: Dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM upload_progress_steps WHERE task_id = ?", (task["task_id"],))
+            conn.execute(
+                "INSERT OR REPLACE INTO upload_progress "
+                "(task_id, file_name, status, progress, current_step, error, result, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    task["task_id"], task["file_name"], task["status"], task["progress"],
+                    task["current_step"], task["error"], None, task["created_at"], task["updated_at"],
+                )
+            )
+
+    def update(self, task_id: str, fields: Dict[str, Any]) -> bool:
+        fields = dict(fields)
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], ensure_ascii=False, default=str)
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        cursor = self._conn().execute(
+            f"UPDATE upload_progress SET {assignments} WHERE task_id = ?",
+            (*fields.values(), task_id)
+        )
+        return cursor.rowcount > 0
+
+    def add_step(self, task_id: str, step: Dict[str, Any]) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE upload_progress SET updated_at = ? WHERE task_id = ?",
+                (step["completed_at"], task_id)
+            )
+            if cursor.rowcount == 0:
+                return False
+            conn.execute(
+                "INSERT INTO upload_progress_steps (task_id, seq, step, completed_at) "
+                "SELECT ?, COALESCE(MAX(seq) + 1, 0), ?, ? FROM upload_progress_steps WHERE task_id = ?",
+                (task_id, step["step"], step["completed_at"], task_id)
+            )
+        return True
+
+    def get(self, task_id: str, step_offset: int = 0) -> Optional[Dict[str, Any]]:
+        conn = self._conn()
+        row = conn.execute(
+            f"SELECT {', '.join(TASK_FIELDS)} FROM upload_progress WHERE task_id = ?",
+            (task_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        task = dict(zip(TASK_FIELDS, row))
+        if task["result"] is not None:
+            task["result"] = json.loads(task["result"])
+        else:
+            task.pop("result")
+        task["steps"] = [
+            {"step": step, "completed_at": completed_at}
+            for step, completed_at in conn.execute(
+                "SELECT step, completed_at FROM upload_progress_steps "
+                "WHERE task_id = ? AND seq >= ? ORDER BY seq",
+                (task_id, step_offset)
+            )
+        ]
+        return task
+
+    def delete(self, task_id: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM upload_progress_steps WHERE task_id = ?", (task_id,))
+            conn.execute("DELETE FROM upload_progress WHERE task_id = ?", (task_id,))
+
+    def delete_created_before(self, cutoff: datetime) -> List[str]:
+        with self._transaction() as conn:
+            expired = [
+                row[0] for row in conn.execute(
+                    "SELECT task_id FROM upload_progress WHERE created_at < ?",
+                    (cutoff.isoformat(),)
+                )
+            ]
+            for task_id in expired:
+                conn.execute("DELETE FROM upload_progress_steps WHERE task_id = ?", (task_id,))
+                conn.execute("DELETE FROM upload_progress WHERE task_id = ?", (task_id,))
+        return expired
+
+
+def create_progress_backend(kind: str) -> ProgressBackend:
+    """Build the progress backend configured by settings.progress_backend"""
+    if kind == "sqlite":
+        from app.db.database import DB_DIR
+        return SQLiteProgressBackend(DB_DIR / "progress.db")
+    if kind != "memory":
+        logger.warning(f"Unknown progress backend '{kind}', falling back to memory")
+    return MemoryProgressBackend()
+
+
+class UploadProgressManager:
+    """Manages upload progress tracking"""
+
+    def __init__(
+        self,
+        backend: Optional[ProgressBackend] = None,
+        ttl_hours: int = 24,
+        poll_interval: float = 0.5,
+        max_poll_interval: float = 5.0
+    ):
+        self.backend = backend or MemoryProgressBackend()
+        self.ttl_hours = ttl_hours
+        # Polling interval for push subscribers when updates may come from other workers;
+        # doubled after each poll without changes, up to max_poll_interval
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self._lock = Lock()
+        # task_id -> [(event loop, wake-up queue)]; updates arrive from worker threads
+        self._subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._last_cleanup = 0.0
+
+    def _notify(self, task_id: str) -> None:
+        """Wake up local subscribers of a task"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(task_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+            except RuntimeError:
+                # Subscriber's event loop already closed; it is removed when its watcher exits
+                pass
+
     def create_task(self, task_id: str, file_name: str) -> None:
         """Create a new upload progress tracking task"""
-        with self._lock:
-            self._progress[task_id] = {
-                "task_id": task_id,
-                "file_name": file_name,
-                "status": "uploading",
-                "progress": 0,
-                "current_step": "正在上传文件...",
-                "steps": [],
-                "error": None,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat(),
-            }
-    
+        self._maybe_cleanup()
+        now = datetime.now().isoformat()
+        self.backend.create({
+            "task_id": task_id,
+            "file_name": file_name,
+            "status": "uploading",
+            "progress": 0,
+            "current_step": "正在上传文件...",
+            "steps": [],
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        })
+
     def update_progress(
         self,
         task_id: str,
@@ -42,81 +340,170 @@ class UploadProgressManager:
         status: Optional[str] = None
     ) -> None:
         """Update progress for a task"""
-        with self._lock:
-            if task_id not in self._progress:
-                return
-            
-            self._progress[task_id]["progress"] = progress
-            self._progress[task_id]["current_step"] = current_step
-            self._progress[task_id]["updated_at"] = datetime.now().isoformat()
-            
-            if status:
-                self._progress[task_id]["status"] = status
-    
+        fields: Dict[str, Any] = {
+            "progress": progress,
+            "current_step": current_step,
+            "updated_at": datetime.now().isoformat(),
+        }
+        if status:
+            fields["status"] = status
+        if self.backend.update(task_id, fields):
+            self._notify(task_id)
+
     def add_step(self, task_id: str, step: str) -> None:
         """Add a completed step to the task"""
-        with self._lock:
-            if task_id not in self._progress:
-                return
-            
-            self._progress[task_id]["steps"].append({
-                "step": step,
-                "completed_at": datetime.now().isoformat()
-            })
-    
+        step_item = {
+            "step": step,
+            "completed_at": datetime.now().isoformat()
+        }
+        if self.backend.add_step(task_id, step_item):
+            self._notify(task_id)
+
     def complete_task(self, task_id: str, result: Optional[Dict[str, Any]] = None) -> None:
         """Mark task as completed"""
-        with self._lock:
-            if task_id not in self._progress:
-                return
-            
-            self._progress[task_id]["status"] = "completed"
-            self._progress[task_id]["progress"] = 100
-            self._progress[task_id]["current_step"] = "上传并解析完成"
-            self._progress[task_id]["updated_at"] = datetime.now().isoformat()
-            
-            if result:
-                self._progress[task_id]["result"] = result
-    
+        fields: Dict[str, Any] = {
+            "status": "completed",
+            "progress": 100,
+            "current_step": "上传并解析完成",
+            "updated_at": datetime.now().isoformat(),
+        }
+        if result:
+            fields["result"] = result
+        if self.backend.update(task_id, fields):
+            self._notify(task_id)
+
     def fail_task(self, task_id: str, error: str) -> None:
         """Mark task as failed"""
-        with self._lock:
-            if task_id not in self._progress:
-                return
-            
-            self._progress[task_id]["status"] = "failed"
-            self._progress[task_id]["error"] = error
-            self._progress[task_id]["current_step"] = f"上传失败: {error}"
-            self._progress[task_id]["updated_at"] = datetime.now().isoformat()
-    
+        fields = {
+            "status": "failed",
+            "error": error,
+            "current_step": f"上传失败: {error}",
+            "updated_at": datetime.now().isoformat(),
+        }
+        if self.backend.update(task_id, fields):
+            self._notify(task_id)
+
     def get_progress(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get progress for a task"""
+        return self.backend.get(task_id)
+
+    async def fetch_progress(self, task_id: str, step_offset: int = 0) -> Optional[Dict[str, Any]]:
+        """Get progress from the event loop (shared backends are queried in the DB executor)"""
+        if not self.backend.shared:
+            return self.backend.get(task_id, step_offset)
+        return await execution.run_db("progress", self.backend.get, task_id, step_offset)
+
+    async def watch(self, task_id: str, heartbeat: float = 15) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Stream progress events of a task (snapshot first, then deltas).
+
+        Yields None as a heartbeat after `heartbeat` idle seconds and stops
+        after a completed/failed event or when the task disappears.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
         with self._lock:
-            return self._progress.get(task_id)
-    
+            self._subscribers.setdefault(task_id, []).append((loop, queue))
+
+        try:
+            task = await self.fetch_progress(task_id)
+            if task is None:
+                yield {"type": EVENT_FAILED, "error": "任务不存在或已过期"}
+                return
+
+            yield {"type": EVENT_SNAPSHOT, "data": task}
+            if task["status"] == EVENT_COMPLETED:
+                yield {"type": EVENT_COMPLETED, "result": task.get("result")}
+                return
+            if task["status"] == EVENT_FAILED:
+                yield {"type": EVENT_FAILED, "error": task.get("error")}
+                return
+
+            step_count = len(task["steps"])
+            state = (task["progress"], task["current_step"], task["status"])
+            wait = min(self.poll_interval, heartbeat) if self.backend.shared else heartbeat
+            last_event_at = loop.time()
+
+            while True:
+                try:
+                    await asyncio.wait_for(queue.get(), timeout=wait)
+                    while not queue.empty():
+                        queue.get_nowait()
+                    woken = True
+                except asyncio.TimeoutError:
+                    woken = False
+
+                task = await self.fetch_progress(task_id, step_offset=step_count)
+                if task is None:
+                    yield {"type": EVENT_FAILED, "error": "任务不存在或已过期"}
+                    return
+
+                emitted = bool(task["steps"])
+                for step in task["steps"]:
+                    yield {"type": EVENT_STEP, "step": step}
+                step_count += len(task["steps"])
+
+                new_state = (task["progress"], task["current_step"], task["status"])
+                if new_state != state:
+                    state = new_state
+                    emitted = True
+                    yield {
+                        "type": EVENT_PROGRESS,
+                        "progress": task["progress"],
+                        "current_step": task["current_step"],
+                        "status": task["status"],
+                    }
+
+                if task["status"] == EVENT_COMPLETED:
+                    yield {"type": EVENT_COMPLETED, "result": task.get("result")}
+                    return
+                if task["status"] == EVENT_FAILED:
+                    yield {"type": EVENT_FAILED, "error": task.get("error")}
+                    return
+
+                if self.backend.shared:
+                    # Poll quickly while the task is moving, back off while it is idle
+                    wait = self.poll_interval if emitted or woken else min(wait * 2, self.max_poll_interval)
+                    wait = min(wait, heartbeat)
+                if emitted:
+                    last_event_at = loop.time()
+                elif loop.time() - last_event_at >= heartbeat:
+                    last_event_at = loop.time()
+                    yield None
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(task_id, [])
+                subscribers[:] = [item for item in subscribers if item[1] is not queue]
+                if not subscribers:
+                    self._subscribers.pop(task_id, None)
+
     def cleanup_task(self, task_id: str) -> None:
         """Remove a task from tracking"""
-        with self._lock:
-            if task_id in self._progress:
-                del self._progress[task_id]
-    
-    def cleanup_old_tasks(self, max_age_hours: int = 24) -> None:
-        """Remove tasks older than max_age_hours"""
-        with self._lock:
-            now = datetime.now()
-            to_remove = []
-            
-            for task_id, task in self._progress.items():
-                created_at = datetime.fromisoformat(task["created_at"])
-                age_hours = (now - created_at).total_seconds() / 3600
-                
-                if age_hours > max_age_hours:
-                    to_remove.append(task_id)
-            
-            for task_id in to_remove:
-                del self._progress[task_id]
-                logger.info(f"Cleaned up old task: {task_id}")
+        self.backend.delete(task_id)
+        self._notify(task_id)
+
+    def cleanup_old_tasks(self, max_age_hours: Optional[int] = None) -> None:
+        """Remove tasks older than max_age_hours (defaults to the configured TTL)"""
+        hours = self.ttl_hours if max_age_hours is None else max_age_hours
+        cutoff = datetime.now() - timedelta(hours=hours)
+        for task_id in self.backend.delete_created_before(cutoff):
+            logger.info(f"Cleaned up old task: {task_id}")
+            self._notify(task_id)
+
+    def _maybe_cleanup(self) -> None:
+        """Run cleanup_old_tasks at most once per CLEANUP_INTERVAL_SECONDS"""
+        now = time.monotonic()
+        if now - self._last_cleanup < CLEANUP_INTERVAL_SECONDS:
+            return
+        self._last_cleanup = now
+        try:
+            self.cleanup_old_tasks()
+        except Exception as e:
+            logger.error(f"Failed to clean up old progress tasks: {e}")
 
 
 # Global instance
-progress_manager = UploadProgressManager()
+progress_manager = UploadProgressManager(
+    backend=create_progress_backend(settings.progress_backend),
+    ttl_hours=settings.progress_ttl_hours
+)
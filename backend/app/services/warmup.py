@@ -0,0 +1,137 @@
+"""
+启动后台预热
+服务启动时只导入处理请求路由所需的模块，分析依赖（pandas / numpy / openpyxl）在首次使用时
+导入。启动完成（健康检查可用）后在后台提前完成这些导入，并预先启动计算进程池的工作进程、
+在其中做同样的导入，首个分析请求不再承担这部分冷启动耗时。
+
+数据库模式下另外预计算分析结果（Dashboard、一级部门列表、项目列表首屏）写入结果缓存：
+上传解析完成后预计算该文件涉及的月份，启动时预计算最近几个月。预计算以低优先级执行：
+每次查询前等待数据库执行器空闲且没有正在解析入库的文件，单次查询最多让用户请求多排队一次查询的时间。
+预热失败只记录日志。
+"""
+import asyncio
+import importlib
+import time
+from typing import List, Set
+
+from app.config import settings
+from app.services import metrics
+from app.services.executor import execution
+from app.utils.logger import get_logger
+
+logger = get_logger("warmup")
+
+# 预热时导入的分析模块（会连带导入 pandas / numpy / openpyxl）
+ANALYTICS_MODULES = (
+    "app.services.excel_tasks",
+    "app.services.database_parser",
+)
+# 等待数据库执行器空闲的轮询间隔（秒）
+IDLE_POLL_SECONDS = 0.2
+
+# 进行中的结果预热任务（保留引用，避免任务被垃圾回收）
+_result_tasks: Set["asyncio.Task"] = set()
+
+
+def import_analytics_modules() -> float:
+    """导入分析模块，返回耗时（秒）；已导入时几乎不耗时。在工作进程中同样可调用"""
+    start = time.perf_counter()
+    for name in ANALYTICS_MODULES:
+        importlib.import_module(name)
+    return time.perf_counter() - start
+
+
+async def warm_up(delay: float = 0.0) -> None:
+    """后台预热：延迟 delay 秒后，主进程导入分析模块 + 启动计算工作进程，然后预计算最近几个月的结果"""
+    await asyncio.sleep(delay)
+    start = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        import_seconds = await loop.run_in_executor(None, import_analytics_modules)
+        await execution.warm_up(import_analytics_modules)
+    except Exception as e:
+        logger.warning(f"后台预热失败，分析模块将在首次使用时加载: {e}")
+        return
+    elapsed = time.perf_counter() - start
+    metrics.startup_seconds.labels("warmup").set(elapsed)
+    logger.info(f"后台预热完成，用时 {elapsed * 1000:.0f}ms（主进程导入分析模块 {import_seconds * 1000:.0f}ms）")
+    await warm_recent_results()
+
+
+def _available_months() -> List[str]:
+    """数据库中所有上传文件涉及的月份（与 /months 接口一致）"""
+    from app.db.crud import get_available_months
+    from app.db.database import SessionLocal
+    from app.db.models import Upload
+
+    months = set()
+    with SessionLocal() as db:
+        for upload in db.query(Upload).all():
+            months.update(get_available_months(db, upload.file_path))
+    return sorted(months)
+
+
+async def _wait_for_idle_db() -> None:
+    while execution.pending("db") > 0 or execution.pending("ingest") > 0:
+        await asyncio.sleep(IDLE_POLL_SECONDS)
+
+
+async def warm_results(months: List[str]) -> None:
+    """
+    预计算各月份（涉及多个月份时另加全部月份合计）的 Dashboard、一级部门列表和项目列表首屏
+
+    与前端默认请求的参数一致；已在缓存中的结果跳过
+    """
+    from app.services import cached_queries
+    from app.services.result_cache import result_cache
+
+    if not months or not result_cache.enabled:
+        return
+    selections = [[month] for month in months]
+    if len(months) > 1:
+        selections.append(list(months))
+
+    start = time.perf_counter()
+    computed = 0
+    for selection in selections:
+        queries = (
+            ("analyze", {"months": selection}, lambda: cached_queries.dashboard(selection)),
+            ("department_list", {"level": 1, "parent": None, "months": selection},
+             lambda: cached_queries.department_list(1, None, selection)),
+            ("projects", {"months": selection, "limit": cached_queries.PROJECTS_FIRST_PAGE_SIZE, "cursor": None},
+             lambda: cached_queries.projects_page(selection, cached_queries.PROJECTS_FIRST_PAGE_SIZE, None)),
+        )
+        for endpoint, params, query in queries:
+            if result_cache.contains(endpoint, params):
+                continue
+            await _wait_for_idle_db()
+            try:
+                await query()
+                computed += 1
+            except Exception as e:
+                logger.warning(f"结果预热失败（{endpoint}, 月份 {','.join(selection)}）: {e}")
+    logger.info(
+        f"结果预热完成: 月份 {','.join(months)}，计算 {computed} 项，用时 {(time.perf_counter() - start) * 1000:.0f}ms"
+    )
+
+
+def schedule_result_warmup(months: List[str]) -> None:
+    """在事件循环中创建结果预热任务（需在事件循环线程中调用）"""
+    if not settings.result_warmup:
+        return
+    task = asyncio.get_running_loop().create_task(warm_results(sorted(set(months))))
+    _result_tasks.add(task)
+    task.add_done_callback(_result_tasks.discard)
+
+
+async def warm_recent_results() -> None:
+    """启动时预计算最近 settings.result_warmup_recent_months 个月的结果"""
+    if not settings.result_warmup or settings.result_warmup_recent_months <= 0:
+        return
+    await _wait_for_idle_db()
+    try:
+        months = await execution.run_db("warmup", _available_months)
+    except Exception as e:
+        logger.warning(f"获取月份列表失败，跳过启动结果预热: {e}")
+        return
+    await warm_results(months[-settings.result_warmup_recent_months:])
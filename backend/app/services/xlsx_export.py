@@ -0,0 +1,356 @@
+"""
+流式 Excel 导出
+在原工作簿中追加分析结果 Sheet，不经过 openpyxl 对象模型：原有 Sheet、样式、共享字符串
+等部件在 zip 层逐块复制（不解析 XML），只改写工作簿目录相关的几个小部件，新 Sheet 由
+行迭代器逐行生成 XML。输出 zip 边生成边产出字节块，可直接交给 StreamingResponse，
+内存占用与源文件大小无关。
+"""
+import html
+import math
+import numbers
+import posixpath
+import re
+import zipfile
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+ANALYSIS_SHEET_NAME = "分析结果"
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# 复制部件和产出响应数据的块大小
+COPY_CHUNK_SIZE = 256 * 1024
+
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+WORKSHEET_REL_TYPE = REL_NS + "/worksheet"
+CALC_CHAIN_REL_TYPE = REL_NS + "/calcChain"
+WORKSHEET_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+
+_ATTR_RE = re.compile(r'([\w:.-]+)\s*=\s*"([^"]*)"')
+_RELATIONSHIP_RE = re.compile(r"<(?:\w+:)?Relationship\b[^>]*?/>", re.S)
+_SHEET_RE = re.compile(r"<((?:\w+:)?)sheet\b[^>]*?/>", re.S)
+_DEFINED_NAME_RE = re.compile(r"<((?:\w+:)?)definedName\b([^>]*)>(.*?)</\1definedName>", re.S)
+# XML 1.0 不允许的控制字符
+_ILLEGAL_XML_CHARS_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def analysis_result_rows(results: Dict[str, Any]) -> Iterator[List[Any]]:
+    """分析结果 Sheet 的行内容（项目成本、部门成本、交叉验证异常）"""
+    yield ["CostMatrix 数据分析报告"]
+    yield [f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"]
+    yield []
+
+    if results.get('project_costs'):
+        yield ["项目成本归集"]
+        yield ["项目代码", "项目名称", "总成本", "记录数"]
+        for item in results['project_costs']:
+            yield [item['project_code'], item['project_name'], item['total_cost'], item['record_count']]
+        yield []
+
+    if results.get('department_costs'):
+        yield ["部门成本汇总"]
+        yield ["部门", "总成本", "机票", "酒店", "火车票"]
+        for item in results['department_costs']:
+            yield [
+                item['department'], item['total_cost'],
+                item['flight_cost'], item['hotel_cost'], item['train_cost']
+            ]
+        yield []
+
+    if results.get('anomalies'):
+        yield ["交叉验证异常"]
+        yield ["姓名", "日期", "异常类型", "考勤状态", "说明"]
+        for item in results['anomalies']:
+            yield [
+                item['name'], item['date'], item['anomaly_type'],
+                item['attendance_status'], item['description']
+            ]
+
+
+class _ChunkBuffer:
+    """供 ZipFile 写入的不可 seek 缓冲区，由生成器分批取出"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.size = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return data
+
+
+def _attrs(tag: str) -> Dict[str, str]:
+    return {key: html.unescape(value) for key, value in _ATTR_RE.findall(tag)}
+
+
+def _resolve_target(base_dir: str, target: str) -> str:
+    """关系中的 Target 转为 zip 内路径"""
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(base_dir, target))
+
+
+def _rels_path(part: str) -> str:
+    directory, name = posixpath.split(part)
+    return posixpath.join(directory, "_rels", f"{name}.rels")
+
+
+def _column_letter(index: int) -> str:
+    letters = ""
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _cell_xml(ref: str, value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Number):
+        number = float(value)
+        if math.isnan(number) or math.isinf(number):
+            return ""
+        text = str(int(number)) if number.is_integer() and abs(number) < 1e15 else repr(number)
+        return f'<c r="{ref}"><v>{text}</v></c>'
+    if isinstance(value, datetime):
+        value = value.strftime("%Y-%m-%d %H:%M:%S")
+    elif isinstance(value, date):
+        value = value.isoformat()
+    text = _ILLEGAL_XML_CHARS_RE.sub("", str(value))
+    if not text:
+        return ""
+    text = html.escape(text, quote=False)
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _iter_sheet_xml(rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    """逐行生成工作表 XML（内联字符串，不依赖共享字符串表）"""
+    yield (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<sheetData>'
+    )
+    for row_index, row in enumerate(rows, start=1):
+        cells = "".join(
+            _cell_xml(f"{_column_letter(column)}{row_index}", value)
+            for column, value in enumerate(row, start=1)
+        )
+        yield f'<row r="{row_index}">{cells}</row>' if cells else f'<row r="{row_index}"/>'
+    yield '</sheetData></worksheet>'
+
+
+class _WorkbookPlan:
+    """
+    新工作簿的目录改动：改写的部件、跳过的部件，以及新 Sheet 的部件路径
+
+    只用正则修改标签，保留原 XML 的命名空间前缀和其他内容不变
+    """
+
+    def __init__(self, source: zipfile.ZipFile, sheet_name: str):
+        self.names = set(source.namelist())
+        self.modified: Dict[str, bytes] = {}
+        self.skipped: set = set()
+
+        root_rels = source.read("_rels/.rels").decode("utf-8")
+        workbook_part = next(
+            _resolve_target("", attrs["Target"])
+            for attrs in map(_attrs, _RELATIONSHIP_RE.findall(root_rels))
+            if attrs.get("Type", "").endswith("/officeDocument")
+        )
+        workbook_dir = posixpath.dirname(workbook_part)
+        workbook_rels_part = _rels_path(workbook_part)
+
+        workbook = source.read(workbook_part).decode("utf-8")
+        rels = source.read(workbook_rels_part).decode("utf-8")
+        content_types = source.read("[Content_Types].xml").decode("utf-8")
+
+        relationships = {
+            attrs["Id"]: (match, attrs)
+            for match in _RELATIONSHIP_RE.findall(rels)
+            for attrs in [_attrs(match)]
+        }
+        rel_prefix_match = re.search(r'xmlns:(\w+)="' + re.escape(REL_NS) + '"', workbook)
+        rel_prefix = rel_prefix_match.group(1) if rel_prefix_match else "r"
+
+        sheets = [(match.group(0), match.group(1), _attrs(match.group(0))) for match in _SHEET_RE.finditer(workbook)]
+        element_prefix = sheets[0][1] if sheets else ""
+
+        # 已存在同名 Sheet 时先移除（与原 openpyxl 导出行为一致：替换旧的分析结果）
+        for index, (tag, _, attrs) in enumerate(sheets):
+            if attrs.get("name") != sheet_name:
+                continue
+            rel_id = attrs.get(f"{rel_prefix}:id")
+            workbook = workbook.replace(tag, "", 1)
+            workbook = self._drop_sheet_references(workbook, index)
+            if rel_id in relationships:
+                rel_tag, rel_attrs = relationships.pop(rel_id)
+                rels = rels.replace(rel_tag, "", 1)
+                part = _resolve_target(workbook_dir, rel_attrs["Target"])
+                self.skipped.update({part, _rels_path(part)})
+                content_types = self._drop_override(content_types, part)
+            # 计算链引用已删除的 Sheet，去掉后由 Excel 重新生成
+            for rel_key, (rel_tag, rel_attrs) in list(relationships.items()):
+                if rel_attrs.get("Type") == CALC_CHAIN_REL_TYPE:
+                    del relationships[rel_key]
+                    rels = rels.replace(rel_tag, "", 1)
+                    part = _resolve_target(workbook_dir, rel_attrs["Target"])
+                    self.skipped.add(part)
+                    content_types = self._drop_override(content_types, part)
+            break
+
+        sheet_ids = [int(attrs["sheetId"]) for _, _, attrs in sheets if attrs.get("sheetId", "").isdigit()]
+        sheet_id = max(sheet_ids, default=0) + 1
+        rel_number = 1
+        while f"rIdCM{rel_number}" in relationships:
+            rel_number += 1
+        rel_id = f"rIdCM{rel_number}"
+        part_number = 1
+        while posixpath.join(workbook_dir, "worksheets", f"sheet{part_number}.xml") in self.names:
+            part_number += 1
+        self.sheet_part = posixpath.join(workbook_dir, "worksheets", f"sheet{part_number}.xml")
+
+        escaped_name = html.escape(sheet_name, quote=True)
+        sheet_tag = f'<{element_prefix}sheet name="{escaped_name}" sheetId="{sheet_id}" {rel_prefix}:id="{rel_id}"/>'
+        workbook = self._insert_before(workbook, f"</{element_prefix}sheets>", sheet_tag)
+        rels = self._insert_before(
+            rels, "</Relationships>",
+            f'<Relationship Id="{rel_id}" Type="{WORKSHEET_REL_TYPE}" '
+            f'Target="{posixpath.relpath(self.sheet_part, workbook_dir or ".")}"/>'
+        )
+        content_types = self._insert_before(
+            content_types, "</Types>",
+            f'<Override PartName="/{self.sheet_part}" ContentType="{WORKSHEET_CONTENT_TYPE}"/>'
+        )
+
+        self.modified = {
+            workbook_part: workbook.encode("utf-8"),
+            workbook_rels_part: rels.encode("utf-8"),
+            "[Content_Types].xml": content_types.encode("utf-8"),
+        }
+
+    @staticmethod
+    def _insert_before(xml: str, closing_tag: str, element: str) -> str:
+        position = xml.rfind(closing_tag)
+        if position < 0:
+            raise ValueError(f"工作簿结构无法识别: 缺少 {closing_tag}")
+        return xml[:position] + element + xml[position:]
+
+    @staticmethod
+    def _drop_override(content_types: str, part: str) -> str:
+        pattern = r'<Override\b[^>]*PartName="/' + re.escape(part) + r'"[^>]*/>'
+        return re.sub(pattern, "", content_types, count=1)
+
+    @staticmethod
+    def _drop_sheet_references(workbook: str, index: int) -> str:
+        """删除 Sheet 后调整按位置引用 Sheet 的定义名称和活动页"""
+        def adjust_defined_name(match: re.Match) -> str:
+            local_id = _attrs(match.group(2)).get("localSheetId")
+            if local_id is None or not local_id.isdigit():
+                return match.group(0)
+            local_id = int(local_id)
+            if local_id == index:
+                return ""
+            if local_id > index:
+                return match.group(0).replace(f'localSheetId="{local_id}"', f'localSheetId="{local_id - 1}"', 1)
+            return match.group(0)
+
+        workbook = _DEFINED_NAME_RE.sub(adjust_defined_name, workbook)
+        return re.sub(r'\b(activeTab|firstSheet)="\d+"', r'\1="0"', workbook)
+
+
+def _copy_entry(source: zipfile.ZipFile, target: zipfile.ZipFile, info: zipfile.ZipInfo, buffer: _ChunkBuffer) -> Iterator[bytes]:
+    """逐块复制 zip 部件（解压后重新压缩，不解析内容）"""
+    out_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    out_info.compress_type = info.compress_type
+    out_info.external_attr = info.external_attr
+    with source.open(info) as src, target.open(out_info, "w", force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as dst:
+        while True:
+            chunk = src.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            dst.write(chunk)
+            if buffer.size >= COPY_CHUNK_SIZE:
+                yield buffer.drain()
+
+
+class WorkbookFormatError(ValueError):
+    """源文件不是可识别的 xlsx 工作簿（如 .xls 或损坏的文件）"""
+
+
+def _iter_output(source: zipfile.ZipFile, plan: _WorkbookPlan, rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    buffer = _ChunkBuffer()
+    try:
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as target:
+            for info in source.infolist():
+                if info.filename in plan.skipped:
+                    continue
+                if info.filename in plan.modified:
+                    target.writestr(info.filename, plan.modified[info.filename], compress_type=zipfile.ZIP_DEFLATED)
+                    continue
+                yield from _copy_entry(source, target, info, buffer)
+
+            sheet_info = zipfile.ZipInfo(plan.sheet_part, date_time=datetime.now().timetuple()[:6])
+            sheet_info.compress_type = zipfile.ZIP_DEFLATED
+            with target.open(sheet_info, "w") as dst:
+                for fragment in _iter_sheet_xml(rows):
+                    dst.write(fragment.encode("utf-8"))
+                    if buffer.size >= COPY_CHUNK_SIZE:
+                        yield buffer.drain()
+        yield buffer.drain()
+    finally:
+        source.close()
+
+
+def iter_workbook_with_sheet(
+    source_path: str,
+    rows: Iterable[Sequence[Any]],
+    sheet_name: str = ANALYSIS_SHEET_NAME
+) -> Iterator[bytes]:
+    """
+    产出追加了新 Sheet 的工作簿（xlsx 字节块）
+
+    源文件在调用时立即打开并完成目录改写：文件无法识别时在这里抛出 WorkbookFormatError，
+    调用方可在开始发送响应之前返回错误；返回的迭代器只负责复制和生成数据。
+
+    Args:
+        source_path: 原始 xlsx 文件
+        rows: 新 Sheet 的行迭代器
+        sheet_name: 新 Sheet 名称，已存在时替换
+    """
+    try:
+        source = zipfile.ZipFile(source_path)
+    except zipfile.BadZipFile as e:
+        raise WorkbookFormatError(f"文件不是 xlsx 格式: {e}") from e
+    try:
+        plan = _WorkbookPlan(source, sheet_name)
+    except (KeyError, StopIteration, UnicodeDecodeError, ValueError, zipfile.BadZipFile) as e:
+        source.close()
+        raise WorkbookFormatError(f"工作簿结构无法识别: {e}") from e
+    except BaseException:
+        source.close()
+        raise
+    return _iter_output(source, plan, rows)
+
+
+def write_workbook_with_sheet(
+    source_path: str,
+    output_path: str,
+    rows: Iterable[Sequence[Any]],
+    sheet_name: str = ANALYSIS_SHEET_NAME
+) -> str:
+    """将追加了新 Sheet 的工作簿写入文件"""
+    with open(output_path, "wb") as f:
+        for chunk in iter_workbook_with_sheet(source_path, rows, sheet_name):
+            f.write(chunk)
+    return output_path
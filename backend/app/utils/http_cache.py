@@ -0,0 +1,59 @@
+"""
+HTTP 条件请求（ETag / If-None-Match）
+ETag 由数据版本 + 接口路径 + 规范化后的查询参数计算；客户端携带匹配的 If-None-Match
+时直接返回 304，不执行任何查询。
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app.services import metrics
+
+# 客户端每次使用前都需向服务端验证（配合 ETag 实现条件请求）
+CACHE_CONTROL = "no-cache"
+
+
+def _normalize_value(key: str, value: str) -> str:
+    """月份列表去重排序，其余参数去除首尾空白"""
+    if key == "months":
+        return ",".join(sorted({m.strip() for m in value.split(",") if m.strip()}))
+    return value.strip()
+
+
+def make_etag(request: Request, version: str) -> str:
+    """根据数据版本和规范化的请求参数生成强 ETag"""
+    params = sorted(
+        (key, _normalize_value(key, value))
+        for key, value in request.query_params.multi_items()
+        if value.strip()
+    )
+    raw = "|".join([version, request.url.path, *(f"{key}={value}" for key, value in params)])
+    return '"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match 使用弱比较：忽略 W/ 前缀
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """If-None-Match 命中时返回 304 响应，否则返回 None（仅处理 GET/HEAD）"""
+    if request.method not in ("GET", "HEAD"):
+        return None
+    if_none_match = request.headers.get("if-none-match")
+    hit = bool(if_none_match) and _matches(if_none_match, etag)
+    metrics.record_cache("etag", hit)
+    if hit:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return None
+
+
+def with_etag(response: Response, etag: str) -> Response:
+    """为响应附加 ETag 和 Cache-Control"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
@@ -0,0 +1,138 @@
+"""
+JSON 响应快速序列化
+- 优先使用 orjson（原生支持 NumPy / datetime，直接输出 UTF-8 字节），未安装时回退到标准库 json
+- 接口返回的数据均由服务层自行构建，直接序列化为响应体，跳过 AnalysisResult 的 Pydantic 校验
+- 超大列表（项目、订单、异常记录）按批次流式输出 JSON 数组，避免一次性拼接整个响应体
+- 不在导入时加载 NumPy / pandas：只有已导入时才可能出现它们的对象，序列化时按需从 sys.modules 取用
+"""
+import datetime as dt
+import decimal
+import json
+import math
+import sys
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+# 列表长度超过该值时改为流式输出
+STREAM_THRESHOLD = 2000
+# 流式输出时每批序列化的元素数
+STREAM_CHUNK_SIZE = 500
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """处理两种编码器都不能原生序列化的类型"""
+    pd = sys.modules.get("pandas")
+    if pd is not None:
+        if obj is pd.NaT:
+            return None
+        if isinstance(obj, pd.Timestamp):
+            return obj.isoformat()
+    if isinstance(obj, (dt.datetime, dt.date, dt.time)):
+        return obj.isoformat()
+    np = sys.modules.get("numpy")
+    if np is not None:
+        if isinstance(obj, np.integer):
+            return int(obj)
+        if isinstance(obj, np.floating):
+            value = float(obj)
+            return None if math.isnan(value) else value
+        if isinstance(obj, np.bool_):
+            return bool(obj)
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为 UTF-8 JSON 字节"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """使用 dumps 渲染的 JSONResponse"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def analysis_response(message: str, data: Optional[Dict[str, Any]] = None, success: bool = True) -> FastJSONResponse:
+    """
+    构建与 AnalysisResult 结构一致的响应（不经过 Pydantic 校验）
+    """
+    return FastJSONResponse({"success": success, "message": message, "data": data})
+
+
+def _iter_json_array(items: Sequence[Any], chunk_size: int) -> Iterator[bytes]:
+    yield b"["
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        body = b",".join(dumps(item) for item in chunk)
+        yield body if start == 0 else b"," + body
+    yield b"]"
+
+
+def _iter_analysis_body(
+    message: str,
+    data: Dict[str, Any],
+    array_key: str,
+    items: Sequence[Any],
+    chunk_size: int
+) -> Iterator[bytes]:
+    yield b'{"success":true,"message":' + dumps(message) + b',"data":{'
+    for key, value in data.items():
+        yield dumps(key) + b":" + dumps(value) + b","
+    yield dumps(array_key) + b":"
+    yield from _iter_json_array(items, chunk_size)
+    yield b"}}"
+
+
+def analysis_list_response(
+    message: str,
+    data: Dict[str, Any],
+    array_key: str,
+    stream_threshold: int = STREAM_THRESHOLD,
+    chunk_size: int = STREAM_CHUNK_SIZE
+):
+    """
+    构建包含大列表的 AnalysisResult 响应
+
+    data[array_key] 的长度超过 stream_threshold 时按批流式输出，否则整体序列化。
+    两种方式输出的 JSON 结构相同（流式输出时 array_key 位于 data 的最后）。
+
+    Args:
+        message: 提示信息
+        data: 响应数据
+        array_key: data 中需要流式输出的列表字段
+        stream_threshold: 启用流式输出的列表长度阈值
+        chunk_size: 每批序列化的元素数
+    """
+    items = data.get(array_key) or []
+    if len(items) <= stream_threshold:
+        return analysis_response(message, data)
+
+    rest = {key: value for key, value in data.items() if key != array_key}
+    return StreamingResponse(
+        _iter_analysis_body(message, rest, array_key, items, chunk_size),
+        media_type="application/json"
+    )
@@ -5,12 +5,24 @@ Tries to reuse the shared ``logger_config`` module when it is available (e.g. in
 local development at the repo root). If it cannot be imported inside the Docker
 container, a lightweight fallback logger with console and rotating file handlers
 is provided so the application keeps running with useful logs.
+
+Either way the logger's handlers are moved behind a ``QueueHandler``: callers
+only enqueue records and a single ``QueueListener`` thread per process does the
+console/file I/O, so request threads never wait on disk writes for logs.
+``LogSampler`` thins out repetitive per-row/per-item messages.
 """
 
+import atexit
 import logging
+import multiprocessing.util
+import queue
 import sys
+import threading
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Hashable, List, Optional
+
+from app.config import settings
 
 LOG_FORMAT = "%(asctime)s - [%(levelname)s] - [%(name)s:%(funcName)s:%(lineno)d] - %(message)s"
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
@@ -49,6 +61,103 @@ def _create_fallback_logger(name: str) -> logging.Logger:
     return logger
 
 
+class _RoutingHandler(logging.Handler):
+    """在监听线程中把记录交给其所属记录器原有的处理器"""
+
+    def __init__(self):
+        super().__init__()
+        self._targets: Dict[str, List[logging.Handler]] = {}
+
+    def register(self, name: str, handlers: List[logging.Handler]) -> None:
+        self._targets[name] = handlers
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        for handler in self._targets.get(getattr(record, "log_target", ""), ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.handle(record)
+
+
+class _AsyncHandler(QueueHandler):
+    """只把（已格式化消息的）记录放入队列，并标记所属记录器"""
+
+    def __init__(self, log_queue: "queue.SimpleQueue", target: str):
+        super().__init__(log_queue)
+        self.target = target
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = super().prepare(record)
+        record.log_target = self.target
+        return record
+
+
+_log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+_router = _RoutingHandler()
+_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def _stop_listener() -> None:
+    """停止监听线程（处理完队列中剩余的记录）"""
+    global _listener
+    with _listener_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+def _ensure_listener() -> None:
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+        _listener = QueueListener(_log_queue, _router)
+        _listener.start()
+    atexit.register(_stop_listener)
+    # 进程池工作进程退出时不执行 atexit，通过 multiprocessing 的退出回调刷新队列
+    multiprocessing.util.Finalize(None, _stop_listener, exitpriority=10)
+
+
+def _make_async(logger: logging.Logger) -> logging.Logger:
+    """把记录器的处理器移到后台监听线程（幂等）"""
+    handlers = [handler for handler in logger.handlers if not isinstance(handler, _AsyncHandler)]
+    if not handlers or len(handlers) != len(logger.handlers):
+        return logger
+    _router.register(logger.name, handlers)
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(_AsyncHandler(_log_queue, logger.name))
+    _ensure_listener()
+    return logger
+
+
+class LogSampler:
+    """
+    重复日志采样：每个 key 的前 first 次全部输出，之后每 every 次输出一次
+
+    用于逐行/逐项的循环日志，例如:
+        if sampler.should_log(sheet_name):
+            logger.debug(...)
+    """
+
+    def __init__(self, first: int = 3, every: int = 1000):
+        self.first = max(0, first)
+        self.every = max(1, every)
+        self._counts: Dict[Hashable, int] = {}
+
+    def should_log(self, key: Hashable = None) -> bool:
+        count = self._counts.get(key, 0) + 1
+        self._counts[key] = count
+        return count <= self.first or count % self.every == 0
+
+    def count(self, key: Hashable = None) -> int:
+        """key 已出现的次数（含未输出的）"""
+        return self._counts.get(key, 0)
+
+
 try:
     # 优先使用仓库根目录提供的 logger_config（开发环境）
     from logger_config import get_logger as _shared_get_logger  # type: ignore
@@ -60,9 +169,8 @@ def get_logger(name: str) -> logging.Logger:
     """
     获取日志记录器。优先使用共享的 logger_config，否则使用容器内的 fallback。
     """
-    if _shared_get_logger:
-        return _shared_get_logger(name)
-    return _create_fallback_logger(name)
+    logger = _shared_get_logger(name) if _shared_get_logger else _create_fallback_logger(name)
+    return _make_async(logger) if settings.log_async else logger
 
 
-__all__ = ["get_logger"]
+__all__ = ["get_logger", "LogSampler"]
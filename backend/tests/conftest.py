@@ -0,0 +1,10 @@
+"""
+测试公共配置
+应用配置在导入时读取，这里在导入 app 之前把上传目录（以及同级的数据库目录）指向临时目录，
+测试不会读写本地数据。
+"""
+import os
+import tempfile
+
+_work_dir = tempfile.mkdtemp(prefix="costmatrix-tests-")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_work_dir, "uploads"))
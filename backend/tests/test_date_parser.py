@@ -0,0 +1,124 @@
+"""date_parser：列格式推断、格式缓存及整列解析"""
+from datetime import datetime, time
+
+import pandas as pd
+import pytest
+
+from app.services import date_parser
+from app.services.date_parser import (
+    FORMAT_DATETIME,
+    FORMAT_EMPTY,
+    FORMAT_EXCEL_SERIAL,
+    FORMAT_MIXED,
+    FORMAT_TIME_ONLY,
+    clear_format_cache,
+    infer_format,
+    parse_date_column,
+    template_signature,
+)
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    clear_format_cache()
+    yield
+    clear_format_cache()
+
+
+@pytest.mark.parametrize("values, expected", [
+    (["2025-01-02", "2025-01-31", None], "%Y-%m-%d"),
+    (["2025/01/02", "2025/12/31"], "%Y/%m/%d"),
+    (["2025-01-02 08:30:00", "2025-01-03 18:00:00"], "%Y-%m-%d %H:%M:%S"),
+    (["20250102", "20250131"], "%Y%m%d"),
+    ([45659, 45660.5], FORMAT_EXCEL_SERIAL),
+    ([datetime(2025, 1, 2), datetime(2025, 1, 3)], FORMAT_DATETIME),
+    (["08:30", "22:17:05"], FORMAT_TIME_ONLY),
+    ([time(8, 30), time(22, 17)], FORMAT_TIME_ONLY),
+    ([None, None], FORMAT_EMPTY),
+    (["2025-01-02", "2025/01/03"], FORMAT_MIXED),
+    (["2025-01-02", "not a date"], FORMAT_MIXED),
+    ([12, 45659], FORMAT_MIXED),  # 超出 Excel 序列号范围的数字不视为日期
+])
+def test_infer_format(values, expected):
+    assert infer_format(pd.Series(values, dtype=object)) == expected
+
+
+def test_infer_format_datetime_dtype():
+    assert infer_format(pd.Series(pd.to_datetime(["2025-01-02"]))) == FORMAT_DATETIME
+
+
+def test_parse_column_by_inferred_format():
+    serial = parse_date_column(pd.Series([45659, None], dtype=object))
+    assert serial.iloc[0] == pd.Timestamp("2025-01-02")
+    assert pd.isna(serial.iloc[1])
+
+    # 纯时间值解析为 NaT，不会变成“今天”
+    times = parse_date_column(pd.Series(["08:30", "2025-01-02"], dtype=object))
+    assert pd.isna(times.iloc[0])
+    assert times.iloc[1] == pd.Timestamp("2025-01-02")
+
+
+def test_stray_values_fall_back_to_mixed_parsing():
+    values = ["2025-01-%02d" % day for day in range(1, 29)] * 3 + ["2025/02/01"]
+    result = parse_date_column(pd.Series(values, dtype=object))
+    assert result.iloc[-1] == pd.Timestamp("2025-02-01")
+    assert result.notna().all()
+
+
+def test_format_cache_reused_for_same_template(monkeypatch):
+    signature = template_signature(["姓名", "日期"])
+    first = pd.Series(["2025-01-02", "2025-01-03"], dtype=object)
+    parse_date_column(first, "状态明细", "日期", signature)
+    assert date_parser._format_cache[("状态明细", "日期", signature)] == "%Y-%m-%d"
+
+    calls = []
+    monkeypatch.setattr(date_parser, "infer_format", lambda series: calls.append(series) or FORMAT_MIXED)
+    second = parse_date_column(pd.Series(["2025-02-01"], dtype=object), "状态明细", "日期", signature)
+    assert calls == []
+    assert second.iloc[0] == pd.Timestamp("2025-02-01")
+
+
+def test_format_cache_revalidated_when_column_changes():
+    signature = template_signature(["姓名", "日期"])
+    parse_date_column(pd.Series(["2025-01-02"], dtype=object), "状态明细", "日期", signature)
+
+    # 同一模板的新文件改用 Excel 序列号，缓存格式校验失败后重新推断
+    result = parse_date_column(pd.Series([45659], dtype=object), "状态明细", "日期", signature)
+    assert result.iloc[0] == pd.Timestamp("2025-01-02")
+    assert date_parser._format_cache[("状态明细", "日期", signature)] == FORMAT_EXCEL_SERIAL
+
+
+def test_cached_mixed_format_is_reinferred_when_column_is_uniform():
+    signature = template_signature(["姓名", "日期"])
+    parse_date_column(pd.Series(["2025-01-02", "2025/01/03"], dtype=object), "状态明细", "日期", signature)
+    assert date_parser._format_cache[("状态明细", "日期", signature)] == FORMAT_MIXED
+
+    # 同模板的下一个文件格式一致，恢复单一格式的快速路径
+    parse_date_column(pd.Series(["2025-02-01", "2025-02-02"], dtype=object), "状态明细", "日期", signature)
+    assert date_parser._format_cache[("状态明细", "日期", signature)] == "%Y-%m-%d"
+
+    # 仍然混合时保持 MIXED
+    parse_date_column(pd.Series(["2025-03-01", "2025/03/02"], dtype=object), "状态明细", "日期", signature)
+    assert date_parser._format_cache[("状态明细", "日期", signature)] == FORMAT_MIXED
+
+
+def test_format_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(date_parser, "FORMAT_CACHE_SIZE", 3)
+    series = pd.Series(["2025-01-02"], dtype=object)
+    for index in range(5):
+        parse_date_column(series, "状态明细", "日期", template_signature([f"列{index}"]))
+
+    # 只保留最近使用的 3 个模板
+    assert len(date_parser._format_cache) == 3
+    assert ("状态明细", "日期", template_signature(["列0"])) not in date_parser._format_cache
+    assert ("状态明细", "日期", template_signature(["列4"])) in date_parser._format_cache
+
+
+def test_no_cache_without_signature():
+    parse_date_column(pd.Series(["2025-01-02"], dtype=object), "状态明细", "日期")
+    assert date_parser._format_cache == {}
+
+
+def test_template_signature_depends_on_columns():
+    assert template_signature(["a", "b"]) == template_signature([" a", "b "])
+    assert template_signature(["a", "b"]) != template_signature(["b", "a"])
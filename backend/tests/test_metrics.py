@@ -0,0 +1,65 @@
+"""metrics：多线程并发更新不丢失计数，drain / merge 增量"""
+import sys
+import threading
+
+import pytest
+
+from app.services.metrics import MetricsRegistry
+
+THREADS = 8
+UPDATES = 20000
+
+
+@pytest.fixture
+def fast_switching():
+    # 缩短线程切换间隔，让读取-相加-写回之间更容易发生线程切换（是否触发取决于解释器版本）
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def _run_concurrently(func):
+    threads = [threading.Thread(target=func) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_updates_are_not_lost(fast_switching):
+    registry = MetricsRegistry()
+    counter = registry.counter("test_requests_total", "requests").labels()
+    gauge = registry.gauge("test_pending", "pending").labels()
+    histogram = registry.histogram("test_seconds", "seconds", buckets=(0.5,)).labels()
+
+    def work():
+        for _ in range(UPDATES):
+            counter.inc()
+            gauge.inc()
+            gauge.dec(0.5)
+            histogram.observe(0.25)
+
+    _run_concurrently(work)
+
+    total = THREADS * UPDATES
+    assert counter.get() == total
+    assert gauge.get() == total * 0.5
+    counts, observed_sum = histogram.get()
+    assert counts == [total, 0]
+    assert observed_sum == pytest.approx(total * 0.25)
+
+
+def test_drain_and_merge_move_deltas():
+    worker, main = MetricsRegistry(), MetricsRegistry()
+    for registry in (worker, main):
+        registry.counter("test_requests_total", "requests", ("endpoint",))
+        registry.histogram("test_seconds", "seconds", buckets=(0.5,))
+
+    worker.counter("test_requests_total", "requests", ("endpoint",)).labels("analyze").inc(3)
+    worker.histogram("test_seconds", "seconds", buckets=(0.5,)).observe(1.0)
+
+    main.merge(worker.drain())
+    assert worker.drain() == []
+    assert main.counter("test_requests_total", "requests", ("endpoint",)).labels("analyze").get() == 3
+    assert main.histogram("test_seconds", "seconds", buckets=(0.5,)).labels().get() == ([0, 1], 1.0)
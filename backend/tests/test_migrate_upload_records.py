@@ -0,0 +1,63 @@
+"""crud.migrate_upload_records_file：旧版 upload_records.json 一次性导入（多 worker 同时启动）"""
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db import crud
+from app.db.crud import migrate_upload_records_file
+from app.db.models import Base, Upload
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+@pytest.fixture
+def records_file(tmp_path):
+    workbook = tmp_path / "wb.xlsx"
+    workbook.write_bytes(b"workbook")
+    path = tmp_path / "upload_records.json"
+    path.write_text(json.dumps([
+        {"file_path": str(workbook), "file_name": "原始文件.xlsx", "parsed": True,
+         "last_analyzed_at": "2025-01-02 08:30:00"},
+        {"file_path": str(tmp_path / "deleted.xlsx")},
+    ]), encoding="utf-8")
+    return path
+
+
+def test_imports_once_and_renames_file(db, records_file):
+    assert migrate_upload_records_file(db, records_file) == 1
+    upload = db.query(Upload).one()
+    assert upload.file_name == "原始文件.xlsx"
+    assert upload.parse_status == "parsed"
+    assert not records_file.exists()
+    assert records_file.with_name("upload_records.json.migrated").exists()
+
+    # 第二个 worker 启动时文件已不存在
+    assert migrate_upload_records_file(db, records_file) == 0
+    assert db.query(Upload).count() == 1
+
+
+def test_file_claimed_by_another_worker_is_skipped(db, records_file):
+    records_file.rename(records_file.with_name("upload_records.json.migrating"))
+    assert migrate_upload_records_file(db, records_file) == 0
+    assert db.query(Upload).count() == 0
+
+
+def test_failed_import_rolls_back_and_keeps_file(db, records_file, monkeypatch):
+    def failing(session, path):
+        session.add(Upload(file_path="/tmp/x.xlsx", file_size=1, file_hash="h"))
+        raise IntegrityError("INSERT", {}, Exception("UNIQUE constraint failed: uploads.file_hash"))
+
+    monkeypatch.setattr(crud, "_import_upload_records", failing)
+    assert migrate_upload_records_file(db, records_file) == 0
+    assert db.query(Upload).count() == 0
+    assert records_file.exists()
@@ -0,0 +1,141 @@
+"""crud 游标分页：encode_cursor / decode_cursor 及按 (排序键 DESC, id DESC) 的 keyset 翻页"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db.crud import decode_cursor, encode_cursor, get_all_projects_from_db, get_anomalies_page
+from app.db.models import (
+    Anomaly, AttendanceRecord, Base, Department, Employee, Project, TravelExpense, Upload
+)
+
+MONTHS = ["2025-01"]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+@pytest.fixture
+def seeded(db):
+    """一个上传文件、两名员工；异常与项目成本都包含相同排序键（并列）的记录"""
+    department = Department(name="研发部", level=1)
+    db.add(department)
+    db.flush()
+    employees = [Employee(name=name, department_id=department.id) for name in ("张三", "李四")]
+    upload = Upload(file_name="wb.xlsx", file_path="/tmp/wb.xlsx", file_size=1, file_hash="hash")
+    db.add_all([*employees, upload])
+    db.flush()
+
+    db.add(AttendanceRecord(upload_id=upload.id, date=datetime(2025, 1, 2), employee_id=employees[0].id, status="上班"))
+
+    # 异常：3 条同一天（并列），另外 2 条不同日期
+    anomaly_dates = [datetime(2025, 1, 10)] * 3 + [datetime(2025, 1, 5), datetime(2025, 1, 20)]
+    for index, date in enumerate(anomaly_dates):
+        db.add(Anomaly(
+            upload_id=upload.id, date=date, employee_id=employees[index % 2].id,
+            anomaly_type="A", attendance_status="上班", description=f"异常{index}"
+        ))
+
+    # 项目：P1/P2/P3 总成本相同（并列），P4 更高，P5 更低
+    costs = {"P1": 100.0, "P2": 100.0, "P3": 100.0, "P4": 250.5, "P5": 10.25}
+    for code, cost in costs.items():
+        project = Project(code=code, name=f"项目{code}")
+        db.add(project)
+        db.flush()
+        # 拆成两笔，检验聚合后的排序键
+        for amount in (cost / 2, cost / 2):
+            db.add(TravelExpense(
+                upload_id=upload.id, date=datetime(2025, 1, 15), employee_id=employees[0].id,
+                project_id=project.id, expense_type="flight", amount=amount
+            ))
+    db.commit()
+    return db
+
+
+def _collect(fetch, key, limit):
+    """按页读取直到 next_cursor 为空，返回所有行和页数"""
+    items, cursor, pages = [], None, 0
+    while True:
+        page = fetch(limit, cursor)
+        items.extend(page[key])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items, pages, page["total_count"]
+        assert pages < 100
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor([datetime(2025, 1, 10, 8, 30), 42])
+    assert decode_cursor(cursor, (datetime, int)) == [datetime(2025, 1, 10, 8, 30), 42]
+
+    cursor = encode_cursor([100.125, 7])
+    assert decode_cursor(cursor, (float, int)) == [100.125, 7]
+
+
+def test_missing_cursor_means_first_page():
+    assert decode_cursor(None, (datetime, int)) is None
+    assert decode_cursor("", (datetime, int)) is None
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!!",
+    encode_cursor([1]),                       # 键数量不对
+    encode_cursor(["not a date", 1]),         # 类型不对
+    "eyJhIjoxfQ==",                           # 不是列表（{"a":1}）
+    "w6k=",                                   # 不是 JSON
+])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, (datetime, int))
+
+
+def test_anomaly_pages_cover_all_rows_once_with_ties(seeded):
+    unpaged = get_anomalies_page(seeded, MONTHS)
+    assert unpaged["next_cursor"] is None
+    assert unpaged["total_count"] == 5
+
+    for limit in (1, 2, 4):
+        items, pages, total = _collect(
+            lambda limit, cursor: get_anomalies_page(seeded, MONTHS, limit, cursor), "anomalies", limit
+        )
+        assert items == unpaged["anomalies"]
+        assert total == 5
+        assert pages == -(-5 // limit)
+
+    dates = [item["date"] for item in unpaged["anomalies"]]
+    assert dates == sorted(dates, reverse=True)
+
+
+def test_project_pages_cover_all_rows_once_with_ties(seeded):
+    unpaged = get_all_projects_from_db(seeded, MONTHS)
+    codes = [project["code"] for project in unpaged["projects"]]
+    assert codes[0] == "P4" and codes[-1] == "P5"
+    assert sorted(codes[1:4]) == ["P1", "P2", "P3"]
+
+    for limit in (1, 2, 3):
+        items, _, total = _collect(
+            lambda limit, cursor: get_all_projects_from_db(seeded, MONTHS, limit, cursor), "projects", limit
+        )
+        assert [item["code"] for item in items] == codes
+        assert total == 5
+
+
+def test_last_page_has_no_cursor(seeded):
+    page = get_all_projects_from_db(seeded, MONTHS, limit=5)
+    assert len(page["projects"]) == 5
+    assert page["next_cursor"] is None
+
+
+def test_invalid_cursor_is_rejected_by_queries(seeded):
+    with pytest.raises(ValueError):
+        get_all_projects_from_db(seeded, MONTHS, 2, "garbage")
+    with pytest.raises(ValueError):
+        get_anomalies_page(seeded, MONTHS, 2, encode_cursor([1.5, 1]))
@@ -0,0 +1,98 @@
+"""single_flight.SingleFlight：并发合并、异常传播、发起者取消"""
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"value": 42}
+
+        waiters = [asyncio.create_task(flight.do("analyze", "key", compute)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert flight.inflight() == 1
+        release.set()
+        results = await asyncio.gather(*waiters)
+        return calls, results, flight.inflight()
+
+    calls, results, inflight = asyncio.run(scenario())
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert inflight == 0
+
+
+def test_different_keys_compute_separately():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def compute(value):
+            await asyncio.sleep(0)
+            return value
+
+        return await asyncio.gather(
+            flight.do("analyze", "a", lambda: compute("a")),
+            flight.do("analyze", "b", lambda: compute("b")),
+        )
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+
+
+def test_exception_propagates_to_all_waiters_and_is_not_cached():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *(flight.do("analyze", "key", failing) for _ in range(3)), return_exceptions=True
+        )
+
+        async def succeeding():
+            return "ok"
+
+        # 失败的计算结束后不再保留，下一次调用重新计算
+        retry = await flight.do("analyze", "key", succeeding)
+        return calls, results, retry
+
+    calls, results, retry = asyncio.run(scenario())
+    assert calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    assert retry == "ok"
+
+
+def test_leader_cancellation_does_not_cancel_followers():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return "done"
+
+        leader = asyncio.create_task(flight.do("analyze", "key", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("analyze", "key", compute))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        release.set()
+        return await follower
+
+    assert asyncio.run(scenario()) == "done"
@@ -0,0 +1,68 @@
+"""upload_progress.UploadProgressManager.watch：快照之后的结束事件、共享后端的读取与轮询"""
+import asyncio
+import threading
+
+from app.services.upload_progress import SQLiteProgressBackend, UploadProgressManager
+
+
+def _events(manager, task_id):
+    async def collect():
+        return [event async for event in manager.watch(task_id)]
+
+    return asyncio.run(collect())
+
+
+def test_finished_task_sends_snapshot_then_one_terminal_event_with_details():
+    manager = UploadProgressManager()
+    manager.create_task("failed", "wb.xlsx")
+    manager.fail_task("failed", "解析失败")
+    manager.create_task("done", "wb.xlsx")
+    manager.complete_task("done", {"records": 3})
+
+    failed = _events(manager, "failed")
+    assert [event["type"] for event in failed] == ["snapshot", "failed"]
+    assert failed[1]["error"] == "解析失败"
+
+    done = _events(manager, "done")
+    assert [event["type"] for event in done] == ["snapshot", "completed"]
+    assert done[1]["result"] == {"records": 3}
+
+
+def test_unknown_task_fails_without_snapshot():
+    assert [event["type"] for event in _events(UploadProgressManager(), "missing")] == ["failed"]
+
+
+def test_shared_backend_is_read_off_the_event_loop_and_sees_other_workers(tmp_path):
+    path = tmp_path / "progress.db"
+    manager = UploadProgressManager(SQLiteProgressBackend(path), poll_interval=0.01, max_poll_interval=0.05)
+    other_worker = UploadProgressManager(SQLiteProgressBackend(path))
+    other_worker.create_task("task", "wb.xlsx")
+
+    read_threads = []
+    original_get = manager.backend.get
+
+    def recording_get(*args, **kwargs):
+        read_threads.append(threading.current_thread())
+        return original_get(*args, **kwargs)
+
+    manager.backend.get = recording_get
+
+    async def scenario():
+        events = []
+
+        async def finish_later():
+            await asyncio.sleep(0.2)
+            other_worker.add_step("task", "解析完成")
+            other_worker.complete_task("task")
+
+        finisher = asyncio.create_task(finish_later())
+        async for event in manager.watch("task", heartbeat=1):
+            events.append(event)
+        await finisher
+        return events, threading.current_thread()
+
+    events, loop_thread = asyncio.run(scenario())
+    assert [event["type"] for event in events if event] == ["snapshot", "step", "progress", "completed"]
+    assert read_threads and loop_thread not in read_threads
+    # 空闲时轮询间隔逐渐拉长：0.2 秒内远少于按 0.01 秒固定轮询的次数
+    assert len(read_threads) < 12
@@ -0,0 +1,79 @@
+"""xlsx_export.iter_workbook_with_sheet：追加 / 替换分析结果 Sheet，无法识别的源文件"""
+import zipfile
+from io import BytesIO
+
+import openpyxl
+import pytest
+
+from app.services.xlsx_export import (
+    ANALYSIS_SHEET_NAME,
+    WorkbookFormatError,
+    iter_workbook_with_sheet,
+    write_workbook_with_sheet,
+)
+
+
+def _make_workbook(path, sheets):
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for name, rows in sheets.items():
+        sheet = workbook.create_sheet(name)
+        for row in rows:
+            sheet.append(row)
+    workbook.save(path)
+
+
+def _read(data: bytes):
+    return openpyxl.load_workbook(BytesIO(data))
+
+
+def test_round_trip_appends_sheet_and_keeps_existing(tmp_path):
+    source = tmp_path / "source.xlsx"
+    _make_workbook(source, {"状态明细": [["姓名", "日期"], ["张三", "2025-01-02"]], "机票": [["金额"], [120.5]]})
+
+    rows = [["项目代码", "总成本"], ["P001", 1234.5], ["P002", None], [], ["<&> 特殊字符", True]]
+    workbook = _read(b"".join(iter_workbook_with_sheet(str(source), rows)))
+
+    assert workbook.sheetnames == ["状态明细", "机票", ANALYSIS_SHEET_NAME]
+    assert [list(row) for row in workbook["状态明细"].iter_rows(values_only=True)] == [["姓名", "日期"], ["张三", "2025-01-02"]]
+    assert workbook["机票"]["A2"].value == 120.5
+
+    result = workbook[ANALYSIS_SHEET_NAME]
+    assert result["A1"].value == "项目代码"
+    assert result["B2"].value == 1234.5
+    assert result["A3"].value == "P002" and result["B3"].value is None
+    assert result["A5"].value == "<&> 特殊字符"
+    assert result["B5"].value is True
+
+
+def test_existing_analysis_sheet_is_replaced(tmp_path):
+    source = tmp_path / "source.xlsx"
+    _make_workbook(source, {"状态明细": [["姓名"]], ANALYSIS_SHEET_NAME: [["旧结果"]], "酒店": [["金额"]]})
+
+    output = tmp_path / "output.xlsx"
+    write_workbook_with_sheet(str(source), str(output), [["新结果"]])
+    # 再次导出同一结果文件仍只有一个分析结果 Sheet
+    again = tmp_path / "again.xlsx"
+    write_workbook_with_sheet(str(output), str(again), [["第二次"]])
+
+    workbook = openpyxl.load_workbook(again)
+    assert workbook.sheetnames == ["状态明细", "酒店", ANALYSIS_SHEET_NAME]
+    assert workbook[ANALYSIS_SHEET_NAME]["A1"].value == "第二次"
+
+
+def test_non_zip_source_fails_before_streaming(tmp_path):
+    source = tmp_path / "legacy.xls"
+    source.write_bytes(b"\xd0\xcf\x11\xe0 not a zip file")
+
+    # 错误在调用时抛出，而不是在迭代（发送响应）过程中
+    with pytest.raises(WorkbookFormatError):
+        iter_workbook_with_sheet(str(source), [["结果"]])
+
+
+def test_zip_without_workbook_is_rejected(tmp_path):
+    source = tmp_path / "other.xlsx"
+    with zipfile.ZipFile(source, "w") as archive:
+        archive.writestr("readme.txt", "hello")
+
+    with pytest.raises(WorkbookFormatError):
+        iter_workbook_with_sheet(str(source), [["结果"]])
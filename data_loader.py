@@ -4,7 +4,6 @@
 """
 
 import pandas as pd
-import re
 from typing import Dict, Tuple
 from datetime import datetime
 from logger_config import get_logger
@@ -39,37 +38,27 @@ class DataLoader:
         try:
             self.logger.info("开始加载所有工作表")
             
-            # 读取考勤数据
-            self.logger.debug("正在读取考勤数据（状态明细）")
-            self.attendance_df = pd.read_excel(
-                self.file_path, 
-                sheet_name="状态明细"
+            # 一次打开工作簿读取全部所需 Sheet，避免重复解析文件
+            sheets = pd.read_excel(
+                self.file_path,
+                sheet_name=["状态明细", "机票", "酒店", "火车票"]
             )
+            
+            # 考勤数据
+            self.attendance_df = sheets["状态明细"]
             self.logger.info(f"考勤数据加载完成，行数: {len(self.attendance_df)}, 列数: {len(self.attendance_df.columns)}")
             self._clean_attendance_data()
             
-            # 读取差旅数据
-            self.logger.debug("正在读取机票数据")
-            self.flight_df = pd.read_excel(
-                self.file_path, 
-                sheet_name="机票"
-            )
+            # 差旅数据
+            self.flight_df = sheets["机票"]
             self.logger.info(f"机票数据加载完成，行数: {len(self.flight_df)}, 列数: {len(self.flight_df.columns)}")
             self._clean_travel_data(self.flight_df, "出发日期")
             
-            self.logger.debug("正在读取酒店数据")
-            self.hotel_df = pd.read_excel(
-                self.file_path, 
-                sheet_name="酒店"
-            )
+            self.hotel_df = sheets["酒店"]
             self.logger.info(f"酒店数据加载完成，行数: {len(self.hotel_df)}, 列数: {len(self.hotel_df.columns)}")
             self._clean_travel_data(self.hotel_df, "入住日期")
             
-            self.logger.debug("正在读取火车票数据")
-            self.train_df = pd.read_excel(
-                self.file_path, 
-                sheet_name="火车票"
-            )
+            self.train_df = sheets["火车票"]
             self.logger.info(f"火车票数据加载完成，行数: {len(self.train_df)}, 列数: {len(self.train_df.columns)}")
             self._clean_travel_data(self.train_df, "出发日期")
             
@@ -152,7 +141,7 @@ class DataLoader:
                 self.logger.debug(f"      {i}. {repr(val)} (类型: {type(val).__name__})")
             
             # 执行清洗
-            df['授信金额'] = df['授信金额'].apply(self._clean_amount)
+            df['授信金额'] = self._clean_amount_series(df['授信金额'], self.logger)
             
             # 统计清洗结果
             zero_count = (df['授信金额'] == 0).sum()
@@ -195,7 +184,7 @@ class DataLoader:
                 self.logger.debug(f"      {i}. {repr(val)}")
             
             # 执行提取
-            df['项目代码'] = df['项目'].apply(self._extract_project_code)
+            df['项目代码'] = self._extract_project_code_series(df['项目'], self.logger)
             
             # 统计提取结果
             unique_projects = df['项目代码'].nunique()
@@ -250,39 +239,66 @@ class DataLoader:
         self.logger.info(f"=" * 60 + "\n")
     
     @staticmethod
-    def _clean_amount(amount_str) -> float:
+    def _clean_amount_series(series: pd.Series, logger=None) -> pd.Series:
         """
-        清洗金额字段，去除货币符号和逗号
+        向量化清洗金额列，去除货币符号、逗号和空白后转为浮点数
+        
+        空值及无法转换的值记为 0.0；转换失败仅按列汇总记录一次警告
         
         Args:
-            amount_str: 原始金额字符串
+            series: 原始金额列
+            logger: 日志记录器（可选）
             
         Returns:
-            清洗后的浮点数
+            清洗后的浮点数列
         """
-        logger = get_logger("data_loader")
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            return series.astype(float).fillna(0.0)
         
-        if pd.isna(amount_str):
-            logger.debug(f"金额清洗: NaN 或 None -> 0.0")
-            return 0.0
+        cleaned = series.astype(str).str.normalize('NFKC').str.replace(r'[¥,\s]', '', regex=True)
+        result = pd.to_numeric(cleaned, errors='coerce')
         
-        # 记录原始值
-        original = amount_str
+        failed = result.isna() & series.notna()
+        if logger is not None and failed.any():
+            samples = [repr(v) for v in series[failed].head(5)]
+            logger.warning(f"⚠️  金额转换失败 {int(failed.sum())} 条，已按 0.0 处理，示例: {', '.join(samples)}")
         
-        # 转为字符串
-        amount_str = str(amount_str)
+        return result.fillna(0.0).astype(float)
+    
+    @staticmethod
+    def _extract_project_code_series(series: pd.Series, logger=None) -> pd.Series:
+        """
+        向量化提取项目代码
+        格式: "05010013 市场-整星..." -> "05010013"，无法提取时为 "未知"
         
-        # 去除 ¥ 符号、逗号、空格
-        cleaned = re.sub(r'[¥,\s]', '', amount_str)
+        Args:
+            series: 原始项目列
+            logger: 日志记录器（可选）
+            
+        Returns:
+            项目代码列
+        """
+        codes = series.astype(str).str.strip().str.extract(r'^(\d+)', expand=False)
         
-        try:
-            result = float(cleaned)
-            if result == 0.0:
-                logger.debug(f"金额清洗: {repr(original)} -> {result}")
-            return result
-        except ValueError:
-            logger.warning(f"⚠️  金额转换失败: {repr(original)} -> 清洗后: {repr(cleaned)} -> 返回 0.0")
-            return 0.0
+        failed = codes.isna() & series.notna()
+        if logger is not None and failed.any():
+            samples = [repr(v) for v in series[failed].head(5)]
+            logger.warning(f"⚠️  项目代码提取失败 {int(failed.sum())} 条（不符合格式: 以数字开头），示例: {', '.join(samples)}")
+        
+        return codes.where(series.notna()).fillna("未知")
+    
+    @staticmethod
+    def _clean_amount(amount_str) -> float:
+        """
+        清洗金额字段，去除货币符号和逗号
+        
+        Args:
+            amount_str: 原始金额字符串
+            
+        Returns:
+            清洗后的浮点数
+        """
+        return float(DataLoader._clean_amount_series(pd.Series([amount_str], dtype=object)).iloc[0])
     
     @staticmethod
     def _extract_project_code(project_str) -> str:
@@ -296,24 +312,7 @@ class DataLoader:
         Returns:
             项目代码
         """
-        logger = get_logger("data_loader")
-        
-        if pd.isna(project_str):
-            logger.debug(f"项目代码提取: NaN 或 None -> '未知'")
-            return "未知"
-        
-        original = project_str
-        project_str = str(project_str).strip()
-        
-        # 提取空格前的数字
-        match = re.match(r'^(\d+)', project_str)
-        if match:
-            code = match.group(1)
-            logger.debug(f"项目代码提取成功: {repr(original)} -> {code}")
-            return code
-        
-        logger.warning(f"⚠️  项目代码提取失败: {repr(original)} -> '未知' (不符合格式: 以数字开头)")
-        return "未知"
+        return DataLoader._extract_project_code_series(pd.Series([project_str], dtype=object)).iloc[0]
     
     def get_merged_travel_data(self) -> pd.DataFrame:
         """
@@ -0,0 +1,93 @@
+import { useCallback, useRef, useState } from 'react'
+
+export interface CursorPageResult<T> {
+  items: T[]
+  total: number
+  nextCursor: string | null
+}
+
+/**
+ * 游标分页 Hook
+ * 后端按 (排序键, ID) 做 keyset 分页，只能顺序翻页；这里缓存每一页的起始游标，
+ * 跳页时从最近的已知页依次向后请求，表格只持有当前页数据。
+ * @param fetchPage 请求一页数据，失败时返回 null
+ * @param defaultPageSize 默认每页条数
+ */
+export const useCursorPagination = <T>(
+  fetchPage: (limit: number, cursor: string | null) => Promise<CursorPageResult<T> | null>,
+  defaultPageSize = 20
+) => {
+  const [items, setItems] = useState<T[]>([])
+  const [total, setTotal] = useState(0)
+  const [current, setCurrent] = useState(1)
+  const [pageSize, setPageSize] = useState(defaultPageSize)
+  const [loading, setLoading] = useState(false)
+  // cursors[i] 为第 i + 1 页的起始游标（第 1 页为 null）
+  const cursorsRef = useRef<(string | null)[]>([null])
+  // 丢弃过期请求（如切换月份后旧请求才返回）
+  const requestIdRef = useRef(0)
+
+  const loadPage = useCallback(
+    async (page: number, size: number) => {
+      const requestId = ++requestIdRef.current
+      const cursors = cursorsRef.current
+      setLoading(true)
+      try {
+        let pageNo = Math.min(page, cursors.length)
+        let result = await fetchPage(size, cursors[pageNo - 1])
+        while (result && result.nextCursor && pageNo < page) {
+          cursors[pageNo] = result.nextCursor
+          pageNo += 1
+          result = await fetchPage(size, result.nextCursor)
+        }
+        if (requestId !== requestIdRef.current || !result) {
+          return
+        }
+        if (result.nextCursor) {
+          cursors[pageNo] = result.nextCursor
+        }
+        setItems(result.items)
+        setTotal(result.total)
+        setCurrent(pageNo)
+      } finally {
+        if (requestId === requestIdRef.current) {
+          setLoading(false)
+        }
+      }
+    },
+    [fetchPage]
+  )
+
+  /** 清空游标并重新加载第一页 */
+  const reload = useCallback(
+    (size: number = pageSize) => {
+      cursorsRef.current = [null]
+      setPageSize(size)
+      return loadPage(1, size)
+    },
+    [loadPage, pageSize]
+  )
+
+  /** 清空数据（如未选择月份） */
+  const reset = useCallback(() => {
+    requestIdRef.current += 1
+    cursorsRef.current = [null]
+    setItems([])
+    setTotal(0)
+    setCurrent(1)
+    setLoading(false)
+  }, [])
+
+  /** 表格分页变化回调：每页条数变化时游标失效，从第一页重新加载 */
+  const onChange = useCallback(
+    (page: number, size: number) => {
+      if (size !== pageSize) {
+        return reload(size)
+      }
+      return loadPage(page, size)
+    },
+    [loadPage, pageSize, reload]
+  )
+
+  return { items, total, current, pageSize, loading, reload, reset, onChange }
+}
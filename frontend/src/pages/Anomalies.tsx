@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useEffect, useCallback } from 'react'
 import {
   Card,
   Table,
@@ -23,6 +23,7 @@ import type { ColumnsType } from 'antd/es/table'
 import type { AnomalyDetail } from '@/types'
 import { getAnomalies } from '@/services/api'
 import { useMonthContext } from '@/contexts/MonthContext'
+import { useCursorPagination } from '@/hooks/useCursorPagination'
 
 const { Title, Text } = Typography
 
@@ -30,40 +31,55 @@ const Anomalies = () => {
   const navigate = useNavigate()
   const { selectedMonths } = useMonthContext()
 
-  const [anomalies, setAnomalies] = useState<AnomalyDetail[]>([])
-  const [loading, setLoading] = useState(false)
+  // 按页从数据库获取异常记录（不传file_path，传递months参数）
+  const fetchAnomalyPage = useCallback(
+    async (limit: number, cursor: string | null) => {
+      try {
+        const result = await getAnomalies('', selectedMonths, { limit, cursor })
+        if (result.success && result.data?.anomalies) {
+          return {
+            items: result.data.anomalies as AnomalyDetail[],
+            total: result.data.total_count,
+            nextCursor: result.data.next_cursor,
+          }
+        }
+        message.error(result.message || '获取异常记录失败')
+      } catch (error: any) {
+        message.error(error.message || '获取异常记录失败')
+      }
+      return null
+    },
+    [selectedMonths]
+  )
+
+  const {
+    items: anomalies,
+    total,
+    current,
+    pageSize,
+    loading,
+    reload,
+    reset,
+    onChange,
+  } = useCursorPagination(fetchAnomalyPage)
 
   useEffect(() => {
     if (selectedMonths.length > 0) {
-      fetchAnomalies()
+      reload()
     } else {
-      setAnomalies([])
+      reset()
     }
   }, [selectedMonths])
 
-  const fetchAnomalies = async () => {
+  const fetchAnomalies = () => {
     if (selectedMonths.length === 0) {
       message.warning('请先选择月份')
       return
     }
-
-    setLoading(true)
-    try {
-      // 调用API时不传file_path，传递months参数从数据库获取数据
-      const result = await getAnomalies('', selectedMonths)
-      if (result.success && result.data?.anomalies) {
-        setAnomalies(result.data.anomalies)
-      } else {
-        message.error(result.message || '获取异常记录失败')
-      }
-    } catch (error: any) {
-      message.error(error.message || '获取异常记录失败')
-    } finally {
-      setLoading(false)
-    }
+    reload()
   }
 
-  // 异常记录表格列定义
+  // 异常记录表格列定义（服务端分页，按日期降序返回；只有当前页在浏览器中，不做前端排序）
   const anomalyColumns: ColumnsType<AnomalyDetail> = [
     {
       title: '日期',
@@ -71,7 +87,6 @@ const Anomalies = () => {
       key: 'date',
       width: 120,
       fixed: 'left',
-      sorter: (a, b) => a.date.localeCompare(b.date),
       render: (date: string) => (
         <Space>
           <CalendarOutlined />
@@ -84,7 +99,6 @@ const Anomalies = () => {
       dataIndex: 'name',
       key: 'name',
       width: 120,
-      sorter: (a, b) => a.name.localeCompare(b.name),
       render: (name: string) => (
         <Space>
           <UserOutlined />
@@ -97,7 +111,6 @@ const Anomalies = () => {
       dataIndex: 'dept',
       key: 'dept',
       width: 150,
-      sorter: (a, b) => a.dept.localeCompare(b.dept),
       render: (dept: string) => (
         <Space>
           <TeamOutlined />
@@ -110,7 +123,6 @@ const Anomalies = () => {
       dataIndex: 'type',
       key: 'type',
       width: 120,
-      sorter: (a, b) => a.type.localeCompare(b.type),
       render: (type: string) => {
         const colorMap: Record<string, string> = {
           'A': 'red',
@@ -178,7 +190,7 @@ const Anomalies = () => {
             ))}
           </Space>
           <Tag color="red" icon={<WarningOutlined />}>
-            共 {anomalies.length} 条异常
+            共 {total} 条异常
           </Tag>
         </Space>
         <Button onClick={fetchAnomalies} loading={loading}>
@@ -194,7 +206,10 @@ const Anomalies = () => {
               columns={anomalyColumns}
               rowKey={(record) => `${record.date}-${record.name}-${record.dept}-${record.type}`}
               pagination={{
-                pageSize: 20,
+                current,
+                pageSize,
+                total,
+                onChange,
                 showSizeChanger: true,
                 showTotal: (total) => `共 ${total} 条异常记录`,
                 pageSizeOptions: ['10', '20', '50', '100'],
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useCallback, useRef } from 'react'
 import {
   Card,
   Table,
@@ -30,6 +30,7 @@ import type { ColumnsType } from 'antd/es/table'
 import type { ProjectDetail, ProjectOrderRecord } from '@/types'
 import { getAllProjects, getProjectOrders } from '@/services/api'
 import { useMonthContext } from '@/contexts/MonthContext'
+import { useCursorPagination } from '@/hooks/useCursorPagination'
 
 const { Title, Text } = Typography
 
@@ -37,44 +38,80 @@ const Projects = () => {
   const navigate = useNavigate()
   const { selectedMonths } = useMonthContext()
 
-  const [projects, setProjects] = useState<ProjectDetail[]>([])
-  const [loading, setLoading] = useState(false)
   const [selectedProject, setSelectedProject] = useState<ProjectDetail | null>(null)
-  const [orders, setOrders] = useState<ProjectOrderRecord[]>([])
-  const [ordersLoading, setOrdersLoading] = useState(false)
   const [drawerVisible, setDrawerVisible] = useState(false)
+  // 当前查看订单的项目代码（订单分页请求读取）
+  const orderProjectCodeRef = useRef<string | null>(null)
+
+  // 按页从数据库获取项目（不传file_path，传递months参数）
+  const fetchProjectPage = useCallback(
+    async (limit: number, cursor: string | null) => {
+      try {
+        const result = await getAllProjects('', selectedMonths, { limit, cursor })
+        if (result.success && result.data?.projects) {
+          return {
+            items: result.data.projects as ProjectDetail[],
+            total: result.data.total_count,
+            nextCursor: result.data.next_cursor,
+          }
+        }
+        message.error(result.message || '获取项目数据失败')
+      } catch (error: any) {
+        message.error(error.message || '获取项目数据失败')
+      }
+      return null
+    },
+    [selectedMonths]
+  )
+
+  const fetchOrderPage = useCallback(
+    async (limit: number, cursor: string | null) => {
+      const projectCode = orderProjectCodeRef.current
+      if (!projectCode) {
+        return null
+      }
+      try {
+        const result = await getProjectOrders('', projectCode, selectedMonths, { limit, cursor })
+        if (result.success && result.data?.orders) {
+          return {
+            items: result.data.orders as ProjectOrderRecord[],
+            total: result.data.total_count,
+            nextCursor: result.data.next_cursor,
+          }
+        }
+        message.error(result.message || '获取订单记录失败')
+      } catch (error: any) {
+        message.error(error.message || '获取订单记录失败')
+      }
+      return null
+    },
+    [selectedMonths]
+  )
+
+  const projectPager = useCursorPagination(fetchProjectPage, 20)
+  const orderPager = useCursorPagination(fetchOrderPage, 10)
+  const projects = projectPager.items
+  const loading = projectPager.loading
+  const orders = orderPager.items
+  const ordersLoading = orderPager.loading
 
   useEffect(() => {
     if (selectedMonths.length > 0) {
-      fetchProjects()
+      projectPager.reload()
     } else {
-      setProjects([])
+      projectPager.reset()
     }
   }, [selectedMonths])
 
-  const fetchProjects = async () => {
+  const fetchProjects = () => {
     if (selectedMonths.length === 0) {
       message.warning('请先选择月份')
       return
     }
-
-    setLoading(true)
-    try {
-      // 调用API时不传file_path，传递months参数从数据库获取数据
-      const result = await getAllProjects('', selectedMonths)
-      if (result.success && result.data?.projects) {
-        setProjects(result.data.projects)
-      } else {
-        message.error(result.message || '获取项目数据失败')
-      }
-    } catch (error: any) {
-      message.error(error.message || '获取项目数据失败')
-    } finally {
-      setLoading(false)
-    }
+    projectPager.reload()
   }
 
-  const handleViewOrders = async (project: ProjectDetail) => {
+  const handleViewOrders = (project: ProjectDetail) => {
     if (selectedMonths.length === 0) {
       message.warning('请先选择月份')
       return
@@ -82,29 +119,18 @@ const Projects = () => {
 
     setSelectedProject(project)
     setDrawerVisible(true)
-    setOrdersLoading(true)
-
-    try {
-      const result = await getProjectOrders('', project.code, selectedMonths)
-      if (result.success && result.data?.orders) {
-        setOrders(result.data.orders)
-      } else {
-        message.error(result.message || '获取订单记录失败')
-      }
-    } catch (error: any) {
-      message.error(error.message || '获取订单记录失败')
-    } finally {
-      setOrdersLoading(false)
-    }
+    orderProjectCodeRef.current = project.code
+    orderPager.reload()
   }
 
   const handleDrawerClose = () => {
     setDrawerVisible(false)
     setSelectedProject(null)
-    setOrders([])
+    orderProjectCodeRef.current = null
+    orderPager.reset()
   }
 
-  // 项目列表表格列定义
+  // 项目列表表格列定义（服务端分页，按总成本降序返回；只有当前页在浏览器中，不做前端排序）
   const projectColumns: ColumnsType<ProjectDetail> = [
     {
       title: '项目代码',
@@ -112,7 +138,6 @@ const Projects = () => {
       key: 'code',
       fixed: 'left',
       width: 120,
-      sorter: (a, b) => a.code.localeCompare(b.code),
       render: (value: string) => value === 'nan' ? '未知编号' : value,
     },
     {
@@ -121,7 +146,6 @@ const Projects = () => {
       key: 'name',
       width: 250,
       ellipsis: true,
-      sorter: (a, b) => a.name.localeCompare(b.name),
       render: (value: string) => value === 'nan' ? '未知项目' : value,
     },
     {
@@ -129,7 +153,6 @@ const Projects = () => {
       dataIndex: 'total_cost',
       key: 'total_cost',
       width: 150,
-      sorter: (a, b) => a.total_cost - b.total_cost,
       render: (value: number) => (
         <Text strong style={{ color: '#52c41a' }}>
           ¥{value.toLocaleString()}
@@ -141,7 +164,6 @@ const Projects = () => {
       dataIndex: 'flight_cost',
       key: 'flight_cost',
       width: 120,
-      sorter: (a, b) => a.flight_cost - b.flight_cost,
       render: (value: number) => `¥${value.toLocaleString()}`,
     },
     {
@@ -149,7 +171,6 @@ const Projects = () => {
       dataIndex: 'hotel_cost',
       key: 'hotel_cost',
       width: 120,
-      sorter: (a, b) => a.hotel_cost - b.hotel_cost,
       render: (value: number) => `¥${value.toLocaleString()}`,
     },
     {
@@ -157,7 +178,6 @@ const Projects = () => {
       dataIndex: 'train_cost',
       key: 'train_cost',
       width: 120,
-      sorter: (a, b) => a.train_cost - b.train_cost,
       render: (value: number) => `¥${value.toLocaleString()}`,
     },
     {
@@ -165,7 +185,6 @@ const Projects = () => {
       dataIndex: 'record_count',
       key: 'record_count',
       width: 100,
-      sorter: (a, b) => a.record_count - b.record_count,
       render: (value: number) => (
         <Tag color="blue">{value} 单</Tag>
       ),
@@ -175,7 +194,6 @@ const Projects = () => {
       dataIndex: 'person_count',
       key: 'person_count',
       width: 100,
-      sorter: (a, b) => a.person_count - b.person_count,
       render: (value: number) => (
         <Tag color="cyan">{value} 人</Tag>
       ),
@@ -185,7 +203,6 @@ const Projects = () => {
       dataIndex: 'over_standard_count',
       key: 'over_standard_count',
       width: 100,
-      sorter: (a, b) => (a.over_standard_count || 0) - (b.over_standard_count || 0),
       render: (value: number) => {
         if (value > 0) {
           return <Tag color="red">{value} 单</Tag>
@@ -222,14 +239,13 @@ const Projects = () => {
     },
   ]
 
-  // 订单记录表格列定义
+  // 订单记录表格列定义（服务端分页，按日期降序返回，不做前端排序）
   const orderColumns: ColumnsType<ProjectOrderRecord> = [
     {
       title: '日期',
       dataIndex: 'date',
       key: 'date',
       width: 120,
-      sorter: (a, b) => a.date.localeCompare(b.date),
     },
     {
       title: '姓名',
@@ -263,7 +279,6 @@ const Projects = () => {
       dataIndex: 'amount',
       key: 'amount',
       width: 120,
-      sorter: (a, b) => a.amount - b.amount,
       render: (value: number) => `¥${value.toLocaleString()}`,
     },
     {
@@ -326,7 +341,7 @@ const Projects = () => {
               <Tag key={month} color="blue">{month}</Tag>
             ))}
           </Space>
-          <Tag color="purple">共 {projects.length} 个项目</Tag>
+          <Tag color="purple">共 {projectPager.total} 个项目</Tag>
         </Space>
         <Button onClick={fetchProjects} loading={loading}>
           刷新数据
@@ -341,7 +356,10 @@ const Projects = () => {
               columns={projectColumns}
               rowKey="code"
               pagination={{
-                pageSize: 20,
+                current: projectPager.current,
+                pageSize: projectPager.pageSize,
+                total: projectPager.total,
+                onChange: projectPager.onChange,
                 showSizeChanger: false,
                 showTotal: (total) => `共 ${total} 个项目`,
               }}
@@ -499,7 +517,10 @@ const Projects = () => {
                     columns={orderColumns}
                     rowKey="id"
                     pagination={{
-                      pageSize: 10,
+                      current: orderPager.current,
+                      pageSize: orderPager.pageSize,
+                      total: orderPager.total,
+                      onChange: orderPager.onChange,
                       showSizeChanger: false,
                       showTotal: (total) => `共 ${total} 条订单记录`,
                     }}
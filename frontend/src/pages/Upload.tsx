@@ -1,4 +1,4 @@
-import { useState } from 'react'
+import { useState, useRef, useEffect } from 'react'
 import {
   Card,
   Upload as AntUpload,
@@ -17,7 +17,8 @@ import {
   CheckCircleOutlined,
 } from '@ant-design/icons'
 import { useNavigate } from 'react-router-dom'
-import { uploadFile, getUploadProgress } from '@/services/api'
+import { uploadFile, getUploadProgress, subscribeUploadProgress } from '@/services/api'
+import type { UploadProgressEvent } from '@/services/api'
 import { useMonthContext } from '@/contexts/MonthContext'
 
 const { Dragger } = AntUpload
@@ -31,6 +32,69 @@ const Upload = () => {
   const [currentStep, setCurrentStep] = useState('')
   const [steps, setSteps] = useState<Array<{ step: string; completed_at: string }>>([])
   const [status, setStatus] = useState<string>('')
+  const unsubscribeRef = useRef<(() => void) | null>(null)
+
+  useEffect(() => () => unsubscribeRef.current?.(), [])
+
+  const handleCompleted = async () => {
+    message.success('文件上传并解析成功！')
+    await refreshMonths()
+    setTimeout(() => {
+      navigate('/')
+    }, 1500)
+  }
+
+  const handleFailed = (error?: string | null) => {
+    message.error(error || '文件上传失败')
+    setUploading(false)
+    setUploadProgress(0)
+  }
+
+  const handleProgressEvent = (event: UploadProgressEvent) => {
+    switch (event.type) {
+      case 'snapshot':
+        if (event.data) {
+          setUploadProgress(event.data.progress)
+          setCurrentStep(event.data.current_step)
+          setSteps(event.data.steps || [])
+          // 任务已结束时随后还有 completed / failed 事件，提示只在那里处理一次
+          setStatus(event.data.status)
+        }
+        break
+      case 'progress':
+        setUploadProgress(event.progress ?? 0)
+        setCurrentStep(event.current_step || '')
+        if (event.status) {
+          setStatus(event.status)
+        }
+        break
+      case 'step':
+        if (event.step) {
+          const step = event.step
+          setSteps((prev) => [...prev, step])
+        }
+        break
+      case 'completed':
+        setUploadProgress(100)
+        setCurrentStep('上传并解析完成')
+        setStatus('completed')
+        handleCompleted()
+        break
+      case 'failed':
+        setStatus('failed')
+        handleFailed(event.error)
+        break
+    }
+  }
+
+  // 优先通过 SSE 接收进度推送，连接失败时回退为轮询
+  const watchProgress = (id: string) => {
+    unsubscribeRef.current?.()
+    unsubscribeRef.current = subscribeUploadProgress(id, handleProgressEvent, () => {
+      unsubscribeRef.current = null
+      pollProgress(id)
+    })
+  }
 
   const pollProgress = async (id: string) => {
     try {
@@ -43,18 +107,12 @@ const Upload = () => {
         setStatus(result.data.status)
 
         if (result.data.status === 'completed') {
-          message.success('文件上传并解析成功！')
-          await refreshMonths()
-          setTimeout(() => {
-            navigate('/')
-          }, 1500)
+          await handleCompleted()
           return
         }
 
         if (result.data.status === 'failed') {
-          message.error(result.data.error || '文件上传失败')
-          setUploading(false)
-          setUploadProgress(0)
+          handleFailed(result.data.error)
           return
         }
 
@@ -100,7 +158,7 @@ const Upload = () => {
       const result = await uploadFile(file)
 
       if (result.success && result.data?.task_id) {
-        pollProgress(result.data.task_id)
+        watchProgress(result.data.task_id)
       } else {
         message.error(result.message || '文件上传失败')
         setUploading(false)
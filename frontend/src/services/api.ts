@@ -13,6 +13,7 @@ import type {
   CreateUserPayload,
   ChangePasswordPayload,
   UpdateUserPayload,
+  CursorPageParams,
 } from '@/types'
 
 // API 基础地址
@@ -111,6 +112,67 @@ export const getUploadProgress = async (taskId: string): Promise<ApiResponse<{
   }>>(`/progress/${encodeURIComponent(taskId)}`)
 }
 
+export interface UploadProgressEvent {
+  type: 'snapshot' | 'progress' | 'step' | 'completed' | 'failed'
+  data?: {
+    status: string
+    progress: number
+    current_step: string
+    steps: Array<{ step: string; completed_at: string }>
+    error: string | null
+    result?: any
+  }
+  progress?: number
+  current_step?: string
+  status?: string
+  step?: { step: string; completed_at: string }
+  error?: string
+  result?: any
+}
+
+/**
+ * 订阅上传进度（Server-Sent Events）
+ * 首个事件为完整快照，之后只推送增量；任务结束（completed / failed）后自动关闭连接
+ * @param taskId 任务ID
+ * @param onEvent 进度事件回调
+ * @param onError 连接失败回调（可回退为轮询 getUploadProgress）
+ * @returns 取消订阅函数
+ */
+export const subscribeUploadProgress = (
+  taskId: string,
+  onEvent: (event: UploadProgressEvent) => void,
+  onError?: () => void
+): (() => void) => {
+  const source = new EventSource(`${API_BASE_URL}/progress/${encodeURIComponent(taskId)}/stream`)
+  let finished = false
+
+  const handle = (message: MessageEvent) => {
+    const event = JSON.parse(message.data) as UploadProgressEvent
+    if (event.type === 'completed' || event.type === 'failed') {
+      finished = true
+      source.close()
+    }
+    onEvent(event)
+  }
+
+  ;['snapshot', 'progress', 'step', 'completed', 'failed'].forEach((type) => {
+    source.addEventListener(type, handle as EventListener)
+  })
+  source.onerror = () => {
+    if (finished) {
+      return
+    }
+    finished = true
+    source.close()
+    onError?.()
+  }
+
+  return () => {
+    finished = true
+    source.close()
+  }
+}
+
 /**
  * 获取缓存的分析结果
  * @param fileName 文件名 (不含路径和扩展名)
@@ -157,7 +219,7 @@ export const deleteMonth = async (month: string): Promise<ApiResponse<{
 
 /**
  * 分析 Excel 文件
- * POST /api/analyze
+ * POST /api/analyze（数据库模式为 GET /api/analyze）
  * @param filePath 文件路径（可选，不提供则从数据库读取）
  * @param options 可选参数
  * @param options.months 月份列表 (例如: ["2025-01", "2025-02"])
@@ -188,6 +250,10 @@ export const analyzeExcel = async (
     params.year = options.year
   }
 
+  // 数据库模式使用 GET，浏览器会携带 If-None-Match，数据未变化时服务端返回 304
+  if (!filePath) {
+    return apiClient.get<ApiResponse<AnalysisResult>>('/analyze', { params })
+  }
   return apiClient.post<ApiResponse<AnalysisResult>>('/analyze', null, { params })
 }
 
@@ -292,17 +358,20 @@ export const changePassword = async (payload: ChangePasswordPayload): Promise<Ap
 }
 
 /**
- * 获取所有项目的详细信息
+ * 获取项目的详细信息（按总成本降序，数据库模式支持游标分页）
  * @param filePath 文件路径（可选，不提供则从数据库读取）
  * @param months 月份列表（数据库模式下使用）
+ * @param page 分页参数（不提供则返回全部）
  * @returns 项目详情列表
  */
 export const getAllProjects = async (
   filePath: string,
-  months?: string[]
+  months?: string[],
+  page?: CursorPageParams
 ): Promise<ApiResponse<{
   projects: any[]
   total_count: number
+  next_cursor: string | null
 }>> => {
   const params: Record<string, any> = {}
   if (filePath) {
@@ -311,28 +380,38 @@ export const getAllProjects = async (
   if (months && months.length > 0) {
     params.months = months.join(',')
   }
+  if (page?.limit) {
+    params.limit = page.limit
+  }
+  if (page?.cursor) {
+    params.cursor = page.cursor
+  }
 
   return apiClient.get<ApiResponse<{
     projects: any[]
     total_count: number
+    next_cursor: string | null
   }>>('/projects', { params })
 }
 
 /**
- * 获取指定项目的所有订单记录
+ * 获取指定项目的订单记录（按日期降序，数据库模式支持游标分页）
  * @param filePath 文件路径（可选，不提供则从数据库读取）
  * @param projectCode 项目代码
  * @param months 月份列表（数据库模式下使用）
+ * @param page 分页参数（不提供则返回全部）
  * @returns 项目订单记录列表
  */
 export const getProjectOrders = async (
   filePath: string,
   projectCode: string,
-  months?: string[]
+  months?: string[],
+  page?: CursorPageParams
 ): Promise<ApiResponse<{
   project_code: string
   orders: any[]
   total_count: number
+  next_cursor: string | null
 }>> => {
   const params: Record<string, any> = {}
   if (filePath) {
@@ -341,11 +420,18 @@ export const getProjectOrders = async (
   if (months && months.length > 0) {
     params.months = months.join(',')
   }
+  if (page?.limit) {
+    params.limit = page.limit
+  }
+  if (page?.cursor) {
+    params.cursor = page.cursor
+  }
 
   return apiClient.get<ApiResponse<{
     project_code: string
     orders: any[]
     total_count: number
+    next_cursor: string | null
   }>>(`/projects/${encodeURIComponent(projectCode)}/orders`, { params })
 }
 
@@ -562,17 +648,20 @@ export const getLevel2DepartmentStatistics = async (
 }
 
 /**
- * 获取异常记录详情
+ * 获取异常记录详情（按日期降序，数据库模式支持游标分页）
  * @param filePath 文件路径（可选，不提供则从数据库读取）
  * @param months 月份列表（数据库模式下使用）
+ * @param page 分页参数（不提供则返回全部）
  * @returns 异常记录列表
  */
 export const getAnomalies = async (
   filePath: string,
-  months?: string[]
+  months?: string[],
+  page?: CursorPageParams
 ): Promise<ApiResponse<{
   anomalies: any[]
   total_count: number
+  next_cursor: string | null
 }>> => {
   const params: Record<string, any> = {}
   if (filePath) {
@@ -581,10 +670,17 @@ export const getAnomalies = async (
   if (months && months.length > 0) {
     params.months = months.join(',')
   }
+  if (page?.limit) {
+    params.limit = page.limit
+  }
+  if (page?.cursor) {
+    params.cursor = page.cursor
+  }
 
   return apiClient.get<ApiResponse<{
     anomalies: any[]
     total_count: number
+    next_cursor: string | null
   }>>('/anomalies', { params })
 }
 
@@ -148,6 +148,12 @@ export interface ApiResponse<T = any> {
   data?: T
 }
 
+// ============ 游标分页 ============
+export interface CursorPageParams {
+  limit?: number            // 每页条数
+  cursor?: string | null    // 上一页返回的 next_cursor
+}
+
 // ============ 上传响应 ============
 export interface UploadRecord {
   file_path: string
@@ -0,0 +1,133 @@
+"""
+基准测试：大列表接口响应的序列化耗时与峰值内存
+
+对比三种输出方式：
+    baseline  AnalysisResult 校验 + jsonable_encoder + 标准库 json（原响应路径）
+    fast      app.utils.json_response.analysis_response（orjson，跳过 Pydantic 校验）
+    stream    app.utils.json_response.analysis_list_response（分批流式输出）
+
+使用方法:
+    cd backend
+    python ../scripts/bench_json_response.py --projects 3000 --persons 80
+"""
+import argparse
+import asyncio
+import gc
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# 添加 backend 目录到 Python 路径
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from app.models.schemas import AnalysisResult
+from app.utils import json_response
+
+
+def build_projects(project_count: int, person_count: int):
+    """构造与 /projects 接口结构一致的项目详情列表"""
+    rng = random.Random(42)
+    people = [f"员工{i:04d}" for i in range(max(person_count * 2, 1))]
+    projects = []
+    for i in range(project_count):
+        persons = rng.sample(people, person_count)
+        projects.append({
+            "code": f"0501{i:04d}",
+            "name": f"项目名称{i}",
+            "total_cost": round(rng.uniform(1000, 500000), 2),
+            "flight_cost": round(rng.uniform(0, 200000), 2),
+            "hotel_cost": round(rng.uniform(0, 200000), 2),
+            "train_cost": round(rng.uniform(0, 100000), 2),
+            "flight_count": rng.randint(0, 200),
+            "hotel_count": rng.randint(0, 200),
+            "train_count": rng.randint(0, 200),
+            "total_count": rng.randint(0, 600),
+            "over_standard_count": rng.randint(0, 50),
+            "person_count": len(persons),
+            "person_list": persons,
+            "department_list": [f"一级部门{j}" for j in range(rng.randint(1, 6))],
+            "date_range": {"start": "2025-01-01", "end": "2025-03-31"},
+        })
+    return projects
+
+
+def render_baseline(data):
+    result = AnalysisResult(success=True, message="获取项目详情成功", data=data)
+    return JSONResponse(jsonable_encoder(result)).body
+
+
+def render_fast(data):
+    return json_response.analysis_response("获取项目详情成功", data).body
+
+
+def render_stream(data):
+    response = json_response.analysis_list_response(
+        "获取项目详情成功", data, "projects", stream_threshold=0
+    )
+
+    async def consume():
+        size = 0
+        async for chunk in response.body_iterator:
+            size += len(chunk)
+        return size
+
+    return asyncio.run(consume())
+
+
+def measure(func, data, repeat: int):
+    """返回 (中位耗时 ms, 峰值内存 MB, 输出字节数)"""
+    timings = []
+    output = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        output = func(data)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    output = func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    size = output if isinstance(output, int) else len(output)
+    return statistics.median(timings), peak / 1024 / 1024, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大列表接口响应序列化基准测试")
+    parser.add_argument("--projects", type=int, default=3000, help="项目数量")
+    parser.add_argument("--persons", type=int, default=80, help="每个项目的人员数量")
+    parser.add_argument("--repeat", type=int, default=5, help="计时重复次数")
+    args = parser.parse_args()
+
+    projects = build_projects(args.projects, args.persons)
+    data = {"projects": projects, "total_count": len(projects)}
+
+    encoder = "orjson" if json_response.orjson is not None else "json（标准库回退）"
+    print(f"项目数: {args.projects}，每项目人员数: {args.persons}，编码器: {encoder}")
+    print("-" * 60)
+    print(f"{'方式':<10}{'耗时(ms)':>12}{'峰值内存(MB)':>16}{'输出(MB)':>12}")
+
+    results = {}
+    for name, func in [("baseline", render_baseline), ("fast", render_fast), ("stream", render_stream)]:
+        elapsed, peak, size = measure(func, data, args.repeat)
+        results[name] = (elapsed, peak)
+        print(f"{name:<10}{elapsed:>12.1f}{peak:>16.1f}{size / 1024 / 1024:>12.2f}")
+
+    print("-" * 60)
+    base_elapsed, base_peak = results["baseline"]
+    for name in ("fast", "stream"):
+        elapsed, peak = results[name]
+        print(f"{name}: 耗时 {base_elapsed / elapsed:.1f}x，峰值内存 {base_peak / max(peak, 1e-6):.1f}x（相对 baseline）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+基准测试：登录风暴期间的事件循环延迟
+
+同时发起 N 个密码校验（bcrypt），期间运行一个每 10ms 唤醒一次的探针协程，记录其
+实际唤醒延迟（即其他请求需要额外等待的时间）。对比两种方式:
+    inline    在事件循环中直接调用 verify_password（原 /login 行为）
+    executor  通过 execution.run_hash 在有界哈希线程池中执行
+
+使用方法:
+    cd backend
+    python ../scripts/bench_login.py --logins 20
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# 添加 backend 目录到 Python 路径
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from app.services.auth_service import get_password_hash, verify_password
+from app.services.executor import ExecutionLayer
+
+PROBE_INTERVAL = 0.01
+
+
+async def probe(stop: asyncio.Event, lags: list):
+    """按固定间隔休眠，记录超出预期的唤醒延迟（ms）"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append((loop.time() - start - PROBE_INTERVAL) * 1000)
+
+
+async def login_inline(password: str, password_hash: str) -> bool:
+    return verify_password(password, password_hash)
+
+
+def make_executor_login(execution: ExecutionLayer):
+    async def login_executor(password: str, password_hash: str) -> bool:
+        return await execution.run_hash(verify_password, password, password_hash)
+    return login_executor
+
+
+async def run_storm(login, logins: int, password: str, password_hash: str):
+    """返回 (总耗时 s, 探针延迟列表 ms)"""
+    stop = asyncio.Event()
+    lags: list = []
+    probe_task = asyncio.create_task(probe(stop, lags))
+    # 让探针先运行一轮
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login(password, password_hash) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await probe_task
+    assert all(results)
+    return elapsed, lags
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="登录风暴期间的事件循环延迟基准测试")
+    parser.add_argument("--logins", type=int, default=20, help="并发登录数")
+    parser.add_argument("--workers", type=int, default=2, help="哈希线程数")
+    args = parser.parse_args()
+
+    password = "bench-password"
+    password_hash = get_password_hash(password)
+    execution = ExecutionLayer(hash_workers=args.workers, hash_queue_limit=args.logins)
+
+    print(f"并发登录数: {args.logins}，哈希线程数: {args.workers}")
+    print("-" * 72)
+    print(f"{'方式':<10}{'总耗时(s)':>12}{'探针次数':>10}{'延迟p50(ms)':>14}{'p99(ms)':>12}{'max(ms)':>12}")
+    for name, login in [("inline", login_inline), ("executor", make_executor_login(execution))]:
+        elapsed, lags = asyncio.run(run_storm(login, args.logins, password, password_hash))
+        lags = lags or [0.0]
+        print(
+            f"{name:<10}{elapsed:>12.2f}{len(lags):>10}{statistics.median(lags):>14.1f}"
+            f"{percentile(lags, 99):>12.1f}{max(lags):>12.1f}"
+        )
+    execution.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+端到端基准测试
+
+按多个规模生成合成工作簿（见 generate_workbook.py），依次计时:
+    excel.*  ExcelProcessor.load_all_sheets 及各项分析方法（Excel 模式）
+    db.*     DatabaseParser.parse_and_insert 及数据库模式的各个 crud 查询
+
+结果写入 JSON 报告（每项记录首次耗时与多次运行的 min/median/max）。Excel 分析方法每次运行前
+清空处理器缓存（ExcelProcessor.reset_caches），计时包含数据清洗和预计算，不会测到缓存命中。
+指定 --baseline 时与之前的报告对比中位耗时，列出变慢超过阈值的项目。
+
+数据库使用临时目录中的独立 SQLite 文件，不影响本地数据。
+
+使用方法:
+    python scripts/bench_suite.py --scales small,medium --output bench_report.json
+    python scripts/bench_suite.py --scales small --baseline bench_report.json --fail-on-regression
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from generate_workbook import WorkbookSpec, generate_workbook
+
+# 添加 backend 目录到 Python 路径
+backend_dir = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+SCALES: Dict[str, WorkbookSpec] = {
+    "small": WorkbookSpec(employees=100, departments=6, projects=30, months=1, orders_per_month=200),
+    "medium": WorkbookSpec(employees=500, departments=12, projects=120, months=3, orders_per_month=1000),
+    "large": WorkbookSpec(employees=1500, departments=20, projects=300, months=6, orders_per_month=4000),
+}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(func: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    """
+    运行 repeat 次，返回首次耗时和统计值（ms）；被测代码的标准输出被丢弃
+
+    setup 在每次运行前调用（不计时），用于清空被测对象的缓存
+    """
+    timings = []
+    for _ in range(max(1, repeat)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "first_ms": round(timings[0], 2),
+        "min_ms": round(min(timings), 2),
+        "median_ms": round(statistics.median(timings), 2),
+        "max_ms": round(max(timings), 2),
+        "runs": len(timings),
+    }
+
+
+def bench_excel(file_path: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    """Excel 模式：加载 + 各项分析（每次运行前清空处理器缓存，原始 Sheet 只读取一次）"""
+    from app.services.excel_processor import ExcelProcessor, ANALYSIS_SHEETS
+
+    timings = {}
+
+    def load():
+        processor = ExcelProcessor(file_path)
+        processor.load_all_sheets(load_workbook_obj=False, required_sheets=ANALYSIS_SHEETS)
+        return processor
+
+    timings["excel.load_all_sheets"] = measure(load, repeat)
+    with contextlib.redirect_stdout(io.StringIO()):
+        processor = load()
+        projects, _ = processor.aggregate_project_costs()
+        hierarchy = processor.get_department_list(1, None)
+
+    project_code = projects[0]["project_code"] if projects else ""
+    level1 = hierarchy[0]["name"] if hierarchy else ""
+    level2_list = processor.get_department_list(2, level1) if level1 else []
+    level2 = level2_list[0]["name"] if level2_list else ""
+    level3_list = processor.get_department_list(3, level2) if level2 else []
+    level3 = level3_list[0]["name"] if level3_list else ""
+
+    analytics = {
+        "aggregate_project_costs": lambda: processor.aggregate_project_costs(),
+        "calculate_department_costs": lambda: processor.calculate_department_costs(),
+        "cross_check_attendance_travel": lambda: processor.cross_check_attendance_travel(),
+        "analyze_booking_behavior": lambda: processor.analyze_booking_behavior(),
+        "get_attendance_summary": lambda: processor.get_attendance_summary(),
+        "count_over_standard_orders": lambda: processor.count_over_standard_orders(),
+        "count_total_orders": lambda: processor.count_total_orders(),
+        "get_all_project_details": lambda: processor.get_all_project_details(),
+        "get_project_order_records": lambda: processor.get_project_order_records(project_code),
+        "get_department_hierarchy": lambda: processor.get_department_hierarchy(),
+        "get_department_list": lambda: processor.get_department_list(1, None),
+        "get_department_detail_metrics": lambda: processor.get_department_detail_metrics(level3, 3),
+        "get_level2_department_statistics": lambda: processor.get_level2_department_statistics(level2),
+        "get_level1_department_statistics": lambda: processor.get_level1_department_statistics(level1),
+    }
+    for name, func in analytics.items():
+        timings[f"excel.{name}"] = measure(func, repeat, setup=processor.reset_caches)
+    return timings
+
+
+def bench_db(file_path: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    """数据库模式：解析入库 + 各 crud 查询（每个规模使用清空后的数据库）"""
+    from app.db import crud
+    from app.db.database import SessionLocal, engine, init_db
+    from app.db.models import Base
+    from app.services.database_parser import DatabaseParser
+
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+
+    timings = {}
+    with SessionLocal() as db:
+        timings["db.parse_and_insert"] = measure(lambda: DatabaseParser(file_path).parse_and_insert(db), 1)
+
+        months = crud.get_available_months(db, file_path)
+        projects = crud.get_all_projects_from_db(db, months, limit=1)["projects"]
+        project_code = projects[0]["code"] if projects else ""
+        level1_list = crud.get_department_list_from_db(db, 1, None, months)
+        level1 = level1_list[0]["name"] if level1_list else ""
+        level2_list = crud.get_department_list_from_db(db, 2, level1, months) if level1 else []
+        level2 = level2_list[0]["name"] if level2_list else ""
+        level3_list = crud.get_department_list_from_db(db, 3, level2, months) if level2 else []
+        level3 = level3_list[0]["name"] if level3_list else ""
+
+        queries = {
+            "get_available_months": lambda: crud.get_available_months(db, file_path),
+            "get_dashboard_data": lambda: crud.get_dashboard_data(db, months=months),
+            "get_all_projects_from_db": lambda: crud.get_all_projects_from_db(db, months),
+            "get_all_projects_from_db.page50": lambda: crud.get_all_projects_from_db(db, months, limit=50),
+            "get_project_orders_from_db": lambda: crud.get_project_orders_from_db(db, project_code, months),
+            "get_anomalies_page": lambda: crud.get_anomalies_page(db, months, limit=200),
+            "get_department_list_from_db.level1": lambda: crud.get_department_list_from_db(db, 1, None, months),
+            "get_department_list_from_db.level2": lambda: crud.get_department_list_from_db(db, 2, level1, months),
+            "get_department_list_from_db.level3": lambda: crud.get_department_list_from_db(db, 3, level2, months),
+            "get_department_details_from_db": lambda: crud.get_department_details_from_db(db, level3, 3, months),
+            "get_level1_department_statistics_from_db": lambda: crud.get_level1_department_statistics_from_db(db, level1, months),
+            "get_level2_department_statistics_from_db": lambda: crud.get_level2_department_statistics_from_db(db, level2, months),
+        }
+        for name, func in queries.items():
+            timings[f"db.{name}"] = measure(func, repeat)
+    return timings
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """对比中位耗时，返回变慢超过 threshold（比例）的项目说明"""
+    regressions = []
+    baseline_scales = {scale["name"]: scale for scale in baseline.get("scales", [])}
+    for scale in report["scales"]:
+        previous = baseline_scales.get(scale["name"])
+        if previous is None:
+            continue
+        for name, current in scale["timings"].items():
+            before = previous["timings"].get(name)
+            if not before or before["median_ms"] <= 0:
+                continue
+            ratio = current["median_ms"] / before["median_ms"]
+            if ratio > 1 + threshold:
+                regressions.append(
+                    f"[{scale['name']}] {name}: {before['median_ms']:.1f}ms -> {current['median_ms']:.1f}ms ({ratio:.2f}x)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Excel 模式与数据库模式热点路径基准测试")
+    parser.add_argument("--scales", default="small,medium", help=f"规模列表，逗号分隔（可选: {', '.join(SCALES)}）")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数（解析入库固定 1 次）")
+    parser.add_argument("--output", default="bench_report.json", help="JSON 报告输出路径")
+    parser.add_argument("--baseline", help="用于对比的历史报告")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定变慢的比例阈值（默认 0.2 即 20%%）")
+    parser.add_argument("--fail-on-regression", action="store_true", help="存在变慢项目时以非零状态退出")
+    parser.add_argument("--skip-db", action="store_true", help="只测 Excel 模式")
+    args = parser.parse_args()
+
+    scale_names = [name.strip() for name in args.scales.split(",") if name.strip()]
+    unknown = [name for name in scale_names if name not in SCALES]
+    if unknown:
+        parser.error(f"未知规模: {', '.join(unknown)}")
+
+    work_dir = Path(tempfile.mkdtemp(prefix="costmatrix-bench-"))
+    # 数据库路径由上传目录推导，需在导入 app 模块前设置
+    os.environ["UPLOAD_DIR"] = str(work_dir / "uploads")
+    (work_dir / "uploads").mkdir()
+    logging.disable(logging.INFO)
+
+    report: Dict[str, Any] = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "scales": [],
+    }
+
+    for name in scale_names:
+        spec = SCALES[name]
+        file_path = str(work_dir / "uploads" / f"bench_{name}.xlsx")
+        print(f"[{name}] 生成工作簿: {asdict(spec)}")
+        start = time.perf_counter()
+        rows = generate_workbook(file_path, spec)
+        print(f"[{name}] 生成完成 {time.perf_counter() - start:.1f}s，行数: {rows}")
+
+        timings = bench_excel(file_path, args.repeat)
+        if not args.skip_db:
+            timings.update(bench_db(file_path, args.repeat))
+
+        report["scales"].append({
+            "name": name,
+            "spec": asdict(spec),
+            "rows": rows,
+            "workbook_bytes": os.path.getsize(file_path),
+            "timings": timings,
+        })
+        for key, value in timings.items():
+            print(f"[{name}] {key:<55}{value['median_ms']:>12.1f} ms")
+
+    Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"报告已写入: {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"以下项目中位耗时变慢超过 {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            if args.fail_on_regression:
+                sys.exit(1)
+        else:
+            print("与基线相比无明显变慢")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+合成测试工作簿生成器
+
+生成与真实考勤/差旅导出结构一致的 Excel（状态明细 / 机票 / 酒店 / 火车票 / 透视），
+用于基准测试和本地调试。规模由员工数、部门数、项目数、月份数和每月订单量控制，
+相同参数和随机种子生成相同内容；使用 openpyxl 只写模式逐行写出，内存占用与规模无关。
+
+数据特征：
+    - 周末状态为"公休日"（少量"公休日上班"），工作日以"上班"为主，含出差、请假
+    - 差旅订单优先落在员工"出差"的日期上，少量落在"上班"日期（产生交叉验证异常）
+    - 含退票/改签（负订单量、负金额）、超标订单、无项目订单
+
+使用方法:
+    python scripts/generate_workbook.py /tmp/sample.xlsx --employees 800 --months 3 --orders-per-month 1000
+"""
+import argparse
+import calendar
+import random
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from openpyxl import Workbook
+
+ATTENDANCE_COLUMNS = [
+    "日期", "姓名", "姓名计算值", "一级部门", "二级部门", "三级部门", "当日状态判断", "备注",
+    "最早打卡时间", "最晚打卡时间", "工时", "最晚19:30之后", "钉钉休假与差旅",
+    "当日机票预定记录", "当日火车票预定记录", "酒店记录", "当日滴滴打车记录",
+]
+FLIGHT_COLUMNS = [
+    "预订人姓名", "订单号", "原订单号", "原始订单号", "订单状态", "差旅人员姓名", "姓名计算", "一级部门",
+    "二级部门", "乘机人状态", "订单量", "是否超标", "起飞日期", "出发时间", "超标类型", "超标原因",
+    "退改类型", "退改原因", "提前预定天数", "起飞时间", "到达时间", "航班类型", "航段状态", "授信金额",
+    "折扣", "行程", "项目",
+]
+HOTEL_COLUMNS = [
+    "预订人姓名", "订单号", "原订单号", "原始订单号", "订单状态", "差旅人员姓名", "一级部门", "二级部门",
+    "差旅人部门", "订单量", "是否超标", "超标项", "超标选项", "超标原因", "提前预定天数", "入住日期",
+    "离店日期", "间夜数", "城市名称", "酒店名称", "房间数", "授信金额", "行程", "项目",
+]
+TRAIN_COLUMNS = [
+    "预订人姓名", "订单号", "原订单号", "原始订单号", "订单状态", "差旅人员姓名", "姓名计算", "一级部门",
+    "二级部门", "差旅人部门", "订单量", "是否超标", "提前预定天数", "出发日期", "到达日期", "出发时间",
+    "到达时间", "授信金额", "行程", "项目",
+]
+
+CITIES = ["北京", "上海", "西安", "成都", "深圳", "南通", "长沙", "武汉", "杭州", "酒泉"]
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾萧田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈"
+GIVEN_CHARS = "伟芳娜敏静丽强磊军洋勇艳杰涛明超秀霞平刚桂英华鸣荣萌怡杨岩鹏国道晨宇航星辰海峰"
+WORKDAY_STATUSES = [("上班", 70), ("出差", 18), ("请假", 5), ("未知", 7)]
+
+
+@dataclass
+class WorkbookSpec:
+    """工作簿规模参数"""
+    employees: int = 200
+    departments: int = 8
+    projects: int = 60
+    months: int = 1
+    start_month: str = "2025-01"
+    orders_per_month: int = 500
+    seed: int = 42
+
+
+@dataclass
+class _Employee:
+    name: str
+    level1: str
+    level2: str
+    level3: str
+
+
+def _month_days(start_month: str, months: int) -> List[date]:
+    year, month = (int(part) for part in start_month.split("-"))
+    days = []
+    for _ in range(months):
+        _, last_day = calendar.monthrange(year, month)
+        days.extend(date(year, month, day) for day in range(1, last_day + 1))
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return days
+
+
+def _weighted(rng: random.Random, choices: Sequence[Tuple[str, int]]) -> str:
+    return rng.choices([value for value, _ in choices], weights=[weight for _, weight in choices])[0]
+
+
+def _build_employees(spec: WorkbookSpec, rng: random.Random) -> List[_Employee]:
+    level1_names = [f"部门{i + 1:02d}" for i in range(max(1, spec.departments))]
+    employees = []
+    used = set()
+    for index in range(spec.employees):
+        name = rng.choice(SURNAMES) + "".join(rng.choice(GIVEN_CHARS) for _ in range(rng.randint(1, 2)))
+        if name in used:
+            name = f"{name}{index}"
+        used.add(name)
+        level1 = rng.choice(level1_names)
+        level2 = f"{level1}-{rng.randint(1, 4)}组"
+        level3 = f"{level2}-{rng.randint(1, 3)}室"
+        employees.append(_Employee(name, level1, level2, level3))
+    return employees
+
+
+def _build_projects(spec: WorkbookSpec) -> List[str]:
+    projects = [f"0501{i:04d} 市场-整星-项目{i}-西安科技" for i in range(max(1, spec.projects))]
+    projects.append("00000 公司公共")
+    return projects
+
+
+def _attendance_rows(
+    spec: WorkbookSpec,
+    employees: List[_Employee],
+    days: List[date],
+    rng: random.Random,
+    trip_days: Dict[str, List[date]],
+    work_days: Dict[str, List[date]],
+) -> Iterator[list]:
+    for employee in employees:
+        for day in days:
+            weekend = day.weekday() >= 5
+            if weekend:
+                status = "公休日上班" if rng.random() < 0.08 else "公休日"
+            else:
+                status = _weighted(rng, WORKDAY_STATUSES)
+
+            if status == "出差":
+                trip_days.setdefault(employee.name, []).append(day)
+            elif status == "上班":
+                work_days.setdefault(employee.name, []).append(day)
+
+            day_text = day.strftime("%Y/%m/%d")
+            if status in ("上班", "公休日上班"):
+                first = f"{rng.randint(8, 10):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+                last = f"{rng.randint(17, 22):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+                hours = round(rng.uniform(6, 12), 1)
+            else:
+                first = last = None
+                hours = 0.0
+            yield [
+                day_text, employee.name, f"{employee.name} {day_text}", employee.level1, employee.level2,
+                employee.level3, status, None, first, last, hours,
+                "符合" if last and last >= "19:30" else None,
+                {"出差": "出差", "请假": "请假"}.get(status),
+                None, None, None, None,
+            ]
+
+
+def _order_people(
+    employees: List[_Employee],
+    days: List[date],
+    rng: random.Random,
+    trip_days: Dict[str, List[date]],
+    work_days: Dict[str, List[date]],
+) -> Tuple[_Employee, date]:
+    """挑选订单的员工和日期：大多落在出差日，约 5% 落在上班日"""
+    employee = rng.choice(employees)
+    if rng.random() < 0.05 and work_days.get(employee.name):
+        return employee, rng.choice(work_days[employee.name])
+    if trip_days.get(employee.name):
+        return employee, rng.choice(trip_days[employee.name])
+    return employee, rng.choice(days)
+
+
+def _refund_fields(rng: random.Random) -> Tuple[str, int, float]:
+    """(订单状态, 订单量, 金额符号)"""
+    roll = rng.random()
+    if roll < 0.06:
+        return "退票成功", -1, -1.0
+    if roll < 0.10:
+        return "改签成功", 0, 1.0
+    return "已出票", 1, 1.0
+
+
+def _flight_rows(spec, employees, days, rng, projects, trip_days, work_days) -> Iterator[list]:
+    for index in range(spec.orders_per_month * spec.months):
+        employee, day = _order_people(employees, days, rng, trip_days, work_days)
+        status, quantity, sign = _refund_fields(rng)
+        over = rng.random() < 0.12
+        departure = datetime(day.year, day.month, day.day, rng.randint(6, 22), rng.choice([0, 15, 30, 45]))
+        arrival = departure + timedelta(minutes=rng.randint(60, 240))
+        order_no = f"DF{day:%y%m%d}{index:010d}"
+        yield [
+            employee.name, order_no, None, order_no, status, employee.name, f"{employee.name} {day:%Y/%m/%d}",
+            employee.level1, employee.level2, status, quantity, "是" if over else "否", day.strftime("%Y/%m/%d"),
+            departure.strftime("%H:%M"), rng.choice(["超折扣", "超时间", "超折扣,超时间"]) if over else None,
+            "工作安排" if over else None, "自愿退票" if quantity < 0 else None, "自愿退票" if quantity < 0 else None,
+            rng.randint(0, 10), departure.strftime("%Y-%m-%d %H:%M:%S"), arrival.strftime("%Y-%m-%d %H:%M:%S"),
+            "国内", status, round(sign * rng.uniform(300, 3000), 2), round(rng.uniform(3, 10), 1),
+            "-".join(rng.sample(CITIES, 2)), rng.choice(projects) if rng.random() > 0.03 else None,
+        ]
+
+
+def _hotel_rows(spec, employees, days, rng, projects, trip_days, work_days) -> Iterator[list]:
+    for index in range(spec.orders_per_month * spec.months):
+        employee, day = _order_people(employees, days, rng, trip_days, work_days)
+        refunded = rng.random() < 0.05
+        nights = rng.randint(1, 4)
+        over = rng.random() < 0.10
+        city = rng.choice(CITIES)
+        hotel = f"{city}商务酒店{rng.randint(1, 40)}店"
+        order_no = f"HO{day:%Y%m%d}{index:010d}"
+        yield [
+            employee.name, order_no, None, order_no, "已退款" if refunded else "已离店", employee.name,
+            employee.level1, employee.level2, employee.level3, -nights if refunded else nights,
+            "是" if over else "否", "房价超出入住标准" if over else None, None, "价格最低" if over else None,
+            rng.randint(0, 7), day.strftime("%Y-%m-%d"), (day + timedelta(days=nights)).strftime("%Y-%m-%d"),
+            -nights if refunded else nights, city, hotel, 1,
+            round((-1 if refunded else 1) * nights * rng.uniform(200, 600), 2), hotel,
+            rng.choice(projects) if rng.random() > 0.03 else None,
+        ]
+
+
+def _train_rows(spec, employees, days, rng, projects, trip_days, work_days) -> Iterator[list]:
+    for index in range(spec.orders_per_month * spec.months):
+        employee, day = _order_people(employees, days, rng, trip_days, work_days)
+        status, quantity, sign = _refund_fields(rng)
+        departure = f"{rng.randint(6, 22):02d}:{rng.choice(['00', '30'])}"
+        order_no = f"DT{day:%y%m%d}{index:010d}"
+        yield [
+            employee.name, order_no, None, order_no, status, employee.name, f"{employee.name} {day:%Y/%m/%d}",
+            employee.level1, employee.level2, employee.level3, quantity, "否", rng.randint(0, 6),
+            day.strftime("%Y-%m-%d"), day.strftime("%Y-%m-%d"), departure, f"{rng.randint(7, 23):02d}:00",
+            round(sign * rng.uniform(20, 900), 2), "-".join(rng.sample(CITIES, 2)),
+            rng.choice(projects) if rng.random() > 0.03 else None,
+        ]
+
+
+def generate_workbook(path: str, spec: WorkbookSpec) -> Dict[str, int]:
+    """
+    生成工作簿，返回各 Sheet 的数据行数
+
+    Args:
+        path: 输出文件路径（.xlsx）
+        spec: 规模参数
+    """
+    rng = random.Random(spec.seed)
+    days = _month_days(spec.start_month, spec.months)
+    employees = _build_employees(spec, rng)
+    projects = _build_projects(spec)
+    trip_days: Dict[str, List[date]] = {}
+    work_days: Dict[str, List[date]] = {}
+
+    workbook = Workbook(write_only=True)
+    counts = {}
+    sheets = [
+        ("状态明细", ATTENDANCE_COLUMNS, _attendance_rows(spec, employees, days, rng, trip_days, work_days)),
+        ("机票", FLIGHT_COLUMNS, None),
+        ("酒店", HOTEL_COLUMNS, None),
+        ("火车票", TRAIN_COLUMNS, None),
+    ]
+    travel_generators = {"机票": _flight_rows, "酒店": _hotel_rows, "火车票": _train_rows}
+
+    for sheet_name, columns, rows in sheets:
+        # 差旅订单依赖考勤生成的出差日期，考勤 Sheet 写完后再创建
+        if rows is None:
+            rows = travel_generators[sheet_name](spec, employees, days, rng, projects, trip_days, work_days)
+        worksheet = workbook.create_sheet(sheet_name)
+        worksheet.append(columns)
+        count = 0
+        for row in rows:
+            worksheet.append(row)
+            count += 1
+        counts[sheet_name] = count
+
+    pivot = workbook.create_sheet("透视")
+    pivot.append(["一级部门", "人数"])
+    for level1 in sorted({employee.level1 for employee in employees}):
+        pivot.append([level1, sum(1 for employee in employees if employee.level1 == level1)])
+
+    workbook.save(path)
+    return counts
+
+
+def main():
+    defaults = WorkbookSpec()
+    parser = argparse.ArgumentParser(description="生成合成考勤/差旅工作簿")
+    parser.add_argument("output", help="输出文件路径（.xlsx）")
+    parser.add_argument("--employees", type=int, default=defaults.employees, help="员工数")
+    parser.add_argument("--departments", type=int, default=defaults.departments, help="一级部门数")
+    parser.add_argument("--projects", type=int, default=defaults.projects, help="项目数")
+    parser.add_argument("--months", type=int, default=defaults.months, help="月份数")
+    parser.add_argument("--start-month", default=defaults.start_month, help="起始月份（YYYY-MM）")
+    parser.add_argument("--orders-per-month", type=int, default=defaults.orders_per_month, help="每类差旅每月订单数")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="随机种子")
+    args = parser.parse_args()
+
+    spec = WorkbookSpec(
+        employees=args.employees,
+        departments=args.departments,
+        projects=args.projects,
+        months=args.months,
+        start_month=args.start_month,
+        orders_per_month=args.orders_per_month,
+        seed=args.seed,
+    )
+    counts = generate_workbook(args.output, spec)
+    print(f"已生成: {args.output}")
+    print(f"参数: {asdict(spec)}")
+    for sheet_name, count in counts.items():
+        print(f"  {sheet_name}: {count} 行")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,503 @@
+"""
+HTTP 负载测试
+
+按场景文件模拟多组并发用户（看板浏览、部门下钻、登录、上传并轮询进度），统计各接口的
+吞吐量和 p50/p95/p99 延迟，用于评估单个后端实例在数据入库期间能支撑的并发看板用户数。
+
+默认在临时目录中启动一个独立的后端实例（uvicorn 子进程）：生成合成工作簿（见
+generate_workbook.py）并通过 /api/upload 解析入库作为初始数据，测试结束后关闭。
+指定 --base-url 时直接压测已运行的实例（需提供账号，且已有数据）。
+客户端只使用标准库（asyncio 上的 HTTP/1.1 keep-alive 连接，每个虚拟用户一个连接），不依赖外部服务。
+
+场景文件（JSON，示例见 load_scenarios/dashboard_during_upload.json）:
+    duration / ramp_up     压测时长与用户逐步启动的时长（秒）
+    seed_workbook          初始数据的工作簿规模（WorkbookSpec 字段）
+    upload_workbook        上传步骤使用的工作簿规模
+    users                  用户组列表：name、count、think_time [最小, 最大]、etag、steps
+每个虚拟用户先登录，然后循环执行本组 steps，步骤之间随机等待 think_time。步骤类型:
+    {"name", "method", "path", "query"}   普通请求，path/query 中可使用占位符 {months}（全部月份，
+                                          逗号分隔）、{month}、{level1}、{level2}、{project}（随机取值）
+    {"name", "login": true}               重新登录（bcrypt 校验）
+    {"name", "upload": true, "poll_interval"}  上传工作簿并轮询 /api/progress 直到解析结束，
+                                          解析总耗时记为 "<name>.ingest"，轮询记为 "progress"
+用户组设置 "etag": true 时按浏览器行为缓存 ETag，后续请求带 If-None-Match（304 视为成功）。
+
+使用方法:
+    python scripts/load_test.py scripts/load_scenarios/dashboard_during_upload.json
+    python scripts/load_test.py scenario.json --duration 30 --app-env EXCEL_EXECUTOR=thread --output load_report.json
+    python scripts/load_test.py scenario.json --base-url http://127.0.0.1:8000 --username admin --password admin123
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlencode, urlsplit
+
+from generate_workbook import WorkbookSpec, generate_workbook
+
+backend_dir = Path(__file__).parent.parent / "backend"
+
+DEFAULT_PASSWORD = "load-test-password"
+# 读取响应超时（秒）；超时记为状态 0
+REQUEST_TIMEOUT = 120.0
+# 等待服务启动、初始数据入库的超时（秒）
+STARTUP_TIMEOUT = 60.0
+INGEST_TIMEOUT = 600.0
+PERCENTILES = (50, 95, 99)
+
+
+class HTTPError(Exception):
+    """初始化阶段的请求失败"""
+
+
+@dataclass
+class Response:
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class HTTPClient:
+    """单连接 HTTP/1.1 客户端（keep-alive，连接断开后自动重连）"""
+
+    def __init__(self, host: str, port: int, timeout: float = REQUEST_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+        self._reader = self._writer = None
+
+    async def request(
+        self, method: str, target: str, headers: Optional[Dict[str, str]] = None, body: bytes = b""
+    ) -> Response:
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(body)}"]
+        lines.extend(f"{key}: {value}" for key, value in (headers or {}).items())
+        payload = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+        for attempt in range(2):
+            reused = self._writer is not None
+            if not reused:
+                self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                self._writer.write(payload)
+                await self._writer.drain()
+                response = await asyncio.wait_for(self._read_response(), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                # 复用的空闲连接可能已被服务端关闭，重试一次
+                if reused and attempt == 0:
+                    continue
+                raise
+            except asyncio.TimeoutError:
+                await self.close()
+                raise
+            if response.headers.get("connection", "").lower() == "close":
+                await self.close()
+            return response
+        raise ConnectionError("连接失败")
+
+    async def _read_response(self) -> Response:
+        status_line = await self._reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        headers: Dict[str, str] = {}
+        while True:
+            line = await self._reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    # 跳过 trailer
+                    while await self._reader.readuntil(b"\r\n") != b"\r\n":
+                        pass
+                    break
+                chunks.append(await self._reader.readexactly(size))
+                await self._reader.readexactly(2)
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await self._reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await self._reader.read()
+            headers["connection"] = "close"
+        return Response(status, headers, body)
+
+
+def encode_multipart(field_name: str, file_name: str, content: bytes) -> Tuple[bytes, str]:
+    """构建 multipart/form-data 请求体，返回 (请求体, Content-Type)"""
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field_name}"; filename="{file_name}"\r\n'
+        "Content-Type: application/vnd.openxmlformats-officedocument.spreadsheetml.sheet\r\n\r\n"
+    ).encode("utf-8")
+    return head + content + f"\r\n--{boundary}--\r\n".encode("ascii"), f"multipart/form-data; boundary={boundary}"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+@dataclass
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)
+    statuses: Dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+
+    def add(self, elapsed_ms: float, status: int) -> None:
+        self.latencies.append(elapsed_ms)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not 200 <= status < 400:
+            self.errors += 1
+
+    def summary(self, duration: float) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "rps": round(len(self.latencies) / duration, 2) if duration > 0 else 0.0,
+            "statuses": {str(code): count for code, count in sorted(self.statuses.items())},
+        }
+        if self.latencies:
+            for pct in PERCENTILES:
+                result[f"p{pct}_ms"] = round(percentile(self.latencies, pct), 1)
+            result["max_ms"] = round(max(self.latencies), 1)
+        return result
+
+
+class LoadTest:
+    """按场景运行虚拟用户并汇总统计"""
+
+    def __init__(self, scenario: Dict[str, Any], host: str, port: int, username: str, password: str, upload_file: Optional[Path]):
+        self.scenario = scenario
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.upload_content = upload_file.read_bytes() if upload_file is not None else None
+        self.stats: Dict[str, EndpointStats] = {}
+        self.values: Dict[str, List[str]] = {}
+        self.months = ""
+
+    def _record(self, name: str, elapsed_ms: float, status: int) -> None:
+        self.stats.setdefault(name, EndpointStats()).add(elapsed_ms, status)
+
+    async def _timed(self, client: HTTPClient, name: str, method: str, target: str, headers: Dict[str, str], body: bytes = b"") -> Optional[Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, target, headers, body)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            self._record(name, (time.perf_counter() - start) * 1000, 0)
+            return None
+        self._record(name, (time.perf_counter() - start) * 1000, response.status)
+        return response
+
+    async def login(self, client: HTTPClient, name: str = "login") -> Optional[str]:
+        body = json.dumps({"username": self.username, "password": self.password}).encode("utf-8")
+        response = await self._timed(client, name, "POST", "/api/login", {"Content-Type": "application/json"}, body)
+        if response is None or response.status != 200:
+            return None
+        return response.json()["access_token"]
+
+    async def load_values(self) -> None:
+        """读取月份、部门、项目，用于填充请求中的占位符"""
+        client = HTTPClient(self.host, self.port)
+        try:
+            token = await self.login(client, "setup.login")
+            if token is None:
+                raise HTTPError("登录失败，请检查账号密码")
+            headers = {"Authorization": f"Bearer {token}"}
+
+            async def get(target: str) -> Any:
+                response = await client.request("GET", target, headers)
+                if response.status != 200:
+                    raise HTTPError(f"GET {target} -> {response.status}")
+                return response.json()["data"]
+
+            months = await get("/api/months")
+            if not months:
+                raise HTTPError("数据库中没有数据")
+            self.months = ",".join(months)
+            level1 = [item["name"] for item in (await get(f"/api/departments/list?{urlencode({'level': 1, 'months': self.months})}"))["departments"]]
+            level2: List[str] = []
+            for name in level1[:5]:
+                query = urlencode({"level": 2, "parent": name, "months": self.months})
+                level2.extend(item["name"] for item in (await get(f"/api/departments/list?{query}"))["departments"])
+            projects = [item["code"] for item in (await get(f"/api/projects?{urlencode({'months': self.months, 'limit': 50})}"))["projects"]]
+            self.values = {"month": months, "level1": level1, "level2": level2, "project": projects}
+        finally:
+            await client.close()
+        self.stats.clear()
+
+    def _fill(self, template: str, rng: random.Random, quote_value: bool) -> str:
+        if "{" not in template:
+            return template
+        replacements = {"months": self.months}
+        for key, choices in self.values.items():
+            if "{" + key + "}" in template:
+                replacements[key] = rng.choice(choices) if choices else ""
+        if quote_value:
+            replacements = {key: quote(value, safe="") for key, value in replacements.items()}
+        return template.format(**replacements)
+
+    async def _upload(self, client: HTTPClient, step: Dict[str, Any], headers: Dict[str, str], deadline: float) -> None:
+        name = step.get("name", "upload")
+        body, content_type = encode_multipart("file", f"load_{uuid.uuid4().hex[:8]}.xlsx", self.upload_content)
+        start = time.perf_counter()
+        response = await self._timed(client, name, "POST", "/api/upload", {**headers, "Content-Type": content_type}, body)
+        if response is None or response.status != 200:
+            return
+        task_id = response.json()["data"]["task_id"]
+        interval = step.get("poll_interval", 1.0)
+        # 解析结束前持续轮询（压测时间结束后也等待本次解析完成，避免留下半途的任务）
+        while time.monotonic() < deadline + INGEST_TIMEOUT:
+            await asyncio.sleep(interval)
+            response = await self._timed(client, "progress", "GET", f"/api/progress/{task_id}", headers)
+            if response is None or response.status != 200:
+                continue
+            status = response.json()["data"]["status"]
+            if status in ("completed", "failed"):
+                self._record(f"{name}.ingest", (time.perf_counter() - start) * 1000, 200 if status == "completed" else 500)
+                return
+
+    async def run_user(self, group: Dict[str, Any], delay: float, deadline: float, seed: int) -> None:
+        rng = random.Random(seed)
+        think_min, think_max = group.get("think_time", [1.0, 1.0])
+        use_etag = group.get("etag", False)
+        etags: Dict[str, str] = {}
+        await asyncio.sleep(delay)
+        client = HTTPClient(self.host, self.port)
+        try:
+            token = await self.login(client)
+            while time.monotonic() < deadline:
+                for step in group["steps"]:
+                    if time.monotonic() >= deadline:
+                        break
+                    headers = {"Authorization": f"Bearer {token}"} if token else {}
+                    if step.get("login"):
+                        token = await self.login(client, step.get("name", "login")) or token
+                    elif step.get("upload"):
+                        await self._upload(client, step, headers, deadline)
+                    else:
+                        target = self._fill(step["path"], rng, quote_value=True)
+                        query = {key: self._fill(str(value), rng, quote_value=False) for key, value in step.get("query", {}).items()}
+                        if query:
+                            target += "?" + urlencode(query)
+                        if use_etag and target in etags:
+                            headers["If-None-Match"] = etags[target]
+                        response = await self._timed(client, step["name"], step.get("method", "GET"), target, headers)
+                        if use_etag and response is not None and "etag" in response.headers:
+                            etags[target] = response.headers["etag"]
+                    await asyncio.sleep(rng.uniform(think_min, think_max))
+        finally:
+            await client.close()
+
+    async def run(self, duration: float) -> float:
+        """运行所有虚拟用户，返回实际压测时长（秒）"""
+        ramp_up = self.scenario.get("ramp_up", 0)
+        users = [(group, index) for group in self.scenario["users"] for index in range(group.get("count", 1))]
+        start = time.monotonic()
+        deadline = start + duration
+        await asyncio.gather(*(
+            self.run_user(group, ramp_up * position / max(1, len(users)), deadline, seed=position)
+            for position, (group, _) in enumerate(users)
+        ))
+        return time.monotonic() - start
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_healthy(port: int, process: subprocess.Popen) -> None:
+    async def check() -> bool:
+        client = HTTPClient("127.0.0.1", port, timeout=5)
+        try:
+            return (await client.request("GET", "/api/health")).status == 200
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return False
+        finally:
+            await client.close()
+
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"后端进程已退出（返回码 {process.returncode}）")
+        if asyncio.run(check()):
+            return
+        time.sleep(0.5)
+    raise RuntimeError("等待后端启动超时")
+
+
+async def _seed(port: int, username: str, password: str, workbook: Path) -> None:
+    """上传初始工作簿并等待解析入库完成"""
+    client = HTTPClient("127.0.0.1", port, timeout=INGEST_TIMEOUT)
+    try:
+        body = json.dumps({"username": username, "password": password}).encode("utf-8")
+        response = await client.request("POST", "/api/login", {"Content-Type": "application/json"}, body)
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        body, content_type = encode_multipart("file", workbook.name, workbook.read_bytes())
+        response = await client.request("POST", "/api/upload", {**headers, "Content-Type": content_type}, body)
+        if response.status != 200:
+            raise HTTPError(f"初始数据上传失败: {response.status} {response.body[:200]!r}")
+        task_id = response.json()["data"]["task_id"]
+        deadline = time.monotonic() + INGEST_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(1)
+            progress = (await client.request("GET", f"/api/progress/{task_id}", headers)).json()["data"]
+            if progress["status"] == "completed":
+                return
+            if progress["status"] == "failed":
+                raise HTTPError(f"初始数据解析失败: {progress.get('error')}")
+        raise HTTPError("等待初始数据入库超时")
+    finally:
+        await client.close()
+
+
+def start_backend(work_dir: Path, password: str, app_env: Dict[str, str], port: int) -> subprocess.Popen:
+    """在独立目录中启动后端（数据库位于 work_dir/data）"""
+    password_file = work_dir / "admin_password.txt"
+    password_file.write_text(password, encoding="utf-8")
+    env = {
+        **os.environ,
+        "UPLOAD_DIR": str(work_dir / "uploads"),
+        "INITIAL_ADMIN_PASSWORD_FILE": str(password_file),
+        "DEBUG": "false",
+        **app_env,
+    }
+    log_file = open(work_dir / "backend.log", "wb")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=backend_dir, env=env, stdout=log_file, stderr=subprocess.STDOUT
+    )
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print("-" * 104)
+    print(f"{'接口':<36}{'请求数':>8}{'错误':>6}{'rps':>9}{'p50(ms)':>11}{'p95(ms)':>11}{'p99(ms)':>11}{'max(ms)':>11}")
+    for name, item in report["endpoints"].items():
+        if not item["requests"]:
+            continue
+        print(
+            f"{name:<36}{item['requests']:>8}{item['errors']:>6}{item['rps']:>9.2f}"
+            f"{item['p50_ms']:>11.1f}{item['p95_ms']:>11.1f}{item['p99_ms']:>11.1f}{item['max_ms']:>11.1f}"
+        )
+    total = report["total"]
+    print("-" * 104)
+    print(f"合计: {total['requests']} 请求，{total['errors']} 错误，{total['rps']:.2f} req/s，时长 {report['duration_s']:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按场景文件对后端进行 HTTP 负载测试")
+    parser.add_argument("scenario", help="场景文件（JSON）")
+    parser.add_argument("--duration", type=float, help="压测时长（秒），覆盖场景文件中的 duration")
+    parser.add_argument("--base-url", help="压测已运行的实例（例如 http://127.0.0.1:8000），不启动本地后端")
+    parser.add_argument("--username", default="admin", help="登录用户名")
+    parser.add_argument("--password", help="登录密码（本地启动的后端使用自动生成的初始密码）")
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE", help="本地后端的环境变量（可重复）")
+    parser.add_argument("--output", help="JSON 报告输出路径")
+    parser.add_argument("--keep", action="store_true", help="保留临时目录（数据库、日志）")
+    args = parser.parse_args()
+
+    scenario = json.loads(Path(args.scenario).read_text(encoding="utf-8"))
+    duration = args.duration or scenario.get("duration", 60)
+    app_env = dict(item.split("=", 1) for item in args.app_env)
+    work_dir = Path(tempfile.mkdtemp(prefix="costmatrix-load-"))
+    (work_dir / "uploads").mkdir()
+
+    upload_file = None
+    if any(step.get("upload") for group in scenario["users"] for step in group["steps"]):
+        upload_file = work_dir / "upload.xlsx"
+        generate_workbook(str(upload_file), WorkbookSpec(**scenario.get("upload_workbook", {})))
+
+    process = None
+    try:
+        if args.base_url:
+            url = urlsplit(args.base_url)
+            host, port = url.hostname, url.port or 80
+            password = args.password
+            if password is None:
+                parser.error("使用 --base-url 时需要提供 --password")
+        else:
+            host, port = "127.0.0.1", _free_port()
+            password = args.password or DEFAULT_PASSWORD
+            seed_file = work_dir / "seed.xlsx"
+            print(f"生成初始工作簿: {scenario.get('seed_workbook', {})}")
+            generate_workbook(str(seed_file), WorkbookSpec(**scenario.get("seed_workbook", {})))
+            process = start_backend(work_dir, password, app_env, port)
+            _wait_until_healthy(port, process)
+            start = time.perf_counter()
+            asyncio.run(_seed(port, args.username, password, seed_file))
+            print(f"初始数据入库完成，用时 {time.perf_counter() - start:.1f}s（后端日志: {work_dir / 'backend.log'}）")
+
+        load_test = LoadTest(scenario, host, port, args.username, password, upload_file)
+        asyncio.run(load_test.load_values())
+        user_count = sum(group.get("count", 1) for group in scenario["users"])
+        print(f"场景: {scenario.get('name', args.scenario)}，虚拟用户: {user_count}，时长: {duration:.0f}s")
+        elapsed = asyncio.run(load_test.run(duration))
+
+        endpoints = {name: stats.summary(elapsed) for name, stats in sorted(load_test.stats.items())}
+        all_requests = sum(item["requests"] for item in endpoints.values())
+        report = {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "scenario": scenario.get("name", args.scenario),
+            "users": user_count,
+            "duration_s": round(elapsed, 2),
+            "app_env": app_env,
+            "endpoints": endpoints,
+            "total": {
+                "requests": all_requests,
+                "errors": sum(item["errors"] for item in endpoints.values()),
+                "rps": round(all_requests / elapsed, 2) if elapsed > 0 else 0.0,
+            },
+        }
+        print_report(report)
+        if args.output:
+            Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+            print(f"报告已写入: {args.output}")
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if args.keep:
+            print(f"临时目录: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+启动耗时分析
+
+用 `python -X importtime` 导入 app.main，汇总模块导入耗时:
+    - 导入 app.main 的总耗时（多次运行取中位数）
+    - 按顶层包汇总的自身耗时，以及累计耗时最高的模块
+    - 启动时是否导入了应延迟加载的重型依赖（pandas / numpy / openpyxl / passlib）
+指定 --serve 时另外启动 uvicorn，测量从启动进程到 /api/health 首次返回 200 的时间。
+
+数据库与上传目录使用临时目录，不影响本地数据。
+
+使用方法:
+    python scripts/profile_startup.py
+    python scripts/profile_startup.py --runs 5 --serve --output startup_report.json
+    python scripts/profile_startup.py --fail-on-heavy   # 启动时导入了重型依赖则以非零状态退出（用于 CI）
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+backend_dir = Path(__file__).parent.parent / "backend"
+
+# 应在首次使用时才导入的依赖
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "passlib")
+HEALTH_TIMEOUT = 60.0
+
+
+def _env(work_dir: Path) -> Dict[str, str]:
+    return {**os.environ, "UPLOAD_DIR": str(work_dir / "uploads")}
+
+
+def import_profile(work_dir: Path) -> Dict[str, Any]:
+    """运行一次 -X importtime，返回各模块 (自身耗时, 累计耗时)（微秒）及进程总耗时"""
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=backend_dir, env=_env(work_dir), capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"导入 app.main 失败:\n{completed.stderr[-2000:]}")
+
+    modules: Dict[str, List[int]] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = [int(self_us), int(cumulative_us)]
+    return {"wall_ms": wall * 1000, "modules": modules}
+
+
+def time_to_healthy(work_dir: Path) -> float:
+    """启动 uvicorn，返回 /api/health 首次返回 200 的时间（ms）"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=backend_dir, env=_env(work_dir), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < HEALTH_TIMEOUT:
+            if process.poll() is not None:
+                raise RuntimeError(f"后端进程已退出（返回码 {process.returncode}）")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                pass
+            time.sleep(0.02)
+        raise RuntimeError("等待健康检查超时")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def summarize(profiles: List[Dict[str, Any]], top: int) -> Dict[str, Any]:
+    """汇总多次运行（取中位数）"""
+    names = profiles[0]["modules"].keys()
+    modules = {
+        name: [
+            statistics.median(profile["modules"].get(name, [0, 0])[0] for profile in profiles),
+            statistics.median(profile["modules"].get(name, [0, 0])[1] for profile in profiles),
+        ]
+        for name in names
+    }
+    packages: Dict[str, float] = defaultdict(float)
+    for name, (self_us, _) in modules.items():
+        packages[name.split(".")[0]] += self_us
+
+    return {
+        "import_app_main_ms": round(modules.get("app.main", [0, 0])[1] / 1000, 1),
+        "process_wall_ms": round(statistics.median(profile["wall_ms"] for profile in profiles), 1),
+        "heavy_modules_at_startup": [name for name in HEAVY_MODULES if name in modules],
+        "packages": [
+            {"package": name, "self_ms": round(self_us / 1000, 1)}
+            for name, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+        "top_cumulative": [
+            {"module": name, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cumulative_us / 1000, 1)}
+            for name, (self_us, cumulative_us) in sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="后端启动（模块导入）耗时分析")
+    parser.add_argument("--runs", type=int, default=3, help="运行次数（取中位数）")
+    parser.add_argument("--top", type=int, default=20, help="报告中列出的模块/包数量")
+    parser.add_argument("--serve", action="store_true", help="同时测量 uvicorn 启动到健康检查可用的时间")
+    parser.add_argument("--output", help="JSON 报告输出路径")
+    parser.add_argument("--fail-on-heavy", action="store_true", help="启动时导入了重型依赖则以非零状态退出")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="costmatrix-startup-") as tmp:
+        work_dir = Path(tmp)
+        (work_dir / "uploads").mkdir()
+        # 第一次运行会创建数据库并编译字节码，不计入统计
+        import_profile(work_dir)
+        profiles = [import_profile(work_dir) for _ in range(max(1, args.runs))]
+        report = summarize(profiles, args.top)
+        if args.serve:
+            report["time_to_healthy_ms"] = round(
+                statistics.median(time_to_healthy(work_dir) for _ in range(max(1, args.runs))), 1
+            )
+
+    report = {"generated_at": datetime.now().isoformat(timespec="seconds"), "runs": args.runs, **report}
+
+    print(f"导入 app.main: {report['import_app_main_ms']:.1f} ms（进程总耗时 {report['process_wall_ms']:.1f} ms）")
+    if "time_to_healthy_ms" in report:
+        print(f"启动到健康检查可用: {report['time_to_healthy_ms']:.1f} ms")
+    print("-" * 72)
+    print(f"{'顶层包':<40}{'自身耗时(ms)':>16}")
+    for item in report["packages"]:
+        print(f"{item['package']:<40}{item['self_ms']:>16.1f}")
+    print("-" * 72)
+    print(f"{'模块':<48}{'自身(ms)':>10}{'累计(ms)':>12}")
+    for item in report["top_cumulative"]:
+        print(f"{item['module']:<48}{item['self_ms']:>10.1f}{item['cumulative_ms']:>12.1f}")
+    print("-" * 72)
+    heavy = report["heavy_modules_at_startup"]
+    print(f"启动时导入的重型依赖: {', '.join(heavy) if heavy else '无'}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"报告已写入: {args.output}")
+    if args.fail_on_heavy and heavy:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()